@@ -1,75 +1,580 @@
-import platform
+import hashlib
+import json
 import subprocess
 import os
 import shutil
+import struct
+import tarfile
+import threading
+import time
+import zipfile
 import requests
+from concurrent.futures import FIRST_EXCEPTION, ThreadPoolExecutor, wait
 from pathlib import Path
+from requests.adapters import HTTPAdapter
+
+from mupen_platform import detect_os, is_mupen_running
 
 # Constants
 MUPEN_VERSION = "2.6.0"  # Latest stable release as of July 2024
 BASE_URL = f"https://github.com/mupen64plus/mupen64plus-core/releases/download/{MUPEN_VERSION}"
+BUNDLE_SHA256 = {}  # archive name -> pinned SHA-256; takes precedence over a published checksum file
+# Checksum files looked for next to a release archive: "<hex>" alone, or "<hex>  <name>" lines
+CHECKSUM_FILES = ("{url}.sha256", "{base}/SHA256SUMS", "{base}/sha256sums.txt")
+DOWNLOAD_SEGMENTS = 4  # parallel Range requests per download
+MIN_SEGMENT_SIZE = 4 * 1024 * 1024
+CHUNK_SIZE = 1024 * 1024
+DOWNLOAD_RETRIES = 5  # attempts per segment without progress before giving up
+STATE_SAVE_INTERVAL = 1.0  # seconds between resume-state checkpoints
+HTTP_TIMEOUT = 30
+# Downloaded archives and their extracted trees, shared by every install on this host
+CACHE_DIR = Path(os.environ.get("EMUAI_INSTALL_CACHE", Path.home() / ".emuai" / "installer-cache"))
+CACHE_LIMIT = int(os.environ.get("EMUAI_INSTALL_CACHE_MB", 2048)) * 1024 * 1024
+STALE_TMP_AGE = 7 * 24 * 3600  # partial downloads untouched this long are abandoned, not resumed
 
-def detect_os():
-    """Detect the operating system."""
-    os_name = platform.system()
-    if os_name == "Windows":
-        return "Windows"
-    elif os_name == "Darwin":
-        return "MacOS"
-    elif os_name == "Linux":
-        if "chrome" in platform.uname().release.lower():
-            return "ChromeOS"
-        try:
-            with open("/etc/os-release", "r") as f:
-                for line in f:
-                    if line.startswith("ID="):
-                        distro = line.strip().split("=")[1].lower().strip('"')
-                        return {"debian": "Debian", "arch": "Arch"}.get(distro, "Linux (Unknown)")
-        except FileNotFoundError:
-            return "Linux (Unknown)"
-    return "Unsupported"
-
-def download_file(url, dest):
-    """Download a file from a URL to a destination path."""
-    print(f"Downloading from {url}...")
-    response = requests.get(url, stream=True)
+ZIP_TAIL_SIZE = 64 * 1024 + 22  # largest end-of-central-directory record, comment included
+# Refuse absolute paths, links out of the tree etc. where tarfile supports extraction filters
+TAR_EXTRACT_OPTIONS = {"filter": "data"} if hasattr(tarfile, "data_filter") else {}
+
+_session = None
+
+def get_session():
+    """Shared HTTP session whose connection pool fits a segmented download."""
+    global _session
+    if _session is None:
+        _session = requests.Session()
+        adapter = HTTPAdapter(pool_maxsize=DOWNLOAD_SEGMENTS * 2)
+        _session.mount("http://", adapter)
+        _session.mount("https://", adapter)
+    return _session
+
+def _probe(session, url):
+    """Return (size, validator, response); response is an open full-body stream if Range is unsupported."""
+    response = session.get(url, headers={"Range": "bytes=0-0"}, stream=True, timeout=HTTP_TIMEOUT)
     response.raise_for_status()
-    with open(dest, "wb") as f:
-        for chunk in response.iter_content(chunk_size=8192):
+    validator = response.headers.get("ETag") or response.headers.get("Last-Modified")
+    if response.status_code == 206:
+        total = response.headers.get("Content-Range", "").rpartition("/")[2]
+        response.close()
+        if total.isdigit():
+            return int(total), validator, None
+        response = session.get(url, stream=True, timeout=HTTP_TIMEOUT)
+        response.raise_for_status()
+    return None, validator, response
+
+def _fetch_segment(session, url, path, end, progress, index, validator, cancel):
+    """Fetch bytes progress[index]..end (inclusive) into path, retrying from wherever it stopped."""
+    failures = 0
+    with open(path, "r+b", buffering=0) as f:
+        while progress[index] <= end and not cancel.is_set():
+            before = progress[index]
+            headers = {"Range": f"bytes={before}-{end}"}
+            if validator:
+                headers["If-Range"] = validator
+            try:
+                with session.get(url, headers=headers, stream=True, timeout=HTTP_TIMEOUT) as response:
+                    response.raise_for_status()
+                    if response.status_code != 206:
+                        raise ValueError(f"{url} changed on the server or stopped honouring Range requests")
+                    f.seek(before)
+                    for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
+                        if cancel.is_set():
+                            return
+                        f.write(chunk[:end + 1 - progress[index]])
+                        progress[index] = min(progress[index] + len(chunk), end + 1)
+            except (requests.ConnectionError, requests.Timeout, requests.exceptions.ChunkedEncodingError) as e:
+                print(f"Segment {index} interrupted at byte {progress[index]}: {e}")
+            if progress[index] > end:
+                break
+            failures = 0 if progress[index] > before else failures + 1
+            if failures >= DOWNLOAD_RETRIES:
+                raise OSError(f"segment {index} of {url} made no progress after {failures} attempts")
+            time.sleep(min(2 ** failures, 30))
+
+def _load_resume_state(state_path, part_path, url, size, validator):
+    """Segment ranges and progress from an earlier attempt, or None if it doesn't match this download."""
+    try:
+        with open(state_path) as f:
+            state = json.load(f)
+        if (state["url"], state["size"], state["validator"]) != (url, size, validator):
+            return None
+        if part_path.stat().st_size != size:
+            return None
+        return [tuple(r) for r in state["ranges"]], state["progress"]
+    except (OSError, ValueError, KeyError):
+        return None
+
+def _save_resume_state(state_path, url, size, validator, ranges, progress):
+    tmp_path = state_path.with_name(state_path.name + ".tmp")
+    with open(tmp_path, "w") as f:
+        json.dump({"url": url, "size": size, "validator": validator,
+                   "ranges": ranges, "progress": list(progress)}, f)
+    os.replace(tmp_path, state_path)
+
+def _hash_prefix(reader, hasher, hashed, upto):
+    """Feed bytes hashed..upto of the partial file to hasher; returns the new hashed offset."""
+    reader.seek(hashed)
+    while hashed < upto:
+        block = reader.read(min(CHUNK_SIZE, upto - hashed))
+        if not block:
+            break
+        hasher.update(block)
+        hashed += len(block)
+    return hashed
+
+def _download_segments(session, url, part_path, state_path, size, validator, segments, on_progress=None):
+    resumed = _load_resume_state(state_path, part_path, url, size, validator)
+    if resumed is not None:
+        ranges, progress = resumed
+        done = sum(p - start for (start, _), p in zip(ranges, progress))
+        print(f"Resuming download at {done * 100 // max(size, 1)}% ({done >> 20} of {size >> 20} MB)")
+    else:
+        count = max(1, min(segments, size // MIN_SEGMENT_SIZE))
+        bounds = [size * i // count for i in range(count + 1)]
+        ranges = [(bounds[i], bounds[i + 1] - 1) for i in range(count)]
+        progress = [start for start, _ in ranges]
+        with open(part_path, "wb") as f:
+            f.truncate(size)
+    hasher = hashlib.sha256()
+    hashed = 0
+    cancel = threading.Event()
+    last_save = time.monotonic()
+    pool = ThreadPoolExecutor(max_workers=len(ranges), thread_name_prefix="download")
+    try:
+        with open(part_path, "rb") as reader:
+            futures = [pool.submit(_fetch_segment, session, url, part_path, end, progress, i, validator, cancel)
+                       for i, (_, end) in enumerate(ranges)]
+            while True:
+                finished, pending = wait(futures, timeout=0.2, return_when=FIRST_EXCEPTION)
+                for future in finished:
+                    future.result()
+                # Hash the prefix that is complete so far; segments arrive out of order
+                contiguous = next((p for (_, end), p in zip(ranges, progress) if p <= end), size)
+                hashed = _hash_prefix(reader, hasher, hashed, contiguous)
+                if on_progress is not None:
+                    on_progress(part_path, size, ranges, progress)
+                if not pending:
+                    break
+                if time.monotonic() - last_save >= STATE_SAVE_INTERVAL:
+                    last_save = time.monotonic()
+                    _save_resume_state(state_path, url, size, validator, ranges, progress)
+                    done = sum(p - start for (start, _), p in zip(ranges, progress))
+                    print(f"  {done * 100 // max(size, 1)}% ({done >> 20} of {size >> 20} MB)")
+    except BaseException:
+        cancel.set()
+        pool.shutdown(wait=True)
+        _save_resume_state(state_path, url, size, validator, ranges, progress)
+        raise
+    pool.shutdown(wait=True)
+    return hasher.hexdigest()
+
+def _download_single(response, part_path, on_progress=None):
+    # The server ignores Range: one stream, no resume
+    hasher = hashlib.sha256()
+    size = 0
+    with response, open(part_path, "wb") as f:
+        for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
             f.write(chunk)
-    print(f"Downloaded to {dest}")
+            hasher.update(chunk)
+            size += len(chunk)
+    if on_progress is not None:
+        on_progress(part_path, size, [(0, size - 1)], [size])
+    return hasher.hexdigest()
+
+def download_file(url, dest, sha256=None, segments=DOWNLOAD_SEGMENTS, session=None, on_progress=None):
+    """Download a file from a URL to a destination path and return its SHA-256.
+
+    Segments are fetched in parallel with Range requests. An interrupted download
+    leaves dest.part and dest.part.json behind and is resumed by the next call. If
+    sha256 is given and doesn't match, the partial file is removed and ValueError raised.
+    on_progress(part_path, size, ranges, progress) is called from this thread as
+    segments advance, with progress[i] the next missing byte of ranges[i].
+    """
+    session = session or get_session()
+    dest = Path(dest)
+    part_path = dest.with_name(dest.name + ".part")
+    state_path = dest.with_name(dest.name + ".part.json")
+    print(f"Downloading from {url}...")
+    start = time.perf_counter()
+    size, validator, response = _probe(session, url)
+    if response is not None:
+        digest = _download_single(response, part_path, on_progress)
+    else:
+        digest = _download_segments(session, url, part_path, state_path, size, validator, segments, on_progress)
+    state_path.unlink(missing_ok=True)
+    if sha256 and digest != sha256.lower():
+        part_path.unlink(missing_ok=True)
+        raise ValueError(f"SHA-256 mismatch for {url}: expected {sha256}, got {digest}")
+    os.replace(part_path, dest)
+    elapsed = time.perf_counter() - start
+    print(f"Downloaded to {dest} ({dest.stat().st_size >> 20} MB in {elapsed:.1f}s, sha256 {digest})")
+    return digest
+
+def published_sha256(url, session=None):
+    """SHA-256 of url from a checksum file published beside it, or None if there is none."""
+    session = session or get_session()
+    base, _, name = url.rpartition("/")
+    for pattern in CHECKSUM_FILES:
+        try:
+            response = session.get(pattern.format(url=url, base=base), timeout=HTTP_TIMEOUT)
+        except requests.RequestException:
+            continue
+        if response.status_code != 200:
+            continue
+        for line in response.text.splitlines():
+            fields = line.split()
+            if not fields or len(fields[0]) != 64 or not all(c in "0123456789abcdefABCDEF" for c in fields[0]):
+                continue
+            if len(fields) == 1 or fields[-1].lstrip("*") == name:
+                return fields[0].lower()
+    return None
+
+def expected_sha256(url, name, session=None):
+    """Digest a download of url must have: pinned in BUNDLE_SHA256, else published, else None."""
+    digest = BUNDLE_SHA256.get(name) or published_sha256(url, session)
+    if digest is None:
+        print(f"No SHA-256 pinned or published for {name}; the download cannot be verified")
+    return digest
+
+class _TeeReader:
+    """File-like view of an HTTP response that also copies every byte to a file and a hash."""
+
+    def __init__(self, response, out):
+        self.chunks = response.iter_content(chunk_size=CHUNK_SIZE)
+        self.out = out
+        self.hasher = hashlib.sha256()
+        self.buffer = b""
+        self.pos = 0
+
+    def read(self, size=-1):
+        parts = []
+        while size != 0:
+            if self.pos >= len(self.buffer):
+                chunk = next(self.chunks, b"")
+                if not chunk:
+                    break
+                self.out.write(chunk)
+                self.hasher.update(chunk)
+                self.buffer, self.pos = chunk, 0
+            available = len(self.buffer) - self.pos
+            take = available if size < 0 else min(size, available)
+            parts.append(self.buffer[self.pos:self.pos + take])
+            self.pos += take
+            if size > 0:
+                size -= take
+        return b"".join(parts)
+
+    def drain(self):
+        # Tar readers stop at the end-of-archive marker; the rest still belongs in the copy and hash
+        while self.read(CHUNK_SIZE):
+            pass
+
+def _keep_for_resume(response, url, archive_path, part_path):
+    """Turn the prefix a broken stream left at archive_path into download_file's resume state."""
+    if response is None or response.headers.get("Content-Encoding") or not archive_path.exists():
+        return
+    size = response.headers.get("Content-Length", "")
+    received = archive_path.stat().st_size
+    if not size.isdigit() or not 0 < received < int(size):
+        return
+    size = int(size)
+    validator = response.headers.get("ETag") or response.headers.get("Last-Modified")
+    os.replace(archive_path, part_path)
+    with open(part_path, "r+b") as f:
+        f.truncate(size)
+    _save_resume_state(part_path.with_name(part_path.name + ".json"), url, size, validator, [(0, size - 1)], [received])
+
+def stream_extract_tar(url, archive_path, tree_dir, sha256=None, session=None):
+    """Extract a .tar.gz into tree_dir while it downloads, keeping a copy at archive_path.
+
+    If the stream breaks, the bytes already received become the start of a resumable
+    download_file() and the archive is extracted once that completes; an archive an
+    earlier run left partial is resumed the same way instead of streamed again.
+    Returns the archive's SHA-256; on a mismatch with sha256 ValueError is raised
+    and the caller discards what was extracted.
+    """
+    session = session or get_session()
+    archive_path = Path(archive_path)
+    part_path = archive_path.with_name(archive_path.name + ".part")
+    if not part_path.exists():
+        print(f"Downloading and extracting {url}...")
+        start = time.perf_counter()
+        response = None
+        complete = False
+        try:
+            with session.get(url, stream=True, timeout=HTTP_TIMEOUT) as response, open(archive_path, "wb") as out:
+                response.raise_for_status()
+                reader = _TeeReader(response, out)
+                with tarfile.open(fileobj=reader, mode="r|gz") as archive:
+                    archive.extractall(tree_dir, **TAR_EXTRACT_OPTIONS)
+                reader.drain()
+            complete = True
+        except (requests.ConnectionError, requests.Timeout, requests.exceptions.ChunkedEncodingError,
+                tarfile.ReadError, EOFError) as e:
+            print(f"Streaming stopped ({e}); continuing with a resumable download")
+            _keep_for_resume(response, url, archive_path, part_path)
+        finally:
+            if not complete:
+                archive_path.unlink(missing_ok=True)
+        if complete:
+            digest = reader.hasher.hexdigest()
+            if sha256 and digest != sha256.lower():
+                archive_path.unlink(missing_ok=True)
+                raise ValueError(f"SHA-256 mismatch for {url}: expected {sha256}, got {digest}")
+            print(f"Extracted to {tree_dir} in {time.perf_counter() - start:.1f}s (sha256 {digest})")
+            return digest
+    digest = download_file(url, archive_path, sha256, session=session)
+    shutil.rmtree(tree_dir, ignore_errors=True)
+    with tarfile.open(archive_path, "r:gz") as archive:
+        archive.extractall(tree_dir, **TAR_EXTRACT_OPTIONS)
+    print(f"Extracted to {tree_dir}")
+    return digest
+
+class ZipStreamExtractor:
+    """download_file on_progress hook that extracts zip members as soon as their bytes are in.
+
+    On the first call the tail of the archive is fetched out of band so the central
+    directory is known; after that every member whose byte span is complete in the
+    partial file is extracted, while the remaining segments are still downloading.
+    """
+
+    def __init__(self, url, tree_dir, session=None):
+        self.url = url
+        self.tree_dir = Path(tree_dir)
+        self.session = session or get_session()
+        self.archive = None
+        self.members = None  # [(start, end, ZipInfo)] still to extract, by offset
+        self.extracted = 0
+        self.deferred = False
+
+    def _fetch_central_directory(self, part_path, size):
+        tail_size = min(size, ZIP_TAIL_SIZE)
+        response = self.session.get(self.url, headers={"Range": f"bytes={size - tail_size}-{size - 1}"},
+                                    timeout=HTTP_TIMEOUT)
+        response.raise_for_status()
+        tail = response.content
+        if response.status_code != 206 or len(tail) != tail_size:
+            return False
+        eocd = tail.rfind(b"PK\x05\x06")
+        if eocd < 0 or len(tail) - eocd < 22:
+            return False
+        cd_size, cd_offset = struct.unpack_from("<LL", tail, eocd + 12)
+        if cd_offset == 0xFFFFFFFF:
+            return False  # zip64: extract once the download is complete
+        with open(part_path, "r+b") as f:
+            f.seek(size - tail_size)
+            f.write(tail)
+            if cd_offset < size - tail_size:
+                response = self.session.get(self.url, headers={"Range": f"bytes={cd_offset}-{size - tail_size - 1}"},
+                                            timeout=HTTP_TIMEOUT)
+                response.raise_for_status()
+                if response.status_code != 206:
+                    return False
+                f.seek(cd_offset)
+                f.write(response.content)
+        return True
+
+    def _open(self, part_path):
+        self.archive = zipfile.ZipFile(part_path)
+        infos = sorted(self.archive.infolist(), key=lambda info: info.header_offset)
+        # A member's local header and data end where the next member (or the central directory) starts
+        ends = [info.header_offset for info in infos[1:]] + [self.archive.start_dir]
+        self.members = [(info.header_offset, end, info) for info, end in zip(infos, ends)]
+
+    def __call__(self, part_path, size, ranges, progress):
+        if self.archive is None:
+            if all(p > end for (_, end), p in zip(ranges, progress)):
+                self._open(part_path)
+            elif self.deferred:
+                return
+            elif self._fetch_central_directory(part_path, size):
+                self._open(part_path)
+                print(f"Central directory read: {len(self.members)} files, extracting as they arrive")
+            else:
+                print("Central directory not available up front; extracting after the download")
+                self.deferred = True
+                return
+        remaining = []
+        for start, end, info in self.members:
+            if all(p >= min(end, seg_end + 1) for (seg_start, seg_end), p in zip(ranges, progress)
+                   if seg_start < end and seg_end >= start):
+                self.archive.extract(info, self.tree_dir)
+                self.extracted += 1
+            else:
+                remaining.append((start, end, info))
+        self.members = remaining
+        if not remaining:
+            self.archive.close()
+
+def _tree_size(path):
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.lstat(os.path.join(root, name)).st_size
+            except OSError:
+                pass
+    return total
+
+class ArtifactCache:
+    """Content-addressed store of release archives and their extracted trees.
+
+    Archives live under archives/<sha256>/<name> and trees under trees/<sha256>/;
+    index.json maps "<version>/<name>" to the digest so an unpinned bundle can still
+    be found again. Entries are inserted by atomic rename, and the directory mtime
+    records last use for LRU eviction down to `limit` bytes.
+    """
+
+    def __init__(self, root=CACHE_DIR, limit=CACHE_LIMIT):
+        self.root = Path(root)
+        self.limit = limit
+        for sub in ("archives", "trees", "tmp"):
+            (self.root / sub).mkdir(parents=True, exist_ok=True)
+        self.index_path = self.root / "index.json"
+
+    def _index(self):
+        try:
+            with open(self.index_path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _remember(self, key, digest):
+        index = self._index()
+        index[key] = digest
+        tmp_path = self.root / "tmp" / f"index.{os.getpid()}.json"
+        with open(tmp_path, "w") as f:
+            json.dump(index, f, indent=1)
+        os.replace(tmp_path, self.index_path)
+
+    def digest_for(self, version, name):
+        return BUNDLE_SHA256.get(name) or self._index().get(f"{version}/{name}")
+
+    def _download_path(self, url, name):
+        # Keyed by URL alone so a download interrupted in one run resumes in the next
+        return self.root / "tmp" / f"{hashlib.sha256(url.encode()).hexdigest()[:16]}-{name}"
+
+    def _touch(self, path):
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+
+    def archive(self, url, name, version=MUPEN_VERSION):
+        """Path of the cached archive for url, downloading it on a miss."""
+        digest = self.digest_for(version, name)
+        if digest:
+            cached = self.root / "archives" / digest / name
+            if cached.exists():
+                print(f"Using cached {name} ({digest[:12]})")
+                self._touch(cached.parent)
+                return cached, digest
+        tmp_path = self._download_path(url, name)
+        digest = download_file(url, tmp_path, expected_sha256(url, name))
+        entry = self.root / "archives" / digest
+        entry.mkdir(exist_ok=True)
+        os.replace(tmp_path, entry / name)
+        self._remember(f"{version}/{name}", digest)
+        self.evict(keep={entry})
+        return entry / name, digest
+
+    def tree(self, url, name, version=MUPEN_VERSION):
+        """Directory holding the extracted archive for url, extracting (and downloading) on a miss."""
+        digest = self.digest_for(version, name)
+        if digest:
+            cached = self.root / "trees" / digest
+            if cached.is_dir():
+                print(f"Using cached extracted {name} ({digest[:12]})")
+                self._touch(cached)
+                return cached
+        archive_path = self.root / "archives" / digest / name if digest else None
+        tmp_tree = self.root / "tmp" / f"{os.getpid()}-tree"
+        shutil.rmtree(tmp_tree, ignore_errors=True)
+        try:
+            if archive_path is not None and archive_path.exists():
+                print("Extracting archive...")
+                shutil.unpack_archive(archive_path, tmp_tree)
+            else:
+                # Nothing cached: extract while downloading rather than one after the other
+                archive_path, digest = self._stream(url, name, version, tmp_tree)
+            tree = self.root / "trees" / digest
+            try:
+                os.rename(tmp_tree, tree)
+            except OSError:
+                # Another install extracted the same archive first
+                shutil.rmtree(tmp_tree, ignore_errors=True)
+        except BaseException:
+            shutil.rmtree(tmp_tree, ignore_errors=True)
+            raise
+        self.evict(keep={tree, archive_path.parent})
+        return tree
+
+    def _stream(self, url, name, version, tree_dir):
+        tmp_path = self._download_path(url, name)
+        expected = expected_sha256(url, name)
+        if name.endswith((".tar.gz", ".tgz")):
+            digest = stream_extract_tar(url, tmp_path, tree_dir, expected)
+        elif name.endswith(".zip"):
+            extractor = ZipStreamExtractor(url, tree_dir)
+            digest = download_file(url, tmp_path, expected, on_progress=extractor)
+        else:
+            digest = download_file(url, tmp_path, expected)
+            shutil.unpack_archive(tmp_path, tree_dir)
+        entry = self.root / "archives" / digest
+        entry.mkdir(exist_ok=True)
+        os.replace(tmp_path, entry / name)
+        self._remember(f"{version}/{name}", digest)
+        return entry / name, digest
+
+    def evict(self, keep=()):
+        """Remove abandoned temporary files, then least recently used entries until the cache fits in its limit."""
+        cutoff = time.time() - STALE_TMP_AGE
+        for entry in (self.root / "tmp").iterdir():
+            try:
+                if entry.lstat().st_mtime >= cutoff:
+                    continue
+            except OSError:
+                continue
+            print(f"Removing stale {entry.name} from installer cache")
+            if entry.is_dir() and not entry.is_symlink():
+                shutil.rmtree(entry, ignore_errors=True)
+            else:
+                entry.unlink(missing_ok=True)
+        entries = []
+        for sub in ("archives", "trees"):
+            for entry in (self.root / sub).iterdir():
+                try:
+                    entries.append((entry.stat().st_mtime, entry, _tree_size(entry)))
+                except OSError:
+                    pass
+        total = sum(size for _, _, size in entries)
+        for _, entry, size in sorted(entries, key=lambda e: e[0]):
+            if total <= self.limit:
+                break
+            if entry in keep:
+                continue
+            print(f"Evicting {entry.parent.name}/{entry.name[:12]} from installer cache ({size >> 20} MB)")
+            shutil.rmtree(entry, ignore_errors=True)
+            total -= size
+
+def install_bundle(url, dest_dir, cache=None):
+    """Install the release archive at url into dest_dir through the artifact cache."""
+    cache = cache or ArtifactCache()
+    tree = cache.tree(url, url.rsplit("/", 1)[-1])
+    os.makedirs(dest_dir, exist_ok=True)
+    shutil.copytree(tree, dest_dir, dirs_exist_ok=True)
 
 def check_mupen_running():
     """Check if Mupen64Plus is running."""
-    os_name = detect_os()
-    try:
-        if os_name == "Windows":
-            output = subprocess.check_output("tasklist", shell=True, text=True, stderr=subprocess.STDOUT)
-            return "mupen64plus" in output.lower()
-        elif os_name in ["MacOS", "Debian", "Arch", "ChromeOS"]:
-            try:
-                subprocess.check_output(["pgrep", "-f", "mupen64plus"], text=True)
-                return True
-            except subprocess.CalledProcessError:
-                return False
-    except subprocess.CalledProcessError as e:
-        print(f"Error checking processes: {e}")
-        return False
-    return False
+    return is_mupen_running()
 
 def install_mupen_windows():
     """Download and set up Mupen64Plus on Windows."""
     url = f"{BASE_URL}/mupen64plus-bundle-win64-{MUPEN_VERSION}.zip"
     dest_dir = Path("C:/Mupen64Plus")
-    zip_path = Path.home() / f"mupen64plus-bundle-win64-{MUPEN_VERSION}.zip"
-
-    # Download
-    download_file(url, zip_path)
 
-    # Extract
-    print("Extracting archive...")
-    shutil.unpack_archive(zip_path, dest_dir)
-    zip_path.unlink()  # Remove the zip file
+    # Download and extract, or reuse the cached copy
+    install_bundle(url, dest_dir)
 
     print(f"Installation complete! Run 'mupen64plus-ui-console.exe' from {dest_dir}")
 
@@ -77,15 +582,9 @@ def install_mupen_macos():
     """Download and set up Mupen64Plus on macOS."""
     url = f"{BASE_URL}/mupen64plus-bundle-osx-{MUPEN_VERSION}.zip"
     dest_dir = Path("/Applications/Mupen64Plus")
-    zip_path = Path.home() / f"mupen64plus-bundle-osx-{MUPEN_VERSION}.zip"
-
-    # Download
-    download_file(url, zip_path)
 
-    # Extract
-    print("Extracting archive...")
-    shutil.unpack_archive(zip_path, dest_dir)
-    zip_path.unlink()
+    # Download and extract, or reuse the cached copy
+    install_bundle(url, dest_dir)
 
     print(f"Installation complete! Run 'mupen64plus' from {dest_dir}")
 
@@ -102,13 +601,8 @@ def install_mupen_debian():
         # Fallback to binary download
         url = f"{BASE_URL}/mupen64plus-bundle-linux64-{MUPEN_VERSION}.tar.gz"
         dest_dir = Path("/usr/local/mupen64plus")
-        tar_path = Path.home() / f"mupen64plus-bundle-linux64-{MUPEN_VERSION}.tar.gz"
 
-        download_file(url, tar_path)
-        print("Extracting archive...")
-        os.makedirs(dest_dir, exist_ok=True)
-        subprocess.run(["tar", "-xzf", tar_path, "-C", dest_dir], check=True)
-        tar_path.unlink()
+        install_bundle(url, dest_dir)
         print(f"Installation complete! Run 'mupen64plus' from {dest_dir}/bin")
 
 if __name__ == "__main__":
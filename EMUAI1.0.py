@@ -1,47 +1,13 @@
-import platform
 import subprocess
 import os
 import sys
 import time
 
-def detect_os():
-    """Detect the operating system."""
-    os_name = platform.system()
-    if os_name == "Windows":
-        return "Windows"
-    elif os_name == "Darwin":
-        return "MacOS"
-    elif os_name == "Linux":
-        # Further distinguish Linux distros
-        if "chrome" in platform.uname().release.lower():
-            return "ChromeOS"
-        try:
-            with open("/etc/os-release", "r") as f:
-                for line in f:
-                    if line.startswith("ID="):
-                        distro = line.strip().split("=")[1].lower().strip('"')
-                        if distro == "debian":
-                            return "Debian"
-                        elif distro == "arch":
-                            return "Arch"
-        except FileNotFoundError:
-            pass
-        return "Linux (Unknown)"
-    return "Unsupported"
+from mupen_platform import detect_os, is_mupen_running
 
 def check_mupen_running():
-    """Simulate checking if Mupen64Plus is running (rudimentary check)."""
-    os_name = detect_os()
-    try:
-        if os_name == "Windows":
-            output = subprocess.check_output("tasklist", shell=True, text=True)
-            return "mupen64plus" in output.lower()
-        elif os_name in ["MacOS", "Debian", "Arch", "ChromeOS"]:
-            output = subprocess.check_output("ps aux | grep [m]upen64plus", shell=True, text=True)
-            return bool(output)
-    except subprocess.CalledProcessError:
-        return False
-    return False
+    """Check if Mupen64Plus is running."""
+    return is_mupen_running()
 
 def install_mupen_windows():
     """Install Mupen64Plus on Windows (simulated)."""
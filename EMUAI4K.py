@@ -1,5 +1,156 @@
+import os
+import sqlite3
+import threading
+import time
 import tkinter as tk
-from tkinter import filedialog, messagebox, Menu
+from collections import deque
+from tkinter import filedialog, messagebox, ttk, Menu
+
+import numpy as np
+
+from emucore import POLL_INTERVAL_MS, EmulationCore, EmulationThread, vi_rate_for_region
+from plugins import PluginRegistry
+from romlibrary import HEADER_SIZE, RomIndex, RomLibrary, load_rom, parse_rom_header
+from telemetry import STATUS_UPDATE_INTERVAL
+
+class VirtualList(tk.Frame):
+    # Listbox that only ever holds the rows on screen; rows(start, n) supplies them on demand
+    def __init__(self, master, count, rows, height=25, width=90):
+        super().__init__(master)
+        self.count = count
+        self.rows = rows
+        self.height = height
+        self.top = 0
+        self.listbox = tk.Listbox(self, height=height, width=width, font=("Courier", 10))
+        self.scrollbar = tk.Scrollbar(self, orient=tk.VERTICAL, command=self.on_scroll)
+        self.listbox.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.listbox.bind("<MouseWheel>", lambda e: self.on_scroll("scroll", -e.delta // 120, "units"))
+        self.listbox.bind("<Button-4>", lambda e: self.on_scroll("scroll", -3, "units"))
+        self.listbox.bind("<Button-5>", lambda e: self.on_scroll("scroll", 3, "units"))
+    
+    def on_scroll(self, action, value, unit="units"):
+        if action == "moveto":
+            self.top = int(float(value) * self.count())
+        elif action == "scroll":
+            self.top += int(value) * (self.height if unit == "pages" else 1)
+        self.refresh()
+    
+    def at_bottom(self):
+        return self.top + self.height >= self.count()
+    
+    def refresh(self, follow=False):
+        total = self.count()
+        if follow:
+            self.top = total - self.height
+        self.top = max(0, min(self.top, total - self.height))
+        self.listbox.delete(0, tk.END)
+        self.listbox.insert(tk.END, *self.rows(self.top, self.height))
+        if total:
+            self.scrollbar.set(self.top / total, min(1.0, (self.top + self.height) / total))
+        else:
+            self.scrollbar.set(0, 1)
+
+class RomBrowser(tk.Frame):
+    # ROM list over a RomIndex; the Treeview keeps a fixed pool of row items that are refilled on scroll
+    ROW_HEIGHT = 20
+    HEADINGS = {"name": "Name", "region": "Region", "crc": "CRC", "file": "File"}
+    
+    def __init__(self, master, on_open):
+        super().__init__(master)
+        self.on_open = on_open
+        self.index = RomIndex([])
+        self.view = self.index.query()
+        self.sort = "name"
+        self.reverse = False
+        self.top = 0
+        self.filter_job = None
+        self.filter_var = tk.StringVar(self)
+        self.filter_var.trace_add("write", self.on_filter_changed)
+        filter_bar = tk.Frame(self)
+        filter_bar.pack(side=tk.TOP, fill=tk.X)
+        tk.Label(filter_bar, text="Filter:").pack(side=tk.LEFT, padx=5)
+        tk.Entry(filter_bar, textvariable=self.filter_var).pack(side=tk.LEFT, fill=tk.X, expand=True)
+        self.count_label = tk.Label(filter_bar, text="0 ROMs")
+        self.count_label.pack(side=tk.RIGHT, padx=5)
+        self.tree = ttk.Treeview(self, columns=RomIndex.COLUMNS, show="headings", selectmode="browse")
+        for column in RomIndex.COLUMNS:
+            self.tree.heading(column, text=self.HEADINGS[column], command=lambda c=column: self.sort_by(c))
+        self.tree.column("name", width=220)
+        self.tree.column("region", width=70)
+        self.tree.column("crc", width=150)
+        self.scrollbar = tk.Scrollbar(self, orient=tk.VERTICAL, command=self.on_scroll)
+        self.tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.height = 0
+        self.resize_pool(20)
+        self.tree.bind("<Configure>", lambda e: self.resize_pool(max(1, e.height // self.ROW_HEIGHT - 1)))
+        self.tree.bind("<MouseWheel>", lambda e: self.on_scroll("scroll", -e.delta // 120, "units"))
+        self.tree.bind("<Button-4>", lambda e: self.on_scroll("scroll", -3, "units"))
+        self.tree.bind("<Button-5>", lambda e: self.on_scroll("scroll", 3, "units"))
+        self.tree.bind("<Double-1>", lambda e: self.open_item(self.tree.identify_row(e.y)))
+        self.tree.bind("<Return>", lambda e: self.open_item(self.tree.focus()))
+    
+    def resize_pool(self, height):
+        if height == self.height:
+            return
+        for i in range(self.height, height):
+            self.tree.insert("", tk.END, iid=str(i))
+        for i in range(height, self.height):
+            self.tree.delete(str(i))
+        self.height = height
+        self.refresh()
+    
+    def set_index(self, index):
+        # Swap in a freshly built index, keeping the current filter and sort
+        self.index = index
+        self.apply_filter()
+    
+    def on_filter_changed(self, *args):
+        # Coalesce keystrokes typed faster than the GUI goes idle into one query
+        if self.filter_job is None:
+            self.filter_job = self.after_idle(self.apply_filter)
+    
+    def apply_filter(self):
+        self.filter_job = None
+        self.view = self.index.query(self.filter_var.get(), self.sort, self.reverse)
+        self.top = 0
+        self.count_label.config(text=f"{len(self.view)} of {len(self.index)} ROMs")
+        self.refresh()
+    
+    def sort_by(self, column):
+        self.reverse = not self.reverse if column == self.sort else False
+        self.sort = column
+        for name in RomIndex.COLUMNS:
+            arrow = (" \u25bc" if self.reverse else " \u25b2") if name == column else ""
+            self.tree.heading(name, text=self.HEADINGS[name] + arrow)
+        self.apply_filter()
+    
+    def on_scroll(self, action, value, unit="units"):
+        if action == "moveto":
+            self.top = int(float(value) * len(self.view))
+        elif action == "scroll":
+            self.top += int(value) * (self.height if unit == "pages" else 1)
+        self.refresh()
+    
+    def refresh(self):
+        total = len(self.view)
+        self.top = max(0, min(self.top, total - self.height))
+        visible = self.view[self.top:self.top + self.height].tolist()
+        rows = self.index.rows
+        for i in range(self.height):
+            self.tree.item(str(i), values=rows[visible[i]] if i < len(visible) else ())
+        if total:
+            self.scrollbar.set(self.top / total, min(1.0, (self.top + self.height) / total))
+        else:
+            self.scrollbar.set(0, 1)
+    
+    def open_item(self, item):
+        if not item:
+            return
+        position = self.top + int(item)
+        if position < len(self.view):
+            self.on_open(self.index.entries[int(self.view[position])].path)
 
 class EmuAI:
     def __init__(self, master):
@@ -9,8 +160,38 @@ class EmuAI:
         
         # Emulator state variables
         self.rom_loaded = False
+        self.rom_image = None
+        self.rom_info = None
         self.running = False
+        self.paused = False
+        self.emu_thread = None
+        self.poll_job = None
+        self.next_poll_due = 0.0
+        self.gui_stalls = 0
+        self.longest_gui_delay = 0.0
+        self.show_cpu_usage = False
+        self.last_status_update = 0.0
+        self.last_metrics = None
         self.current_slot = "Default"
+        self.save_states = None
+        self.rewind_enabled = True
+        self.pacing_mode = "exact"
+        self.periodic_dumper = None
+        self.screenshots = None
+        self.recorder = None
+        self.symbols = None
+        self.cheat_db = None
+        self.cheat_plan = None
+        self.enabled_cheats = {}  # rom id -> {cheat name: option index}
+        self.custom_cheats = {}  # rom id -> [(address, value)]
+        self.plugins = PluginRegistry()  # discovered and imported on first use, not here
+        self.script_engine = None
+        self.tool_windows = {}  # debugger windows, built on first open: key -> (window, closes with emulation)
+        self.command_log = None
+        self.rom_directory = None
+        self.rom_library = RomLibrary()
+        self.rom_scan = None
+        self.rom_scan_results = deque()
         
         self.create_menu()
         self.create_content_area()
@@ -40,7 +221,11 @@ class EmuAI:
         system_menu.add_command(label="Reset", command=lambda: self.reset_emulator(soft_reset=True))
         system_menu.add_command(label="Pause/Resume", command=self.pause_resume)
         system_menu.add_command(label="Capture Screenshot", command=self.capture_screenshot)
+        system_menu.add_command(label="Start/Stop Recording", command=self.toggle_recording)
         system_menu.add_command(label="Limit FPS", command=self.toggle_limit_fps)
+        system_menu.add_command(label="Fast Forward", command=self.toggle_fast_forward)
+        system_menu.add_command(label="Rewind", command=self.rewind)
+        system_menu.add_command(label="Enable/Disable Rewind", command=self.toggle_rewind)
         system_menu.add_separator()
         system_menu.add_command(label="Save State", command=self.save_state)
         system_menu.add_command(label="Save As...", command=self.save_state_as)
@@ -73,11 +258,25 @@ class EmuAI:
         options_menu.add_command(label="Configure RSP...", command=self.configure_rsp)
         options_menu.add_separator()
         options_menu.add_command(label="Show CPU Usage %", command=self.toggle_cpu_usage)
+        options_menu.add_command(label="Export Performance Log...", command=self.export_performance_log)
         options_menu.add_command(label="Settings...", command=self.open_settings_dialog)
         self.menubar.add_cascade(label="Options", menu=options_menu)
         
-        # Debugger Menu (visible if debugger enabled)
+        # Debugger Menu (visible if debugger enabled); filled in the first time it is opened
         debugger_menu = Menu(self.menubar, tearoff=0)
+        debugger_menu.config(postcommand=lambda: self.fill_debugger_menu(debugger_menu))
+        self.menubar.add_cascade(label="Debugger", menu=debugger_menu)
+        
+        # Help Menu
+        help_menu = Menu(self.menubar, tearoff=0)
+        help_menu.add_command(label="User Manual", command=self.open_user_manual)
+        help_menu.add_command(label="About Project64", command=self.show_about_dialog)
+        self.menubar.add_cascade(label="Help", menu=help_menu)
+        
+        self.master.config(menu=self.menubar)
+    
+    def fill_debugger_menu(self, debugger_menu):
+        debugger_menu.config(postcommand="")
         debugger_menu.add_command(label="Commands...", command=self.open_debugger_commands_window)
         debugger_menu.add_command(label="View Memory...", command=self.open_memory_viewer)
         
@@ -96,22 +295,14 @@ class EmuAI:
         debugger_menu.add_cascade(label="R4300i", menu=r4300i_submenu)
         
         debugger_menu.add_command(label="Scripts...", command=self.open_script_console)
-        self.menubar.add_cascade(label="Debugger", menu=debugger_menu)
-        
-        # Help Menu
-        help_menu = Menu(self.menubar, tearoff=0)
-        help_menu.add_command(label="User Manual", command=self.open_user_manual)
-        help_menu.add_command(label="About Project64", command=self.show_about_dialog)
-        self.menubar.add_cascade(label="Help", menu=help_menu)
-        
-        self.master.config(menu=self.menubar)
     
     def create_content_area(self):
         # Content area: shows either the ROM List or Game Canvas
         self.content_frame = tk.Frame(self.master, bg="white")
         self.content_frame.pack(fill="both", expand=True)
-        self.content_label = tk.Label(self.content_frame, text="ROM List / Game Canvas", bg="white")
-        self.content_label.pack(expand=True)
+        self.content_label = tk.Label(self.content_frame, text="Game Canvas", bg="white")
+        self.rom_browser = RomBrowser(self.content_frame, self.load_rom_path)
+        self.rom_browser.pack(fill="both", expand=True)
     
     def create_status_bar(self):
         # Status bar with left (status messages) and right (FPS/cpu info)
@@ -127,11 +318,22 @@ class EmuAI:
         print("Open ROM...")
         file_path = filedialog.askopenfilename(title="Open ROM", filetypes=[("N64 ROMs", "*.n64 *.z64 *.v64"), ("All files", "*.*")])
         if file_path:
-            print(f"ROM loaded: {file_path}")
-            self.rom_loaded = True
-            auto_start = True  # Stub auto_start flag
-            if auto_start:
-                self.start_emulation()
+            self.load_rom_path(file_path)
+    
+    def load_rom_path(self, file_path):
+        if self.running:
+            self.end_emulation()
+        try:
+            self.rom_image = load_rom(file_path)
+        except (OSError, ValueError) as e:
+            messagebox.showerror("Open ROM", f"Could not load ROM:\n{e}")
+            return
+        info = self.rom_info = parse_rom_header(self.rom_image[:HEADER_SIZE].tobytes())
+        print(f"ROM loaded: {file_path} ({info['name']}, {info['region']}, {len(self.rom_image) >> 20} MB)")
+        self.rom_loaded = True
+        auto_start = True  # Stub auto_start flag
+        if auto_start:
+            self.start_emulation()
     
     def open_rom_info_dialog(self):
         print("Open ROM Info Dialog")
@@ -140,30 +342,207 @@ class EmuAI:
     def start_emulation(self):
         if self.rom_loaded and not self.running:
             print("Starting Emulation...")
+            from capture import SCREENSHOT_DIR, SCREENSHOT_LEVEL, FrameCapture
+            from savestate import RewindBuffer, SaveStateManager
+            core = EmulationCore(self.rom_image, vi_rate_for_region(self.rom_info["region"]))
+            self.emu_thread = EmulationThread(core)
+            self.emu_thread.start()
+            rom_id = self.rom_id()
+            self.save_states = SaveStateManager(rom_id, core.base_regions())
+            self.screenshots = FrameCapture(SCREENSHOT_DIR, prefix=rom_id, level=SCREENSHOT_LEVEL, workers=1)
+            if self.rewind_enabled:
+                self.emu_thread.send("set_rewind", RewindBuffer())
+            self.emu_thread.send("set_pacing", self.pacing_mode)
             self.running = True
+            self.install_cheats()
+            for hook in self.plugins.start(core):
+                self.emu_thread.send("add_hook", hook)
+            if self.plugins.start_errors:
+                messagebox.showerror("Plugins", "\n".join(self.plugins.start_errors))
+            self.paused = False
+            self.gui_stalls = 0
+            self.longest_gui_delay = 0.0
+            self.schedule_poll()
             self.status_label.config(text="Emulation started")
+            self.rom_browser.pack_forget()
             self.content_label.config(text="Game Canvas (Emulation Running)")
+            self.content_label.pack(expand=True)
         else:
             print("Emulation already running or ROM not loaded.")
     
     def end_emulation(self):
         if self.running:
             print("Ending Emulation...")
+            if self.poll_job is not None:
+                self.master.after_cancel(self.poll_job)
+                self.poll_job = None
+            self.emu_thread.stop()
+            thread = self.emu_thread
+            if thread.rewind is not None:
+                self.print_rewind_stats(thread.rewind)
+            if self.periodic_dumper is not None:
+                self.stop_periodic_dump()
+            if self.recorder is not None:
+                self.toggle_recording()
+            self.screenshots.close()
+            self.screenshots = None
+            self.cheat_plan = None
+            self.plugins.stop()
+            if self.script_engine is not None:
+                self.script_engine.close()
+                self.script_engine = None
+            self.close_tool_windows()
+            print(f"Ran {thread.frames_run} frames; core stalls: {thread.core_stalls} "
+                  f"(longest frame {thread.longest_frame * 1000:.1f} ms); GUI stalls: {self.gui_stalls} "
+                  f"(longest poll delay {self.longest_gui_delay * 1000:.1f} ms)")
+            self.last_metrics = thread.metrics
+            self.save_states.close()
+            self.drain_state_reports()
+            self.save_states = None
+            self.emu_thread = None
             self.running = False
+            self.paused = False
             self.status_label.config(text="Emulation stopped")
-            self.content_label.config(text="ROM List / Game Canvas")
+            self.fps_label.config(text="VI/s: 0")
+            self.content_label.pack_forget()
+            self.rom_browser.pack(fill="both", expand=True)
         else:
             print("No emulation running.")
     
+    def schedule_poll(self):
+        self.next_poll_due = time.perf_counter() + POLL_INTERVAL_MS / 1000
+        self.poll_job = self.master.after(POLL_INTERVAL_MS, self.poll_emulation)
+    
+    def poll_emulation(self):
+        # Runs on the Tk thread; a late callback means the main loop was blocked
+        delay = time.perf_counter() - self.next_poll_due
+        self.longest_gui_delay = max(self.longest_gui_delay, delay)
+        if delay > POLL_INTERVAL_MS / 1000:
+            self.gui_stalls += 1
+        for event in self.emu_thread.poll_events():
+            if event.kind == "core_stall":
+                print(f"Core stall at frame {event.frame}: {event.value * 1000:.1f} ms")
+            elif event.kind == "paused":
+                self.status_label.config(text="Paused")
+            elif event.kind == "resumed":
+                self.status_label.config(text="Resumed")
+            elif event.kind == "reset":
+                self.status_label.config(text="Reset performed")
+            elif event.kind == "query":
+                callback, result = event.value
+                try:
+                    callback(result)
+                except Exception as e:  # a broken tool window must not stop polling
+                    print(f"Query callback {getattr(callback, '__name__', callback)} failed: {e!r}")
+            elif event.kind == "pacing":
+                self.status_label.config(text={"exact": "FPS limit on", "unlimited": "FPS limit off",
+                                               "fast_forward": "Fast forward"}[event.value])
+            elif event.kind == "rewound":
+                self.status_label.config(text="Rewind buffer empty" if event.value is None else f"Rewound to frame {event.value}")
+            elif event.kind == "error":
+                print(f"Emulation error at frame {event.frame}: {event.value}")
+                self.status_label.config(text=f"Error: {event.value}")
+        if not self.emu_thread.is_alive():
+            print("Emulation thread exited unexpectedly")
+            self.end_emulation()
+            self.status_label.config(text="Emulation thread stopped unexpectedly")
+            return
+        self.drain_state_reports()
+        now = time.perf_counter()
+        if now - self.last_status_update >= STATUS_UPDATE_INTERVAL:
+            self.last_status_update = now
+            self.update_fps_label()
+        self.schedule_poll()
+    
+    def drain_state_reports(self):
+        while self.save_states.reports:
+            report = self.save_states.reports.popleft()
+            if report.kind == "save":
+                print(f"State saved to {report.path}: {report.pages} pages, "
+                      f"{report.size / 1024:.0f} KB in {report.elapsed * 1000:.1f} ms")
+                self.status_label.config(text=f"State saved ({report.size / 1024:.0f} KB)")
+            elif report.kind == "save_failed":
+                print(f"Could not save state to {report.path}: {report.error}")
+                self.status_label.config(text="Save state failed")
+                messagebox.showerror("Save State", f"Could not save state to {report.path}:\n{report.error}")
+            else:
+                source = "cache" if report.cached else f"{report.size / 1024:.0f} KB file"
+                print(f"State loaded from {report.path} ({source}) in {report.elapsed * 1000:.1f} ms")
+                self.status_label.config(text="State loaded")
+    
+    def query_core(self, fn, callback):
+        # fn runs on the emulation thread between frames; callback gets its result on the Tk thread
+        self.emu_thread.send("query", fn, callback)
+    
+    def update_fps_label(self):
+        metrics = self.emu_thread.metrics
+        metrics.sample_thread("gui")
+        stats = metrics.snapshot()
+        text = f"VI/s: {stats['vi_per_sec']:.0f}  p95: {stats['frame_ms_p95']:.1f} ms"
+        if stats["dropped_frames"]:
+            text += f"  dropped: {stats['dropped_frames']}"
+        if self.recorder is not None:
+            rec = self.recorder.stats()
+            text += f"  REC {rec['encoded']} (queue {rec['queue_depth']}, dropped {rec['dropped']})"
+        if self.show_cpu_usage:
+            cpu = stats["cpu_percent"]
+            text += f"  CPU emu {cpu.get('emulation', 0.0):.0f}% / gui {cpu.get('gui', 0.0):.0f}%"
+            if self.pacing_mode != "unlimited":
+                text += f"  jitter p99 {stats['jitter_ms_p99']:.2f} ms"
+        self.fps_label.config(text=text)
+    
     def choose_rom_directory(self):
         print("Choose ROM Directory...")
         chosen_dir = filedialog.askdirectory(title="Select ROM Directory")
         if chosen_dir:
             print(f"ROM Directory set to: {chosen_dir}")
+            self.rom_directory = chosen_dir
+            self.refresh_rom_list()
     
     def refresh_rom_list(self):
+        if not self.rom_directory:
+            print("No ROM directory chosen.")
+            return
+        if self.rom_scan is not None and self.rom_scan.is_alive():
+            print("ROM scan already in progress.")
+            return
         print("Refreshing ROM List...")
-        self.content_label.config(text="ROM List refreshed")
+        self.status_label.config(text="Loading ROM List...")
+        # Scanning, hashing and index building all happen off the Tk thread; results come back via a deque
+        self.rom_scan = threading.Thread(target=self.scan_rom_directory, args=(self.rom_directory,),
+                                         name="rom-scan", daemon=True)
+        self.rom_scan.start()
+        self.master.after(POLL_INTERVAL_MS, self.poll_rom_scan)
+    
+    def scan_rom_directory(self, directory):
+        # sqlite connections are per-thread, so the scan uses its own handle on the same database
+        library = RomLibrary(self.rom_library.db_path)
+        try:
+            self.rom_scan_results.append(("cached", RomIndex(library.roms(directory))))
+            result = library.scan(directory)
+            self.rom_scan_results.append(("scanned", (result, RomIndex(library.roms(directory)))))
+        except (OSError, sqlite3.Error) as e:
+            self.rom_scan_results.append(("error", e))
+        finally:
+            library.close()
+    
+    def poll_rom_scan(self):
+        while self.rom_scan_results:
+            kind, value = self.rom_scan_results.popleft()
+            if kind == "cached":
+                self.rom_browser.set_index(value)
+                self.status_label.config(text=f"Loading ROM List... ({len(value)} cached)")
+            elif kind == "scanned":
+                result, index = value
+                print(f"Scanned {result.total} ROMs in {result.elapsed:.3f}s "
+                      f"({result.updated} updated, {result.removed} removed, {result.skipped} skipped)")
+                self.rom_browser.set_index(index)
+                self.status_label.config(text="ROM List refreshed")
+            else:
+                print(f"ROM scan failed: {value}")
+                self.status_label.config(text="ROM List refresh failed")
+        if self.rom_scan.is_alive() or self.rom_scan_results:
+            self.master.after(POLL_INTERVAL_MS, self.poll_rom_scan)
     
     def show_recent_roms(self):
         print("Show Recent ROMs (stub)")
@@ -173,6 +552,9 @@ class EmuAI:
     
     def close_application(self):
         print("Closing application...")
+        if self.running:
+            self.end_emulation()
+        self.rom_library.close()
         self.master.quit()
     
     # Stub functions for System Menu
@@ -182,32 +564,93 @@ class EmuAI:
                 print("Performing Soft Reset...")
             else:
                 print("Performing Hard Reset...")
-            self.status_label.config(text="Reset performed")
+            self.emu_thread.send("reset", soft_reset)
         else:
             print("Emulator is not running.")
     
     def pause_resume(self):
         if self.running:
             print("Toggling Pause/Resume...")
-            self.status_label.config(text="Pause/Resume toggled")
+            self.paused = not self.paused
+            self.emu_thread.send("pause" if self.paused else "resume")
+        else:
+            print("Emulator is not running.")
+    
+    def rewind(self):
+        if self.running:
+            print("Rewinding...")
+            self.emu_thread.send("rewind")
         else:
             print("Emulator is not running.")
     
+    def toggle_rewind(self):
+        from savestate import RewindBuffer
+        self.rewind_enabled = not self.rewind_enabled
+        print(f"Rewind {'enabled' if self.rewind_enabled else 'disabled'}")
+        if self.running:
+            if not self.rewind_enabled and self.emu_thread.rewind is not None:
+                self.print_rewind_stats(self.emu_thread.rewind)
+            self.emu_thread.send("set_rewind", RewindBuffer() if self.rewind_enabled else None)
+        self.status_label.config(text=f"Rewind {'enabled' if self.rewind_enabled else 'disabled'}")
+    
+    def print_rewind_stats(self, rewind):
+        stats = rewind.stats()
+        print(f"Rewind: {stats['snapshots']} snapshots ({stats['frames_covered']} frames) in "
+              f"{stats['bytes'] / (1 << 20):.1f} MB, {stats['evicted']} evicted, {stats['skipped']} skipped; capture "
+              f"{stats['capture_ms']:.2f} ms ({stats['per_frame_ms']:.3f} ms/frame)")
+    
     def capture_screenshot(self):
         if self.running:
             print("Capturing Screenshot...")
-            self.status_label.config(text="Screenshot captured")
+            # The copy happens between frames; encoding and writing happen on the capture workers
+            self.query_core(self.screenshots.capture,
+                            lambda queued: self.status_label.config(
+                                text="Screenshot captured" if queued else "Screenshot dropped (encoder busy)"))
+        else:
+            print("Emulator is not running.")
+    
+    def toggle_recording(self):
+        from capture import RECORDING_DIR, FrameCapture
+        if self.recorder is not None:
+            recorder = self.recorder
+            self.recorder = None
+            if self.running:
+                self.emu_thread.send("remove_hook", recorder)
+            recorder.close()
+            stats = recorder.stats()
+            print(f"Recording stopped: {stats['encoded']} frames to {recorder.directory} "
+                  f"({stats['mb_written']:.1f} MB, {stats['encode_ms']:.1f} ms/frame encode), "
+                  f"{stats['dropped']} dropped, max queue {stats['max_queue_depth']}")
+            self.status_label.config(text=f"Recording stopped ({stats['dropped']} frames dropped)")
+        elif self.running:
+            rom_id = self.rom_id()
+            directory = RECORDING_DIR / f"{rom_id}-{time.strftime('%Y%m%d-%H%M%S')}"
+            self.recorder = FrameCapture(directory)
+            self.emu_thread.send("add_hook", self.recorder)
+            print(f"Recording to {directory}")
+            self.status_label.config(text="Recording...")
         else:
             print("Emulator is not running.")
     
     def toggle_limit_fps(self):
         print("Toggling Limit FPS...")
-        self.status_label.config(text="FPS limit toggled")
+        self.set_pacing_mode("unlimited" if self.pacing_mode == "exact" else "exact")
+    
+    def toggle_fast_forward(self):
+        self.set_pacing_mode("exact" if self.pacing_mode == "fast_forward" else "fast_forward")
+    
+    def set_pacing_mode(self, mode):
+        self.pacing_mode = mode
+        if self.running:
+            print(f"Pacing: {self.emu_thread.pacer.stats()}")
+            self.emu_thread.send("set_pacing", mode)
+        else:
+            self.status_label.config(text=f"Pacing set to {mode.replace('_', ' ')}")
     
     def save_state(self):
         if self.running:
             print(f"Saving state in slot {self.current_slot}...")
-            self.status_label.config(text="State saved")
+            self.write_state(self.save_states.slot_path(self.current_slot))
         else:
             print("Emulator is not running.")
     
@@ -215,15 +658,20 @@ class EmuAI:
         if self.running:
             file_path = filedialog.asksaveasfilename(title="Save State As", defaultextension=".state", filetypes=[("State Files", "*.state"), ("All Files", "*.*")])
             if file_path:
-                print(f"State saved as: {file_path}")
-                self.status_label.config(text="State saved")
+                print(f"Saving state as: {file_path}")
+                self.write_state(file_path)
         else:
             print("Emulator is not running.")
     
+    def write_state(self, path):
+        # Only the RAM copy happens on the emulation thread; encoding and I/O run in the background
+        states = self.save_states
+        self.emu_thread.send("call", lambda core: states.save_async(path, core.snapshot()))
+    
     def load_state(self):
         if self.running:
             print(f"Loading state from slot {self.current_slot}...")
-            self.status_label.config(text="State loaded")
+            self.read_state(self.save_states.slot_path(self.current_slot))
         else:
             print("Emulator is not running.")
     
@@ -231,22 +679,144 @@ class EmuAI:
         if self.running:
             file_path = filedialog.askopenfilename(title="Load State", filetypes=[("State Files", "*.state"), ("All Files", "*.*")])
             if file_path:
-                print(f"State loaded from: {file_path}")
-                self.status_label.config(text="State loaded")
+                print(f"Loading state from: {file_path}")
+                self.read_state(file_path)
         else:
             print("Emulator is not running.")
     
+    def read_state(self, path):
+        if not os.path.exists(path) and str(path) not in self.save_states.cache:
+            print(f"No save state at {path}")
+            self.status_label.config(text="No save state in slot")
+            return
+        thread = self.emu_thread
+        def apply(future):
+            try:
+                snapshot = future.result()
+            except (OSError, ValueError) as e:
+                print(f"Could not load state: {e}")
+                return
+            thread.send("call", lambda core: core.restore(snapshot))
+        self.save_states.load_async(path).add_done_callback(apply)
+    
     def set_current_slot(self, slot):
         print(f"Current Save State set to {slot}")
         self.current_slot = slot
     
+    def rom_id(self):
+        return f"{self.rom_info['crc1']:08X}-{self.rom_info['crc2']:08X}"
+    
+    def load_cheat_database(self):
+        from cheats import CheatDatabase
+        if self.cheat_db is None:
+            self.cheat_db = CheatDatabase.load()
+            print(f"Indexed cheats for {len(self.cheat_db)} games from {self.cheat_db.sources} "
+                  f"in {self.cheat_db.load_time * 1000:.1f} ms")
+        return self.cheat_db
+    
+    def install_cheats(self):
+        # Compile the enabled cheats once and swap the plan in as the emulation thread's frame hook
+        from cheats import CheatPlan
+        rom_id = self.rom_id()
+        enabled = self.enabled_cheats.get(rom_id, {})
+        selected = []
+        if enabled:
+            _, cheats = self.load_cheat_database().lookup(rom_id)
+            selected = [(cheat, enabled[cheat.name]) for cheat in cheats if cheat.name in enabled]
+        custom = self.custom_cheats.get(rom_id, [])
+        plan = CheatPlan.from_cheats(selected, custom) if selected or custom else None
+        if plan is not None and plan.skipped:
+            print(f"Unsupported cheat codes skipped: {', '.join(plan.skipped)}")
+        if self.cheat_plan is not None:
+            self.emu_thread.send("remove_hook", self.cheat_plan)
+        if plan is not None:
+            self.emu_thread.send("add_hook", plan)
+        self.cheat_plan = plan
+        return plan
+    
     def open_cheat_window(self):
+        from cheats import parse_code
         print("Opening Cheat Window...")
-        messagebox.showinfo("Cheats", "Cheat window would open here.")
+        if not self.rom_loaded:
+            messagebox.showinfo("Cheats", "Load a ROM to choose cheats.")
+            return
+        rom_id = self.rom_id()
+        name, cheats = self.load_cheat_database().lookup(rom_id)
+        enabled = dict(self.enabled_cheats.get(rom_id, {}))
+        window = tk.Toplevel(self.master)
+        window.title("Cheats")
+        tk.Label(window, text=f"{name or self.rom_info['name']} ({rom_id}): {len(cheats)} cheats",
+                 anchor="w").grid(row=0, column=0, columnspan=3, sticky="we", padx=5, pady=5)
+        cheat_list = tk.Listbox(window, width=50, height=15, selectmode=tk.MULTIPLE, exportselection=False)
+        cheat_list.grid(row=1, column=0, columnspan=3, padx=5)
+        for i, cheat in enumerate(cheats):
+            cheat_list.insert(tk.END, cheat.name)
+            if cheat.name in enabled:
+                cheat_list.selection_set(i)
+        description_label = tk.Label(window, text="", anchor="w", width=50)
+        description_label.grid(row=2, column=0, columnspan=3, sticky="we", padx=5)
+        option_var = tk.StringVar()
+        option_menu = tk.OptionMenu(window, option_var, "")
+        option_menu.grid(row=3, column=0, columnspan=3, sticky="w", padx=5)
+        tk.Label(window, text="Custom codes (one GameShark code per line):", anchor="w").grid(
+            row=4, column=0, columnspan=3, sticky="we", padx=5, pady=(5, 0))
+        custom_text = tk.Text(window, width=30, height=5, font=("Courier", 10))
+        custom_text.grid(row=5, column=0, columnspan=3, sticky="w", padx=5)
+        custom_text.insert("1.0", "\n".join(f"{a:08X} {v:04X}" for a, v in self.custom_cheats.get(rom_id, [])))
+        
+        def choose_option(cheat, index):
+            enabled[cheat.name] = index
+            option_var.set(cheat.options[index][1] or cheat.options[index][0])
+        
+        shown = {"selection": set(cheat_list.curselection())}
+        
+        def show_selected(event=None):
+            # <<ListboxSelect>> fires on button press, before the active item moves, so the
+            # clicked cheat is the one that just joined the selection
+            selection = set(cheat_list.curselection())
+            added = selection - shown["selection"]
+            shown["selection"] = selection
+            menu = option_menu["menu"]
+            menu.delete(0, tk.END)
+            option_var.set("")
+            description_label.config(text="")
+            if not added:
+                return
+            cheat = cheats[min(added)]
+            description_label.config(text=cheat.description)
+            for index, (value, label) in enumerate(cheat.options):
+                menu.add_command(label=label or value, command=lambda i=index: choose_option(cheat, i))
+            if cheat.options:
+                choose_option(cheat, enabled.get(cheat.name, 0))
+        
+        def apply():
+            try:
+                custom = [parse_code(line) for line in custom_text.get("1.0", tk.END).splitlines() if line.strip()]
+            except ValueError as e:
+                messagebox.showerror("Cheats", str(e))
+                return
+            selected = {cheats[i].name for i in cheat_list.curselection()}
+            self.enabled_cheats[rom_id] = {name: enabled.get(name, 0) for name in selected}
+            self.custom_cheats[rom_id] = custom
+            count = len(selected) + bool(custom)
+            if self.running:
+                plan = self.install_cheats()
+                codes = len(plan) if plan is not None else 0
+                self.status_label.config(text=f"{count} cheats active ({codes} codes)")
+            else:
+                self.status_label.config(text=f"{count} cheats enabled")
+        
+        cheat_list.bind("<<ListboxSelect>>", show_selected)
+        tk.Button(window, text="Apply", command=apply).grid(row=6, column=0, pady=5)
+        tk.Button(window, text="Close", command=window.destroy).grid(row=6, column=1, pady=5)
     
     def press_gs_button(self):
         if self.running:
             print("GS Button pressed")
+            if self.cheat_plan is None or not self.cheat_plan.button:
+                self.status_label.config(text="No GS Button codes active")
+                return
+            self.emu_thread.send("call", self.cheat_plan.press_button)
             self.status_label.config(text="GS Button activated")
         else:
             print("Emulator is not running.")
@@ -278,60 +848,441 @@ class EmuAI:
     
     def configure_graphics(self):
         print("Configuring Graphics Plugin...")
-        messagebox.showinfo("Graphics Config", "Graphics plugin configuration dialog would open.")
+        self.configure_plugin("graphics", "Graphics Config")
     
     def configure_audio(self):
         print("Configuring Audio Plugin...")
-        messagebox.showinfo("Audio Config", "Audio plugin configuration dialog would open.")
+        self.configure_plugin("audio", "Audio Config")
     
     def configure_controller(self):
         print("Configuring Controller Plugin...")
-        messagebox.showinfo("Controller Config", "Controller plugin configuration dialog would open.")
+        self.configure_plugin("controller", "Controller Config")
     
     def configure_rsp(self):
         print("Configuring RSP Plugin...")
-        messagebox.showinfo("RSP Config", "RSP plugin configuration dialog would open.")
+        self.configure_plugin("rsp", "RSP Config")
+    
+    def configure_plugin(self, kind, title):
+        # The plugin module is imported here or when emulation starts, never at start-up
+        try:
+            configured = self.plugins.configure(kind, self.master)
+        except RuntimeError as e:
+            messagebox.showerror(title, str(e))
+            return
+        if not configured:
+            info = self.plugins.info(kind)
+            others = ", ".join(p.name for p in self.plugins.available(kind) if p.name != info.name)
+            messagebox.showinfo(title, f"The {info.name} {kind} plugin has no settings."
+                                       + (f"\nAlso installed: {others}" if others else ""))
     
     def toggle_cpu_usage(self):
         print("Toggling CPU Usage display...")
-        self.status_label.config(text="CPU Usage toggled")
+        self.show_cpu_usage = not self.show_cpu_usage
+        self.status_label.config(text="CPU Usage shown" if self.show_cpu_usage else "CPU Usage hidden")
+        if self.running:
+            self.update_fps_label()
+    
+    def export_performance_log(self):
+        metrics = self.emu_thread.metrics if self.running else self.last_metrics
+        if metrics is None:
+            print("No performance data recorded yet.")
+            return
+        file_path = filedialog.asksaveasfilename(title="Export Performance Log", defaultextension=".csv", filetypes=[("CSV", "*.csv"), ("JSON", "*.json"), ("All Files", "*.*")])
+        if file_path:
+            metrics.export(file_path)
+            print(f"Performance log exported to: {file_path}")
+            self.status_label.config(text="Performance log exported")
     
     def open_settings_dialog(self):
         print("Opening Settings Dialog...")
         messagebox.showinfo("Settings", "Settings dialog with multiple tabs would open.")
     
     # Stub functions for Debugger Menu
+    def tool_window(self, key, title, session=True):
+        # Debugger windows are built on first open and hidden when closed; reopening shows the
+        # same window. Session windows hold the running core's logs and go with end_emulation.
+        if key in self.tool_windows:
+            window, _ = self.tool_windows[key]
+            if window.winfo_exists():
+                window.deiconify()
+                window.lift()
+                on_show = getattr(window, "on_show", None)
+                if on_show is not None:
+                    on_show()
+                return None
+        window = tk.Toplevel(self.master)
+        window.title(title)
+        window.protocol("WM_DELETE_WINDOW", window.withdraw)
+        self.tool_windows[key] = (window, session)
+        return window
+    
+    def close_tool_windows(self):
+        for key, (window, session) in list(self.tool_windows.items()):
+            if session:
+                window.destroy()
+                del self.tool_windows[key]
+    
     def open_debugger_commands_window(self):
         print("Opening Debugger Commands Window...")
         messagebox.showinfo("Debugger", "Debugger Commands window would open.")
     
     def open_memory_viewer(self):
         print("Opening Memory Viewer...")
-        messagebox.showinfo("Memory Viewer", "Memory Viewer window would open.")
+        if not self.running:
+            messagebox.showinfo("Memory Viewer", "Start emulation to view memory.")
+            return
+        window = self.tool_window("memory_viewer", "Memory Viewer")
+        if window is None:
+            return
+        from memtools import hexdump
+        address_var = tk.StringVar(value="0x80000000")
+        tk.Entry(window, textvariable=address_var, width=12).grid(row=0, column=0, padx=5, pady=5)
+        text = tk.Text(window, width=76, height=16, font=("Courier", 10))
+        text.grid(row=1, column=0, columnspan=2, padx=5, pady=5)
+        
+        def show(lines):
+            text.delete("1.0", tk.END)
+            text.insert(tk.END, "\n".join(lines))
+        
+        def refresh():
+            if not self.running:
+                return
+            try:
+                address = int(address_var.get(), 0)
+            except ValueError:
+                messagebox.showerror("Memory Viewer", "Invalid address.")
+                return
+            self.query_core(lambda core: hexdump(core.rdram, address), show)
+        
+        tk.Button(window, text="Go / Refresh", command=refresh).grid(row=0, column=1, sticky="w")
+        window.on_show = refresh
+        refresh()
     
     def open_memory_search_tool(self):
         print("Opening Memory Search Tool...")
-        messagebox.showinfo("Memory Search", "Memory Search tool would open.")
+        if not self.running:
+            messagebox.showinfo("Memory Search", "Start emulation to search memory.")
+            return
+        window = self.tool_window("memory_search", "Memory Search")
+        if window is None:
+            return
+        from memtools import FILTERS, VALUE_TYPES, MemorySearch
+        type_var = tk.StringVar(value="32-bit")
+        value_var = tk.StringVar()
+        filter_var = tk.StringVar(value="exact")
+        tk.OptionMenu(window, type_var, *VALUE_TYPES).grid(row=0, column=0, padx=5, pady=5)
+        tk.Entry(window, textvariable=value_var, width=14).grid(row=0, column=1, padx=5)
+        tk.OptionMenu(window, filter_var, *FILTERS).grid(row=0, column=2, padx=5)
+        count_label = tk.Label(window, text="No search yet", anchor="w")
+        count_label.grid(row=2, column=0, columnspan=4, sticky="we", padx=5)
+        results = tk.Listbox(window, width=40, height=15, font=("Courier", 10))
+        results.grid(row=3, column=0, columnspan=4, padx=5, pady=5)
+        search = {"engine": None}
+        
+        def parse_value(first):
+            # Checked here so a bad value never reaches the scan running in the query callback
+            text = value_var.get().strip()
+            if not text:
+                if not first and filter_var.get() == "exact":
+                    raise ValueError("The exact filter needs a value.")
+                return None
+            try:
+                value = float(text) if type_var.get() == "float" else int(text, 0)
+            except ValueError:
+                raise ValueError("Invalid value.") from None
+            if type_var.get() == "float":
+                return value
+            limits = np.iinfo(VALUE_TYPES[type_var.get()])
+            if not limits.min <= value <= limits.max:
+                raise ValueError(f"{type_var.get()} values must be between {limits.min} and {limits.max}.")
+            return value
+        
+        def show(count, elapsed):
+            count_label.config(text=f"{count} results ({elapsed * 1000:.1f} ms)")
+            results.delete(0, tk.END)
+            fmt = "{:08X}  {:g}" if type_var.get() == "float" else "{:08X}  {:d}"
+            for address, value in search["engine"].results():
+                results.insert(tk.END, fmt.format(address, value))
+        
+        def scan(first):
+            if not self.running:
+                return
+            try:
+                value = parse_value(first)
+            except ValueError as e:
+                messagebox.showerror("Memory Search", str(e))
+                return
+            if first:
+                search["engine"] = MemorySearch(type_var.get())
+            elif search["engine"] is None:
+                return
+            engine = search["engine"]
+            
+            def run(snapshot):
+                start = time.perf_counter()
+                if first:
+                    count = engine.first_scan(snapshot, value)
+                else:
+                    count = engine.next_scan(snapshot, filter_var.get(), value)
+                show(count, time.perf_counter() - start)
+            
+            self.query_core(lambda core: core.rdram.copy(), run)
+        
+        tk.Button(window, text="First Scan", command=lambda: scan(True)).grid(row=1, column=0, pady=5)
+        tk.Button(window, text="Next Scan", command=lambda: scan(False)).grid(row=1, column=1, pady=5)
     
     def open_memory_dump_tool(self):
         print("Opening Memory Dump Tool...")
-        messagebox.showinfo("Memory Dump", "Memory Dump tool would open.")
+        if not self.running:
+            messagebox.showinfo("Memory Dump", "Start emulation to dump memory.")
+            return
+        window = self.tool_window("memory_dump", "Memory Dump")
+        if window is None:
+            return
+        from memtools import PeriodicDumper, dump_ranges, parse_ranges
+        ranges_var = tk.StringVar(value="0x80000000-0x80800000")
+        every_var = tk.StringVar(value="60")
+        keep_var = tk.StringVar(value="10")
+        tk.Label(window, text="Ranges:").grid(row=0, column=0, sticky="e", padx=5, pady=5)
+        tk.Entry(window, textvariable=ranges_var, width=40).grid(row=0, column=1, columnspan=3, padx=5)
+        tk.Label(window, text="Every N frames:").grid(row=1, column=0, sticky="e", padx=5)
+        tk.Entry(window, textvariable=every_var, width=8).grid(row=1, column=1, sticky="w")
+        tk.Label(window, text="Keep files:").grid(row=1, column=2, sticky="e")
+        tk.Entry(window, textvariable=keep_var, width=8).grid(row=1, column=3, sticky="w", padx=5)
+        
+        def ranges():
+            try:
+                return parse_ranges(ranges_var.get(), len(self.emu_thread.core.rdram))
+            except ValueError as e:
+                messagebox.showerror("Memory Dump", str(e))
+                return None
+        
+        def dump_now():
+            selected = ranges()
+            if selected is None or not self.running:
+                return
+            file_path = filedialog.asksaveasfilename(title="Dump Memory", defaultextension=".bin", filetypes=[("Binary Files", "*.bin"), ("All Files", "*.*")])
+            if not file_path:
+                return
+            outcome = []
+            
+            def write(buffer):
+                try:
+                    outcome.append(dump_ranges(buffer, [(0, len(buffer))], file_path))
+                except OSError as e:
+                    outcome.append(e)
+            
+            def report():
+                if not outcome:
+                    self.master.after(100, report)
+                elif isinstance(outcome[0], OSError):
+                    messagebox.showerror("Memory Dump", f"Could not write {file_path}: {outcome[0]}")
+                else:
+                    self.status_label.config(text=f"Dumped {outcome[0] // 1024} KB")
+            
+            def copied(buffer):
+                # Only the copy happens between frames; the file is written off both the emulation and Tk threads
+                threading.Thread(target=write, args=(buffer,), name="memdump", daemon=True).start()
+                report()
+            
+            self.query_core(lambda core: np.concatenate([core.rdram[start:end] for start, end in selected]), copied)
+        
+        def start_periodic():
+            selected = ranges()
+            if selected is None or not self.running:
+                return
+            directory = filedialog.askdirectory(title="Dump Directory")
+            if directory:
+                try:
+                    every, keep = int(every_var.get()), int(keep_var.get())
+                except ValueError:
+                    messagebox.showerror("Memory Dump", "Frame interval and file count must be numbers.")
+                    return
+                if every < 1 or keep < 1:
+                    messagebox.showerror("Memory Dump", "Frame interval and file count must be at least 1.")
+                    return
+                self.stop_periodic_dump()
+                self.periodic_dumper = PeriodicDumper(directory, selected, every, keep)
+                self.emu_thread.send("add_hook", self.periodic_dumper)
+                print(f"Dumping every {every} frames to {directory}, keeping {keep} files")
+                self.status_label.config(text="Periodic dump started")
+        
+        tk.Button(window, text="Dump Now...", command=dump_now).grid(row=2, column=0, pady=5)
+        tk.Button(window, text="Start Periodic...", command=start_periodic).grid(row=2, column=1, pady=5)
+        tk.Button(window, text="Stop Periodic", command=self.stop_periodic_dump).grid(row=2, column=2, pady=5)
+    
+    def stop_periodic_dump(self):
+        dumper = self.periodic_dumper
+        if dumper is None:
+            return
+        if self.running:
+            self.emu_thread.send("remove_hook", dumper)
+        dumper.close()  # the hook may still run once before remove_hook lands; a closed dumper ignores it
+        self.periodic_dumper = None
+        print(f"Periodic dump stopped: {dumper.written} written ({dumper.bytes_written >> 20} MB, "
+              f"{dumper.write_time * 1000 / max(dumper.written, 1):.1f} ms each), {dumper.skipped} skipped")
+        self.status_label.config(text="Periodic dump stopped")
     
     def open_symbol_manager(self):
         print("Opening Symbol Manager...")
-        messagebox.showinfo("Symbol Manager", "Symbol Manager would open.")
+        window = self.tool_window("symbols", "Symbol Manager", session=False)
+        if window is None:
+            return
+        from symbols import SymbolTable
+        info_label = tk.Label(window, anchor="w")
+        info_label.grid(row=0, column=0, columnspan=3, sticky="we", padx=5, pady=5)
+        query_var = tk.StringVar()
+        tk.Entry(window, textvariable=query_var, width=24).grid(row=1, column=0, padx=5)
+        result_label = tk.Label(window, text="", anchor="w", width=40)
+        result_label.grid(row=2, column=0, columnspan=3, sticky="we", padx=5, pady=5)
+        
+        def show_info():
+            if self.symbols is None:
+                info_label.config(text="No symbols loaded")
+            else:
+                source = "cache" if self.symbols.from_cache else "parsed"
+                info_label.config(text=f"{len(self.symbols)} symbols from {self.symbols.source} "
+                                       f"({source}, {self.symbols.load_time * 1000:.0f} ms)")
+        
+        def load():
+            file_path = filedialog.askopenfilename(title="Load Symbols", filetypes=[("Symbol Files", "*.sym *.map *.txt"), ("All Files", "*.*")])
+            if file_path:
+                try:
+                    self.symbols = SymbolTable.load(file_path)
+                except OSError as e:
+                    messagebox.showerror("Symbol Manager", f"Could not load symbols:\n{e}")
+                    return
+                print(f"Loaded {len(self.symbols)} symbols from {file_path}")
+                show_info()
+        
+        def lookup():
+            if self.symbols is None:
+                return
+            text = query_var.get().strip()
+            address = self.symbols.address_of(text)
+            if address is not None:
+                result_label.config(text=f"{text} = {address:08X}")
+                return
+            try:
+                result_label.config(text=self.symbols.format(int(text, 16)))
+            except ValueError:
+                result_label.config(text="Unknown symbol")
+        
+        tk.Button(window, text="Lookup", command=lookup).grid(row=1, column=1)
+        tk.Button(window, text="Load Symbols...", command=load).grid(row=1, column=2, padx=5)
+        show_info()
     
     def open_dma_log_window(self):
         print("Opening DMA Log Window...")
-        messagebox.showinfo("DMA Log", "DMA Log window would open.")
+        if not self.running:
+            messagebox.showinfo("DMA Log", "Start emulation to view DMA transfers.")
+            return
+        window = self.tool_window("dma_log", "DMA Log")
+        if window is None:
+            return
+        from tracelog import DMA_CHANNELS, format_record
+        log = self.emu_thread.core.dma_log
+        summary_label = tk.Label(window, anchor="w", justify=tk.LEFT, font=("Courier", 10))
+        summary_label.pack(fill=tk.X, padx=5, pady=5)
+        view = VirtualList(window, lambda: len(log),
+                           lambda start, n: [f"{frame:>8}  {channel}  {source:08X} -> {dest:08X}  {length:>8}"
+                                             for frame, channel, source, dest, length in log.rows(start, n)],
+                           height=15, width=60)
+        view.pack(fill="both", expand=True, padx=5, pady=5)
+        
+        def poll():
+            if not window.winfo_exists():
+                return
+            if not window.winfo_viewable():
+                window.after(500, poll)
+                return
+            per_frame = log.bytes_per_frame()
+            lines = ["Bytes/frame: " + "  ".join(f"{name} {per_frame[name]:.0f}" for name in DMA_CHANNELS),
+                     "Hottest ROM regions:"]
+            for address, size in log.hottest_rom_regions(5):
+                location = f" {self.symbols.format(address)}" if self.symbols is not None else ""
+                lines.append(f"  {address:08X}  {size:>10} bytes{location}")
+            summary_label.config(text="\n".join(lines))
+            view.refresh(follow=view.at_bottom())
+            window.after(500, poll)
+        
+        poll()
     
     def open_command_log_window(self):
         print("Opening Command Log Window...")
-        messagebox.showinfo("Command Log", "Command Log window would open.")
+        if not self.running:
+            messagebox.showinfo("Command Log", "Start emulation to trace commands.")
+            return
+        window = self.tool_window("command_log", "Command Log")
+        if window is None:
+            return
+        from tracelog import TraceRing, TraceWriter, format_record
+        if self.command_log is None:
+            self.command_log = TraceRing()
+        log = self.command_log
+        state = {"writer": None}
+        view = VirtualList(window, lambda: len(log),
+                           lambda start, n: [format_record(r, self.symbols) for r in log.rows(start, n)])
+        view.grid(row=1, column=0, columnspan=4, padx=5, pady=5)
+        
+        def set_tracing(enabled):
+            if self.running:
+                self.emu_thread.send("call", lambda core: setattr(core, "command_log", log if enabled else None))
+                self.status_label.config(text="Tracing started" if enabled else "Tracing stopped")
+        
+        def stream():
+            if state["writer"] is not None or not self.running:
+                return
+            file_path = filedialog.asksaveasfilename(title="Stream Trace To", defaultextension=".trace", filetypes=[("Trace Files", "*.trace"), ("All Files", "*.*")])
+            if file_path:
+                state["writer"] = TraceWriter(file_path)
+                self.emu_thread.send("call", lambda core: log.attach_writer(state["writer"]))
+                print(f"Streaming trace to {file_path}")
+        
+        def stop_stream():
+            writer = state["writer"]
+            if writer is None or not self.running:
+                return
+            state["writer"] = None
+            self.query_core(lambda core: log.detach_writer(),
+                            lambda w: print(f"Trace streaming to {writer.path} stopped "
+                                            f"({writer.dropped_blocks} blocks dropped)"))
+        
+        def poll():
+            if not window.winfo_exists():
+                return
+            if window.winfo_viewable():
+                view.refresh(follow=view.at_bottom())
+            window.after(250, poll)
+        
+        tk.Button(window, text="Start Trace", command=lambda: set_tracing(True)).grid(row=0, column=0, pady=5)
+        tk.Button(window, text="Stop Trace", command=lambda: set_tracing(False)).grid(row=0, column=1)
+        tk.Button(window, text="Stream to File...", command=stream).grid(row=0, column=2)
+        tk.Button(window, text="Stop Streaming", command=stop_stream).grid(row=0, column=3)
+        poll()
     
     def open_exceptions_window(self):
         print("Opening Exceptions Window...")
-        messagebox.showinfo("Exceptions", "Exceptions window would open.")
+        if not self.running:
+            messagebox.showinfo("Exceptions", "Start emulation to view exceptions.")
+            return
+        window = self.tool_window("exceptions", "Exceptions")
+        if window is None:
+            return
+        from tracelog import format_record
+        log = self.emu_thread.core.exception_log
+        view = VirtualList(window, lambda: len(log),
+                           lambda start, n: [format_record(r, self.symbols) for r in log.rows(start, n)], height=15)
+        view.pack(fill="both", expand=True, padx=5, pady=5)
+        
+        def poll():
+            if not window.winfo_exists():
+                return
+            if window.winfo_viewable():
+                view.refresh(follow=view.at_bottom())
+            window.after(500, poll)
+        
+        poll()
     
     def open_stack_window(self):
         print("Opening Stack Window...")
@@ -343,7 +1294,64 @@ class EmuAI:
     
     def open_script_console(self):
         print("Opening Script Console...")
-        messagebox.showinfo("Script Console", "Script console would open.")
+        if not self.running:
+            messagebox.showinfo("Script Console", "Start emulation to run scripts.")
+            return
+        window = self.tool_window("scripts", "Script Console")
+        if window is None:
+            return
+        if self.script_engine is None:
+            # scripting pulls in asyncio, so it is only imported once the console is opened
+            from scripting import ScriptEngine
+            # Scripts run on their own asyncio thread; the emulation thread only posts events to it
+            self.script_engine = ScriptEngine(self.emu_thread.core.rdram)
+            self.emu_thread.send("add_hook", self.script_engine)
+        engine = self.script_engine
+        output = tk.Text(window, width=90, height=20, font=("Courier", 10))
+        output.grid(row=0, column=0, columnspan=3, padx=5, pady=5)
+        line_var = tk.StringVar()
+        entry = tk.Entry(window, textvariable=line_var, width=80, font=("Courier", 10))
+        entry.grid(row=1, column=0, columnspan=3, padx=5, sticky="we")
+        stats_label = tk.Label(window, text="No hooks", anchor="w", justify=tk.LEFT)
+        stats_label.grid(row=3, column=0, columnspan=3, padx=5, pady=5, sticky="we")
+        
+        def run_line(event=None):
+            line = line_var.get()
+            if line.strip():
+                engine.execute(line)
+                line_var.set("")
+        
+        def load_script():
+            file_path = filedialog.askopenfilename(title="Load Script", filetypes=[("Python Scripts", "*.py"), ("All Files", "*.*")])
+            if not file_path:
+                return
+            try:
+                with open(file_path) as f:
+                    source = f.read()
+            except OSError as e:
+                messagebox.showerror("Script Console", f"Could not read script: {e}")
+                return
+            engine.run_script(source, os.path.basename(file_path))
+        
+        def poll():
+            if not window.winfo_exists() or engine is not self.script_engine:
+                return
+            lines = engine.drain_output()
+            if lines:
+                output.insert(tk.END, "\n".join(lines) + "\n")
+                output.see(tk.END)
+            if window.winfo_viewable():
+                rows = engine.stats()
+                stats_label.config(text=f"{len(rows)} hooks" + "".join(
+                    f"\n{r['hook']}: avg {r['avg_ms']:.2f} ms, worst {r['worst_ms']:.2f} ms, every {r['every']} frames"
+                    for r in rows[:3]))
+            window.after(200, poll)
+        
+        entry.bind("<Return>", run_line)
+        tk.Button(window, text="Load Script...", command=load_script).grid(row=2, column=0, pady=5)
+        tk.Button(window, text="Stop Scripts", command=engine.stop_scripts).grid(row=2, column=1)
+        tk.Button(window, text="Run", command=run_line).grid(row=2, column=2)
+        poll()
     
     # Stub functions for Help Menu
     def open_user_manual(self):
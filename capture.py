@@ -0,0 +1,147 @@
+"""Screenshots and PNG-sequence recordings encoded off the emulation thread."""
+import os
+import struct
+import threading
+import time
+import zlib
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import numpy as np
+
+SCREENSHOT_DIR = Path.home() / ".emuai" / "screenshots"
+RECORDING_DIR = Path.home() / ".emuai" / "recordings"
+CAPTURE_BUFFERS = 8  # framebuffer copies in flight before captures are dropped
+ENCODE_WORKERS = 2
+SCREENSHOT_LEVEL = 6  # zlib level; recordings favour speed
+RECORDING_LEVEL = 1
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+
+def _png_chunk(kind, data):
+    return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+
+
+def rgba5551_to_rgb(pixels):
+    """(h, w) RGBA5551 values -> (h, w, 3) uint8 RGB, expanding 5 bits to 8 like the VI does."""
+    pixels = pixels.astype(np.uint16)
+    rgb = np.empty(pixels.shape + (3,), dtype=np.uint8)
+    for channel, shift in enumerate((11, 6, 1)):
+        value = (pixels >> shift) & 0x1F
+        rgb[..., channel] = (value << 3) | (value >> 2)
+    return rgb
+
+
+def encode_png(rgb, level=SCREENSHOT_LEVEL):
+    """PNG bytes for an (h, w, 3) uint8 image; zlib releases the GIL, so encoders run in parallel."""
+    height, width, _ = rgb.shape
+    rows = np.empty((height, 1 + width * 3), dtype=np.uint8)
+    rows[:, 0] = 0  # filter type None on every scanline
+    rows[:, 1:] = rgb.reshape(height, width * 3)
+    header = struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)
+    return (PNG_SIGNATURE + _png_chunk(b"IHDR", header) +
+            _png_chunk(b"IDAT", zlib.compress(rows.tobytes(), level)) + _png_chunk(b"IEND", b""))
+
+
+class FrameCapture:
+    """Copies framebuffers into a fixed pool of buffers and encodes them to PNG on worker threads.
+
+    The emulation thread only pays for one copy of the framebuffer. When every buffer
+    is still queued for encoding the frame is dropped and counted rather than
+    waited for, so neither a burst of screenshots nor a recording can stall a frame.
+    Used as a frame hook it records every `every`-th frame into `directory`.
+    """
+
+    def __init__(self, directory, prefix="frame", every=1, level=RECORDING_LEVEL,
+                 buffers=CAPTURE_BUFFERS, workers=ENCODE_WORKERS):
+        self.directory = Path(directory)
+        self.prefix = prefix
+        self.every = every
+        self.level = level
+        self.buffers = buffers
+        self.captured = 0
+        self.encoded = 0
+        self.dropped = 0
+        self.failed = 0
+        self.bytes_written = 0
+        self.encode_time = 0.0
+        self.max_queue_depth = 0
+        self.last_path = None
+        self.started = time.perf_counter()
+        self.closed = False
+        self._free = deque()
+        self._allocated = False
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="capture")
+        os.makedirs(self.directory, exist_ok=True)
+
+    @property
+    def queue_depth(self):
+        return self.captured - self.encoded - self.failed
+
+    def __call__(self, core):
+        """Frame hook for EmulationThread."""
+        if core.frame % self.every == 0:
+            self.capture(core)
+
+    def capture(self, core, path=None):
+        """Queue the core's current framebuffer for encoding; returns False if it was dropped."""
+        if self.closed:
+            return False
+        source = core.framebuffer()
+        if not self._allocated:
+            self._free.extend(np.empty_like(source) for _ in range(self.buffers))
+            self._allocated = True
+        try:
+            buffer = self._free.pop()
+        except IndexError:
+            self.dropped += 1
+            return False
+        if buffer.shape != source.shape:
+            buffer = np.empty_like(source)  # the game changed resolution
+        np.copyto(buffer, source)
+        self.captured += 1
+        self.max_queue_depth = max(self.max_queue_depth, self.queue_depth)
+        path = path or self.directory / f"{self.prefix}-{core.frame:08d}.png"
+        self._executor.submit(self._encode, buffer, path)
+        return True
+
+    def _encode(self, buffer, path):
+        start = time.perf_counter()
+        try:
+            data = encode_png(rgba5551_to_rgb(buffer), self.level)
+            with open(path, "wb") as f:
+                f.write(data)
+        except OSError as e:
+            print(f"Capture failed: {e}")
+            with self._lock:
+                self.failed += 1
+            return
+        finally:
+            self._free.append(buffer)
+        with self._lock:
+            self.encoded += 1
+            self.bytes_written += len(data)
+            self.encode_time += time.perf_counter() - start
+            self.last_path = str(path)
+
+    def stats(self):
+        elapsed = time.perf_counter() - self.started
+        encoded = max(self.encoded, 1)
+        return {
+            "captured": self.captured,
+            "encoded": self.encoded,
+            "dropped": self.dropped,
+            "failed": self.failed,
+            "queue_depth": self.queue_depth,
+            "max_queue_depth": self.max_queue_depth,
+            "encode_ms": self.encode_time * 1000 / encoded,
+            "frames_per_sec": self.encoded / elapsed if elapsed else 0.0,
+            "mb_written": self.bytes_written / (1 << 20),
+        }
+
+    def close(self, wait=True):
+        """Stop accepting frames and finish encoding the queued ones."""
+        self.closed = True
+        self._executor.shutdown(wait=wait)
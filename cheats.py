@@ -0,0 +1,308 @@
+"""GameShark cheats: a CRC-indexed cheat database and code lists compiled into batched RDRAM writes."""
+import re
+import time
+from collections import namedtuple
+from pathlib import Path
+
+import numpy as np
+
+from emucore import RDRAM_SIZE
+
+# mupen64plus cheat file format; the user file comes first so its entries are listed first
+CHEAT_DB_PATHS = [
+    Path.home() / ".emuai" / "cheats.txt",
+    Path("/usr/share/games/mupen64plus/mupencheat.txt"),
+    Path("/usr/local/share/mupen64plus/mupencheat.txt"),
+    Path("/usr/share/mupen64plus/mupencheat.txt"),
+]
+GAME_LINE = re.compile(r"^crc ([0-9A-Fa-f]{8}-[0-9A-Fa-f]{8})", re.MULTILINE)
+CODE_LINE = re.compile(r"^([0-9A-Fa-f]{8})\s+([0-9A-Fa-f?]{4})(?:\s+(.*))?$")
+ADDRESS_MASK = RDRAM_SIZE - 1
+
+# Code types by the top byte of the address word
+WRITE_8 = (0x80, 0xA0)
+WRITE_16 = (0x81, 0xA1)
+BUTTON_8 = 0x88  # only written while the GS button is pressed
+BUTTON_16 = 0x89
+BOOT_8 = 0xF0  # written once before the game boots
+BOOT_16 = 0xF1
+IF_EQUAL_8 = 0xD0  # the next code applies only if the condition holds
+IF_EQUAL_16 = 0xD1
+IF_NOT_EQUAL_8 = 0xD2
+IF_NOT_EQUAL_16 = 0xD3
+REPEAT = 0x50  # 5000XXYY ZZZZ: repeat the next code XX times, address += YY, value += ZZZZ
+CONDITIONS = {IF_EQUAL_8: (False, True), IF_EQUAL_16: (True, True),
+              IF_NOT_EQUAL_8: (False, False), IF_NOT_EQUAL_16: (True, False)}  # (16-bit, equal)
+# Hardware settings of the real cartridge with nothing to do in RDRAM
+IGNORED_TYPES = (0xDE, 0xEE, 0xCC, 0xFF)
+
+Cheat = namedtuple("Cheat", "name description codes options")
+Cheat.__doc__ = """One named cheat: codes is a list of (address, value) strings, value possibly
+containing "?" digits that are filled in from one of options, a list of (value, label)."""
+
+
+def parse_code(text):
+    """(address, value) ints from "8033B21D 0064"; raises ValueError on anything else."""
+    match = CODE_LINE.match(text.strip())
+    if match is None or "?" in match.group(2):
+        raise ValueError(f"not a GameShark code: {text.strip()!r}")
+    return int(match.group(1), 16), int(match.group(2), 16)
+
+
+def parse_options(text):
+    """[(value, label)] from "00:Normal,01:Big"."""
+    options = []
+    for item in text.split(","):
+        value, _, label = item.partition(":")
+        if value.strip():
+            options.append((value.strip(), label.strip()))
+    return options
+
+
+def parse_game(block):
+    """(game name, [Cheat]) from one "crc ..." block of a mupen64plus cheat file."""
+    name = ""
+    cheats = []
+    current = None
+    for line in block.splitlines()[1:]:
+        line = line.strip()
+        if line.startswith("gn "):
+            name = line[3:].strip()
+        elif line.startswith("cn "):
+            current = Cheat(line[3:].strip(), "", [], [])
+            cheats.append(current)
+        elif line.startswith("cd ") and current is not None:
+            cheats[-1] = current = current._replace(description=line[3:].strip())
+        elif current is not None:
+            match = CODE_LINE.match(line)
+            if match:
+                current.codes.append((match.group(1), match.group(2)))
+                if match.group(3):
+                    current.options.extend(parse_options(match.group(3)))
+    return name, cheats
+
+
+def cheat_codes(cheat, option=0):
+    """(address, value) ints of a cheat with "?" digits filled from options[option]."""
+    codes = []
+    for address, value in cheat.codes:
+        if "?" in value:
+            if not cheat.options:
+                raise ValueError(f"{cheat.name}: {address} {value} needs an option")
+            fill = cheat.options[option][0]
+            digits = iter(fill[-value.count("?"):].rjust(value.count("?"), "0"))
+            value = "".join(next(digits) if c == "?" else c for c in value)
+        codes.append((int(address, 16), int(value, 16)))
+    return codes
+
+
+class CheatDatabase:
+    """Cheat files indexed by ROM CRC.
+
+    Loading only finds where each game's block starts, so even the full
+    mupencheat.txt is indexed in milliseconds; a game's cheats are parsed the first
+    time its CRC is looked up and kept from then on.
+    """
+
+    def __init__(self):
+        self.texts = []
+        self.blocks = {}  # "CRC1-CRC2" -> [(text index, start, end)]
+        self.games = {}  # "CRC1-CRC2" -> (name, [Cheat]), parsed on demand
+        self.sources = []
+        self.load_time = 0.0
+
+    @classmethod
+    def load(cls, paths=None):
+        """Index every readable cheat file in paths (default CHEAT_DB_PATHS)."""
+        db = cls()
+        start = time.perf_counter()
+        for path in CHEAT_DB_PATHS if paths is None else paths:
+            try:
+                with open(path, "r", errors="replace") as f:
+                    db.add_text(f.read())
+            except FileNotFoundError:
+                continue
+            except OSError as e:
+                print(f"Skipping cheat file {path}: {e}")
+                continue
+            db.sources.append(str(path))
+        db.load_time = time.perf_counter() - start
+        return db
+
+    def add_text(self, text):
+        index = len(self.texts)
+        self.texts.append(text)
+        starts = [(match.start(), match.group(1).upper()) for match in GAME_LINE.finditer(text)]
+        for i, (start, crc) in enumerate(starts):
+            end = starts[i + 1][0] if i + 1 < len(starts) else len(text)
+            self.blocks.setdefault(crc, []).append((index, start, end))
+            self.games.pop(crc, None)
+
+    def __len__(self):
+        return len(self.blocks)
+
+    def __contains__(self, crc):
+        return crc.upper() in self.blocks
+
+    def lookup(self, crc):
+        """(game name, [Cheat]) for a "CRC1-CRC2" string; ("", []) for an unknown game."""
+        crc = crc.upper()
+        game = self.games.get(crc)
+        if game is None:
+            name = ""
+            cheats = []
+            for index, start, end in self.blocks.get(crc, ()):
+                block_name, block_cheats = parse_game(self.texts[index][start:end])
+                name = name or block_name
+                cheats.extend(block_cheats)
+            game = self.games[crc] = (name, cheats)
+        return game
+
+
+def _layers(addresses, values, groups):
+    """Split writes into layers that each touch an address at most once.
+
+    Within one fancy-indexed assignment numpy doesn't define which of two writes to
+    the same byte wins, so the n-th write to an address goes into layer n and
+    layers are applied in order, which keeps "the last code wins".
+    """
+    count = len(addresses)
+    if not count:
+        return []
+    order = np.argsort(addresses, kind="stable")
+    ordered = addresses[order]
+    run_start = np.ones(count, dtype=bool)
+    run_start[1:] = ordered[1:] != ordered[:-1]
+    positions = np.arange(count)
+    rank = positions - np.maximum.accumulate(np.where(run_start, positions, 0))
+    layer = np.empty(count, dtype=np.intp)
+    layer[order] = rank
+    return [(addresses[layer == n], values[layer == n], groups[layer == n])
+            for n in range(int(layer.max()) + 1)]
+
+
+class CheatPlan:
+    """Codes compiled once into flat arrays grouped by code type.
+
+    Constant and conditional writes are split into bytes; every D0-D3 condition
+    guarding a write shares that write's group id. Each frame all conditions are
+    read from RDRAM in one gather, the groups whose conditions all hold are found
+    with a bincount of the failures, and the writes are applied as one scatter per
+    layer. Conditions see RDRAM as it was before this frame's writes, so a code
+    testing a value another code writes takes effect a frame later. GS button
+    codes are kept apart for press_button(); boot codes are written on the first
+    frame the plan runs and again whenever the game is reset to frame 1.
+    """
+
+    def __init__(self, code_lists):
+        writes = ([], [], [])  # byte address, byte value, group (-1: unconditional)
+        button = ([], [], [])
+        boot = ([], [], [])
+        conditions = ([], [], [], [], [])  # address, value, 16-bit, equal, group
+        self.skipped = []
+        self.code_count = 0
+        groups = 0
+        for codes in code_lists:
+            guards = []  # conditions waiting for the code they guard
+            repeat = None
+            for address, value in codes:
+                self.code_count += 1
+                kind = address >> 24
+                if kind in CONDITIONS:
+                    wide, equal = CONDITIONS[kind]
+                    guards.append((address & ADDRESS_MASK, value if wide else value & 0xFF, wide, equal))
+                    continue
+                if kind == REPEAT:
+                    repeat = (address >> 8 & 0xFF, address & 0xFF, value)
+                    continue
+                expanded = [(address, value)]
+                if repeat is not None:
+                    count, step, increment = repeat
+                    expanded = [(address + i * step, value + i * increment & 0xFFFF) for i in range(count)]
+                    repeat = None
+                group = -1
+                if kind in WRITE_8 + WRITE_16:
+                    target = writes
+                    if guards:
+                        group = groups
+                        groups += 1
+                        for guard in guards:
+                            for column, item in zip(conditions, guard + (group,)):
+                                column.append(item)
+                elif kind in (BUTTON_8, BUTTON_16):
+                    target = button
+                elif kind in (BOOT_8, BOOT_16):
+                    target = boot
+                else:
+                    if kind not in IGNORED_TYPES:
+                        self.skipped.append(f"{address:08X} {value:04X}")
+                    guards = []
+                    continue
+                guards = []
+                wide = kind in WRITE_16 + (BUTTON_16, BOOT_16)
+                for code_address, code_value in expanded:
+                    code_address &= ADDRESS_MASK
+                    data = ([(code_address, code_value >> 8 & 0xFF), (code_address + 1, code_value & 0xFF)]
+                            if wide else [(code_address, code_value & 0xFF)])
+                    for byte_address, byte in data:
+                        if byte_address < RDRAM_SIZE:
+                            target[0].append(byte_address)
+                            target[1].append(byte)
+                            target[2].append(group)
+
+        def arrays(target):
+            return (np.array(target[0], dtype=np.intp), np.array(target[1], dtype=np.uint8),
+                    np.array(target[2], dtype=np.intp))
+
+        self.layers = [layer + (bool((layer[2] >= 0).any()),) for layer in _layers(*arrays(writes))]
+        self.button = _layers(*arrays(button))
+        self.boot = _layers(*arrays(boot))
+        self.groups = groups
+        self.condition_address = np.array(conditions[0], dtype=np.intp)
+        self.condition_next = np.minimum(self.condition_address + 1, RDRAM_SIZE - 1)
+        self.condition_value = np.array(conditions[1], dtype=np.uint16)
+        self.condition_wide = np.array(conditions[2], dtype=bool)
+        self.condition_equal = np.array(conditions[3], dtype=bool)
+        self.condition_group = np.array(conditions[4], dtype=np.intp)
+        self._passed = np.ones(groups + 1, dtype=bool)  # the extra entry is group -1
+        self._booted = False
+        self.write_count = len(writes[0])
+
+    @classmethod
+    def from_cheats(cls, selected, custom=()):
+        """Compile [(Cheat, option index)] and custom (address, value) codes; no cheat's conditions guard another's."""
+        code_lists = [cheat_codes(cheat, option) for cheat, option in selected]
+        if custom:
+            code_lists.append(list(custom))
+        return cls(code_lists)
+
+    def __len__(self):
+        return self.code_count
+
+    def apply(self, rdram):
+        """Write every active constant and conditional code into rdram."""
+        if self.groups:
+            current = rdram[self.condition_address].astype(np.uint16)
+            current = np.where(self.condition_wide, current << 8 | rdram[self.condition_next], current)
+            failed = (current == self.condition_value) != self.condition_equal
+            self._passed[:-1] = np.bincount(self.condition_group[failed], minlength=self.groups) == 0
+        for addresses, values, groups, conditional in self.layers:
+            if conditional:
+                active = self._passed[groups]
+                rdram[addresses[active]] = values[active]
+            else:
+                rdram[addresses] = values
+
+    def __call__(self, core):
+        """Frame hook for EmulationThread."""
+        if not self._booted or core.frame == 1:
+            for addresses, values, _ in self.boot:
+                core.rdram[addresses] = values
+            self._booted = True
+        self.apply(core.rdram)
+
+    def press_button(self, core):
+        """Apply the GS button codes once, as a press of the cartridge's button does."""
+        for addresses, values, _ in self.button:
+            core.rdram[addresses] = values
+        return len(self.button) > 0
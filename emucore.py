@@ -0,0 +1,319 @@
+"""Emulation core state and the worker thread that runs it outside the Tk main loop."""
+import queue
+import threading
+import time
+from collections import deque, namedtuple
+
+import numpy as np
+
+from savestate import Snapshot
+from telemetry import FrameMetrics
+from tracelog import (CART_BASE, DMA_PI, EXCEPTION_CAPACITY, EXCEPTION_NMI, EXCEPTION_RESET, DmaLog,
+                      TraceRing, exception_flags)
+
+RDRAM_SIZE = 8 * 1024 * 1024
+CPU_CLOCK = 93750000
+RESET_VECTOR = 0xBFC00000
+BOOT_SEGMENT = slice(0x1000, 0x101000)  # first MB of code, copied to RDRAM by IPL3
+POLL_INTERVAL_MS = 16  # cadence of the Tk side polling the event queue
+# Framebuffer the VI scans out until VI_ORIGIN/VI_WIDTH are emulated: 320x240 RGBA5551
+DEFAULT_VI_ORIGIN = 0x00400000
+DEFAULT_VI_WIDTH = 320
+DEFAULT_VI_HEIGHT = 240
+
+PAL_REGIONS = {"Europe", "Germany", "France", "Italy", "Spain", "Australia",
+               "Netherlands", "Scandinavia", "Gateway 64 (PAL)"}
+
+PACING_MODES = ("exact", "unlimited", "fast_forward")
+FAST_FORWARD_SPEED = 3.0
+SPIN_MARGIN_MIN = 0.0002  # seconds before a deadline that sleeping hands over to spinning
+SPIN_MARGIN_MAX = 0.004
+SPIN_MARGIN_DECAY = 0.995  # per frame; the margin tracks the recent worst sleep overshoot
+
+EmuEvent = namedtuple("EmuEvent", "kind frame value")
+
+
+def vi_rate_for_region(region):
+    """VI interrupts per second for a region name from the ROM header."""
+    return 50 if region in PAL_REGIONS else 60
+
+
+class EmulationCore:
+    """Machine state for one loaded ROM.
+
+    The R4300i and RCP interpreters are not in place yet: reset performs the IPL3
+    boot copy and run_frame only advances the VI counter, so the threading and
+    tooling around the core can already be driven for real.
+    """
+
+    def __init__(self, rom_image, vi_rate=60):
+        self.rom = rom_image
+        self.vi_rate = vi_rate
+        self.rdram = np.zeros(RDRAM_SIZE, dtype=np.uint8)
+        self.frame = 0
+        self.cycles = 0
+        self.command_log = None  # TraceRing the interpreter records into while tracing
+        self.exception_log = TraceRing(EXCEPTION_CAPACITY)
+        self.dma_log = DmaLog()
+        self.vi_origin = DEFAULT_VI_ORIGIN
+        self.vi_width = DEFAULT_VI_WIDTH
+        self.vi_height = DEFAULT_VI_HEIGHT
+        self.reset(soft_reset=False)
+        self.boot_rdram = self.rdram.copy()  # base image that save state deltas are taken against
+
+    def reset(self, soft_reset=True):
+        code = EXCEPTION_NMI if soft_reset else EXCEPTION_RESET
+        self.exception_log.record(RESET_VECTOR, 0, self.cycles, exception_flags(code))
+        if not soft_reset:
+            self.rdram[:] = 0
+        boot = self.rom[BOOT_SEGMENT]
+        entry = int.from_bytes(self.rom[0x08:0x0C].tobytes(), "big") & (RDRAM_SIZE - 1)
+        size = min(len(boot), RDRAM_SIZE - entry)
+        self.rdram[entry:entry + size] = boot[:size]
+        self.frame = 0
+        self.dma_log.reset_frames()
+        self.dma_log.record(DMA_PI, CART_BASE + BOOT_SEGMENT.start, entry, size, self.frame)
+
+    def run_frame(self):
+        self.frame += 1
+        self.cycles += CPU_CLOCK // self.vi_rate
+
+    def framebuffer(self):
+        """View of the 16-bit big-endian RGBA5551 framebuffer in RDRAM, shaped (height, width)."""
+        size = self.vi_width * self.vi_height * 2
+        return self.rdram[self.vi_origin:self.vi_origin + size].view(">u2").reshape(self.vi_height, self.vi_width)
+
+    def memory_regions(self):
+        """Name -> array of every memory region that makes up a save state."""
+        return {"rdram": self.rdram}
+
+    def base_regions(self):
+        return {"rdram": self.boot_rdram}
+
+    def snapshot(self):
+        """Copy of the machine state; call between frames."""
+        return Snapshot(self.frame, {name: region.copy() for name, region in self.memory_regions().items()})
+
+    def restore(self, snapshot):
+        for name, region in self.memory_regions().items():
+            region[:] = snapshot.regions[name]
+        self.frame = snapshot.frame
+
+
+class FramePacer:
+    """Holds frames to the VI rate against absolute deadlines.
+
+    Each wait sleeps until `margin` before the deadline and then spins, yielding the
+    CPU, for the rest. The margin follows the largest recent oversleep, so an idle
+    host spins for a fraction of a millisecond per frame and a loaded one spins
+    longer instead of missing deadlines. Deadlines advance by a fixed period rather
+    than from the time a wait ended, so sleep error never accumulates into drift.
+    """
+
+    def __init__(self, vi_rate, mode="exact", speed=FAST_FORWARD_SPEED):
+        self.vi_rate = vi_rate
+        self.mode = mode
+        self.speed = speed
+        self.deadline = None
+        self.margin = SPIN_MARGIN_MIN
+        self.last_lateness = 0.0
+        self.waits = 0
+        self.sleep_time = 0.0
+        self.spin_time = 0.0
+
+    @property
+    def period(self):
+        if self.mode == "unlimited":
+            return 0.0
+        if self.mode == "fast_forward":
+            return 1.0 / (self.vi_rate * self.speed)
+        return 1.0 / self.vi_rate
+
+    def set_mode(self, mode, speed=None):
+        if mode not in PACING_MODES:
+            raise ValueError(f"unknown pacing mode {mode!r}")
+        self.mode = mode
+        if speed is not None:
+            self.speed = speed
+        self.reset()
+
+    def reset(self):
+        """Start pacing afresh from now, e.g. after a pause."""
+        self.deadline = None
+
+    def wait(self):
+        """Block until the next frame is due; returns how many frames were skipped to catch up."""
+        period = self.period
+        now = time.perf_counter()
+        if not period:
+            self.last_lateness = 0.0
+            return 0
+        if self.deadline is None:
+            self.deadline = now
+        self.deadline += period
+        remaining = self.deadline - now
+        if remaining < -period:
+            # Fell more than a frame behind; skip the missed VIs instead of racing to catch up
+            dropped = int(-remaining / period)
+            self.deadline = now
+            self.last_lateness = 0.0
+            return dropped
+        if remaining > self.margin:
+            target = self.deadline - self.margin
+            time.sleep(target - now)
+            woke = time.perf_counter()
+            self.sleep_time += woke - now
+            oversleep = woke - target
+            self.margin = min(SPIN_MARGIN_MAX, max(SPIN_MARGIN_MIN, oversleep * 1.5, self.margin * SPIN_MARGIN_DECAY))
+            now = woke
+        spin_start = now
+        while now < self.deadline:
+            time.sleep(0)
+            now = time.perf_counter()
+        self.spin_time += now - spin_start
+        self.last_lateness = now - self.deadline
+        self.waits += 1
+        return 0
+
+    def stats(self):
+        waited = self.sleep_time + self.spin_time
+        return {
+            "mode": self.mode,
+            "speed": self.speed if self.mode == "fast_forward" else 1.0,
+            "spin_margin_ms": self.margin * 1000,
+            "spin_percent": 100.0 * self.spin_time / waited if waited else 0.0,
+        }
+
+
+class EmulationThread(threading.Thread):
+    """Runs an EmulationCore one frame at a time on its own thread.
+
+    The GUI sends commands with send(); they are applied between frames, so pause,
+    resume, reset and stop take effect within one frame. Events flow back through a
+    deque that the GUI drains with poll_events() and that never blocks either side.
+    """
+
+    def __init__(self, core):
+        super().__init__(name="emulation", daemon=True)
+        self.core = core
+        self.commands = queue.SimpleQueue()
+        self.events = deque()
+        self.paused = False
+        self.frame_budget = 1.0 / core.vi_rate
+        self.pacer = FramePacer(core.vi_rate)
+        self.frames_run = 0
+        self.core_stalls = 0
+        self.longest_frame = 0.0
+        self.metrics = FrameMetrics()
+        self.rewind = None
+        self.frame_hooks = []  # callables run with the core after every frame
+        self._stopping = False
+
+    def send(self, command, *args):
+        self.commands.put((command, args))
+
+    def poll_events(self):
+        """Pop every pending event; safe to call from the Tk thread."""
+        events = []
+        while True:
+            try:
+                events.append(self.events.popleft())
+            except IndexError:
+                return events
+
+    def _post(self, kind, value=None):
+        self.events.append(EmuEvent(kind, self.core.frame, value))
+
+    def _run_command(self, command, args):
+        try:
+            self._handle(command, args)
+        except Exception as e:  # a failing query or call must not end emulation
+            self._post("error", f"{command} failed: {e!r}")
+
+    def _handle(self, command, args):
+        if command == "pause":
+            self.paused = True
+            self._post("paused")
+        elif command == "resume":
+            self.paused = False
+            self._post("resumed")
+        elif command == "reset":
+            self.core.reset(*args)
+            self._post("reset", args[0] if args else True)
+        elif command == "set_pacing":
+            self.pacer.set_mode(*args)
+            self._post("pacing", self.pacer.mode)
+        elif command == "set_rewind":
+            if self.rewind is not None:
+                self.rewind.close()
+            self.rewind = args[0]
+        elif command == "add_hook":
+            self.frame_hooks.append(args[0])
+        elif command == "remove_hook":
+            if args[0] in self.frame_hooks:
+                self.frame_hooks.remove(args[0])
+        elif command == "rewind":
+            if self.rewind is not None:
+                self._post("rewound", self.rewind.rewind(self.core, *args))
+        elif command == "query":
+            # Compute something from the core between frames and hand it back to the GUI
+            fn, callback = args
+            self._post("query", (callback, fn(self.core)))
+        elif command == "call":
+            # Run a function against the core at the frame boundary, e.g. to snapshot it
+            args[0](self.core)
+        elif command == "stop":
+            self._stopping = True
+
+    def run(self):
+        self._post("started")
+        self.pacer.reset()
+        cpu_mark = time.thread_time()
+        dropped = 0
+        while not self._stopping:
+            if self.paused:
+                # Block until the GUI says something; no spinning while paused
+                self._run_command(*self.commands.get())
+                self.pacer.reset()
+                continue
+            while True:
+                try:
+                    self._run_command(*self.commands.get_nowait())
+                except queue.Empty:
+                    break
+            if self._stopping or self.paused:
+                continue
+
+            start = time.perf_counter()
+            self.core.run_frame()
+            self.frames_run += 1
+            end = time.perf_counter()
+            elapsed = end - start
+            cpu_now = time.thread_time()
+            self.metrics.record(end, elapsed, cpu_now - cpu_mark, dropped, self.pacer.last_lateness)
+            cpu_mark = cpu_now
+            dropped = 0
+            if self.rewind is not None and self.core.frame % self.rewind.interval == 0:
+                self.rewind.capture(self.core)
+            for hook in list(self.frame_hooks):
+                try:
+                    hook(self.core)
+                except Exception as e:
+                    # Drop the broken hook (a plugin, cheats, a script engine) and keep running
+                    self.frame_hooks.remove(hook)
+                    self._post("error", f"frame hook {getattr(hook, '__name__', type(hook).__name__)} "
+                                        f"failed and was removed: {e!r}")
+            if elapsed > self.longest_frame:
+                self.longest_frame = elapsed
+            if elapsed > self.frame_budget:
+                self.core_stalls += 1
+                self._post("core_stall", elapsed)
+
+            dropped = self.pacer.wait()
+        if self.rewind is not None:
+            self.rewind.close()
+        self._post("stopped")
+
+    def stop(self, timeout=1.0):
+        self.send("stop")
+        self.join(timeout)
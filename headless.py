@@ -0,0 +1,190 @@
+"""Headless batch runner: emulate ROMs without the GUI and report throughput as JSON."""
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+from emucore import EmulationCore, vi_rate_for_region
+from romlibrary import HEADER_SIZE, iter_rom_files, load_rom, parse_rom_header
+from savestate import RewindBuffer
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+REPORT_VERSION = 1
+DEFAULT_FRAMES = 3600  # one minute of NTSC video
+FRAME_BUCKETS_MS = (0.1, 0.25, 0.5, 1.0, 2.0, 4.0, 8.0, 1000 / 60, 1000 / 30)  # histogram upper edges
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MB, or None where it can't be read."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    return peak / (1 << 20) if sys.platform == "darwin" else peak / 1024
+
+
+def frame_distribution(frame_times):
+    """Percentiles and a FRAME_BUCKETS_MS histogram of frame times given in seconds."""
+    ms = frame_times * 1000
+    p50, p90, p95, p99 = np.percentile(ms, (50, 90, 95, 99))
+    edges = (0.0,) + FRAME_BUCKETS_MS + (np.inf,)
+    counts, _ = np.histogram(ms, bins=edges)
+    return {
+        "min": float(ms.min()),
+        "mean": float(ms.mean()),
+        "p50": float(p50),
+        "p90": float(p90),
+        "p95": float(p95),
+        "p99": float(p99),
+        "max": float(ms.max()),
+        "histogram": [{"le_ms": round(edge, 3) if np.isfinite(edge) else None, "frames": int(count)}
+                      for edge, count in zip(edges[1:], counts)],
+    }
+
+
+def run_rom(path, frames=DEFAULT_FRAMES, rewind=False):
+    """Load the ROM at path, run `frames` frames as fast as possible and return a result dict.
+
+    With rewind=True snapshots are captured at the GUI's interval, so the numbers
+    include the cost the emulation thread pays for the rewind buffer.
+    """
+    load_start = time.perf_counter()
+    image = load_rom(path)
+    info = parse_rom_header(image[:HEADER_SIZE].tobytes())
+    core = EmulationCore(image, vi_rate_for_region(info["region"]))
+    load_time = time.perf_counter() - load_start
+    buffer = RewindBuffer() if rewind else None
+    frame_times = np.empty(frames)
+    cpu_start = time.process_time()
+    start = time.perf_counter()
+    try:
+        for i in range(frames):
+            frame_start = time.perf_counter()
+            core.run_frame()
+            if buffer is not None and core.frame % buffer.interval == 0:
+                buffer.capture(core)
+            frame_times[i] = time.perf_counter() - frame_start
+        elapsed = time.perf_counter() - start
+    finally:
+        if buffer is not None:
+            buffer.close()
+    return {
+        "path": os.path.abspath(path),
+        "name": info["name"],
+        "region": info["region"],
+        "crc": f"{info['crc1']:08X}-{info['crc2']:08X}",
+        "frames": frames,
+        "load_s": load_time,
+        "elapsed_s": elapsed,
+        "vi_per_sec": frames / elapsed if elapsed else None,
+        "realtime_factor": frames / elapsed / core.vi_rate if elapsed else None,
+        "cpu_s": time.process_time() - cpu_start,
+        "frame_ms": frame_distribution(frame_times),
+        "rewind": rewind,
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def run_batch(paths, frames=DEFAULT_FRAMES, workers=None, rewind=False, progress=print):
+    """Run every ROM in paths across a process pool; returns (results, failures).
+
+    Each worker process runs a single ROM, so its peak RSS belongs to that ROM alone.
+    """
+    results = []
+    failures = []
+    with ProcessPoolExecutor(max_workers=workers, max_tasks_per_child=1) as pool:
+        futures = {pool.submit(run_rom, path, frames, rewind): path for path in paths}
+        for future in as_completed(futures):
+            path = futures[future]
+            try:
+                result = future.result()
+            except Exception as e:  # a bad ROM must not take the whole batch down
+                failures.append({"path": os.path.abspath(path), "error": f"{type(e).__name__}: {e}"})
+                progress(f"FAILED {path}: {e}")
+                continue
+            results.append(result)
+            progress(f"{result['name']:<20} {result['vi_per_sec']:>12.0f} VI/s  "
+                     f"p99 {result['frame_ms']['p99']:.3f} ms  peak {result['peak_rss_mb'] or 0:.0f} MB")
+    results.sort(key=lambda r: r["path"])
+    return results, failures
+
+
+def build_report(results, failures, frames, elapsed, rewind=False):
+    vi_rates = [r["vi_per_sec"] for r in results if r["vi_per_sec"]]
+    return {
+        "version": REPORT_VERSION,
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "host": {
+            "platform": platform.platform(),
+            "machine": platform.machine(),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "cpu_count": os.cpu_count(),
+        },
+        "frames_per_rom": frames,
+        "rewind": rewind,
+        "elapsed_s": elapsed,
+        "summary": {
+            "roms": len(results),
+            "failed": len(failures),
+            "vi_per_sec_median": float(np.median(vi_rates)) if vi_rates else None,
+            "vi_per_sec_min": min(vi_rates, default=None),
+            "peak_rss_mb_max": max((r["peak_rss_mb"] for r in results if r["peak_rss_mb"] is not None),
+                                   default=None),
+        },
+        "results": results,
+        "failures": failures,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run ROMs without the GUI and report emulation throughput.")
+    parser.add_argument("path", help="ROM file, or a directory of ROMs to run across a process pool")
+    parser.add_argument("--frames", type=int, default=DEFAULT_FRAMES, help="frames to run per ROM")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(),
+                        help="processes for a ROM directory (default: number of CPUs)")
+    parser.add_argument("--rewind", action="store_true", help="capture rewind snapshots while running")
+    parser.add_argument("--report", help="write the JSON report here instead of stdout")
+    args = parser.parse_args()
+    if args.frames < 1:
+        parser.error("--frames must be at least 1")
+    if args.workers is not None and args.workers < 1:
+        parser.error("--workers must be at least 1")
+
+    start = time.perf_counter()
+    if os.path.isdir(args.path):
+        paths = sorted(entry.path for entry in iter_rom_files(args.path))
+        if not paths:
+            parser.error(f"no ROMs found below {args.path}")
+        print(f"Running {len(paths)} ROMs x {args.frames} frames on {args.workers} workers", file=sys.stderr)
+        results, failures = run_batch(paths, args.frames, args.workers, args.rewind,
+                                      progress=lambda line: print(line, file=sys.stderr))
+    else:
+        results, failures = [run_rom(args.path, args.frames, args.rewind)], []
+    report = build_report(results, failures, args.frames, time.perf_counter() - start, args.rewind)
+
+    text = json.dumps(report, indent=2)
+    if args.report:
+        tmp_path = args.report + ".tmp"
+        with open(tmp_path, "w") as f:
+            f.write(text + "\n")
+        os.replace(tmp_path, args.report)
+        summary = report["summary"]
+        print(f"{summary['roms']} ROMs ({summary['failed']} failed), median "
+              f"{summary['vi_per_sec_median'] or 0:.0f} VI/s; report written to {args.report}", file=sys.stderr)
+    else:
+        print(text)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
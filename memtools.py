@@ -0,0 +1,222 @@
+"""Debugger memory tools working on RDRAM snapshots."""
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+KSEG0 = 0x80000000  # virtual address RDRAM is shown at
+
+# N64 memory is big-endian; values are searched at their natural alignment
+VALUE_TYPES = {
+    "8-bit": np.dtype(">u1"),
+    "16-bit": np.dtype(">u2"),
+    "32-bit": np.dtype(">u4"),
+    "float": np.dtype(">f4"),
+}
+FILTERS = ("exact", "changed", "unchanged", "increased", "decreased")
+DUMP_BUFFERS = 2  # copies in flight before periodic dumps start being skipped
+
+
+class MemorySearch:
+    """Cheat-Engine style value search narrowed over successive RDRAM snapshots.
+
+    Candidates are kept as a uint32 array of element indices plus the values they
+    had in the last snapshot; until the first narrowing scan every element is a
+    candidate and nothing is materialized.
+    """
+
+    def __init__(self, value_type="32-bit", tolerance=1e-4):
+        self.dtype = VALUE_TYPES[value_type]
+        self.tolerance = tolerance
+        self.candidates = None  # None means "every element"
+        self.values = None
+        self.scans = 0
+
+    def _view(self, snapshot):
+        usable = len(snapshot) // self.dtype.itemsize * self.dtype.itemsize
+        return snapshot[:usable].view(self.dtype)
+
+    def _equal(self, values, value):
+        if self.dtype.kind == "f":
+            return np.abs(values - np.float32(value)) <= self.tolerance
+        return values == self.dtype.type(value)
+
+    def _match(self, new, old, mode, value):
+        if mode == "exact":
+            return self._equal(new, value)
+        if mode == "changed":
+            return new != old
+        if mode == "unchanged":
+            return new == old
+        if mode == "increased":
+            return new > old
+        if mode == "decreased":
+            return new < old
+        raise ValueError(f"unknown search filter {mode!r}")
+
+    def first_scan(self, snapshot, value=None):
+        """Start a search; with value=None every address is kept for later filters."""
+        view = self._view(snapshot)
+        if value is None:
+            self.candidates = None
+            self.values = view.copy()
+        else:
+            self.candidates = np.flatnonzero(self._equal(view, value)).astype(np.uint32)
+            self.values = view[self.candidates]
+        self.scans = 1
+        return self.count
+
+    def next_scan(self, snapshot, mode, value=None):
+        """Keep only candidates whose value in snapshot passes the filter."""
+        if self.values is None:
+            raise ValueError("no search in progress; run a first scan")
+        view = self._view(snapshot)
+        new = view.copy() if self.candidates is None else view[self.candidates]
+        mask = self._match(new, self.values, mode, value)
+        if self.candidates is None:
+            self.candidates = np.flatnonzero(mask).astype(np.uint32)
+        else:
+            self.candidates = self.candidates[mask]
+        self.values = new[mask]
+        self.scans += 1
+        return self.count
+
+    @property
+    def count(self):
+        if self.values is None:
+            return 0
+        return len(self.values)
+
+    def results(self, limit=100):
+        """[(virtual address, value)] for the first `limit` candidates."""
+        if self.values is None:
+            return []
+        indices = np.arange(min(limit, self.count)) if self.candidates is None else self.candidates[:limit]
+        addresses = KSEG0 + indices.astype(np.int64) * self.dtype.itemsize
+        return list(zip(addresses.tolist(), self.values[:limit].tolist()))
+
+
+def hexdump(snapshot, address, rows=16, width=16):
+    """Lines of "address: hex bytes  ascii" starting at a virtual or physical address."""
+    offset = (address & (len(snapshot) - 1)) & ~(width - 1)
+    lines = []
+    for row in range(rows):
+        start = offset + row * width
+        if start >= len(snapshot):
+            break
+        chunk = snapshot[start:start + width].tobytes()
+        text = "".join(chr(b) if 0x20 <= b < 0x7F else "." for b in chunk)
+        lines.append(f"{KSEG0 + start:08X}: {chunk.hex(' ').upper():<{width * 3}} {text}")
+    return lines
+
+
+def parse_ranges(text, memory_size):
+    """Parse "start-end, start-end" (virtual or physical, end exclusive) into physical ranges."""
+    ranges = []
+    for part in text.replace(" ", "").split(","):
+        if not part:
+            continue
+        start_text, sep, end_text = part.partition("-")
+        if not sep:
+            raise ValueError(f"range {part!r} is not start-end")
+        start = int(start_text, 0) & (memory_size - 1)
+        end = start + (int(end_text, 0) - int(start_text, 0))
+        if not 0 <= start < end <= memory_size:
+            raise ValueError(f"range {part!r} is outside memory")
+        ranges.append((start, end))
+    if not ranges:
+        ranges.append((0, memory_size))
+    return ranges
+
+
+def dump_ranges(memory, ranges, path):
+    """Write memory[start:end] for each range back to back into a memory-mapped file.
+
+    The data goes straight from the source array into the mapping; no intermediate
+    bytes object is ever built. Returns the number of bytes written.
+    """
+    total = sum(end - start for start, end in ranges)
+    out = np.memmap(path, dtype=np.uint8, mode="w+", shape=(total,))
+    position = 0
+    for start, end in ranges:
+        out[position:position + end - start] = memory[start:end]
+        position += end - start
+    out.flush()
+    del out
+    return total
+
+
+class PeriodicDumper:
+    """Dumps ranges every `every` frames, keeping only the newest `keep` files.
+
+    The emulation thread only copies the ranges into one of a few recycled buffers;
+    files are written on a background thread. If every buffer is still being written
+    the dump is skipped and counted instead of stalling the frame.
+    """
+
+    def __init__(self, directory, ranges, every=60, keep=10, prefix="rdram"):
+        if every < 1 or keep < 1:
+            raise ValueError(f"dump interval and file count must be positive, not {every} and {keep}")
+        self.directory = directory
+        self.ranges = ranges
+        self.every = every
+        self.keep = keep
+        self.prefix = prefix
+        self.files = deque()
+        self.written = 0
+        self.skipped = 0
+        self.bytes_written = 0
+        self.write_time = 0.0
+        size = sum(end - start for start, end in ranges)
+        self._free = deque(np.empty(size, dtype=np.uint8) for _ in range(DUMP_BUFFERS))
+        self._lock = threading.Lock()
+        self.closed = False
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="memdump")
+        os.makedirs(directory, exist_ok=True)
+
+    def __call__(self, core):
+        """Frame hook for EmulationThread."""
+        if self.closed or core.frame % self.every:
+            return
+        try:
+            buffer = self._free.pop()
+        except IndexError:
+            self.skipped += 1
+            return
+        position = 0
+        for start, end in self.ranges:
+            buffer[position:position + end - start] = core.rdram[start:end]
+            position += end - start
+        with self._lock:
+            if self.closed:
+                self._free.append(buffer)
+                return
+            self._executor.submit(self._write, buffer, core.frame)
+
+    def _write(self, buffer, frame):
+        start = time.perf_counter()
+        path = os.path.join(self.directory, f"{self.prefix}-{frame:08d}.bin")
+        try:
+            self.bytes_written += dump_ranges(buffer, [(0, len(buffer))], path)
+        except OSError as e:
+            print(f"Memory dump failed: {e}")
+            return
+        finally:
+            self._free.append(buffer)
+        with self._lock:
+            self.files.append(path)
+            while len(self.files) > self.keep:
+                try:
+                    os.remove(self.files.popleft())
+                except OSError:
+                    pass
+        self.written += 1
+        self.write_time += time.perf_counter() - start
+
+    def close(self):
+        with self._lock:
+            self.closed = True
+        self._executor.shutdown(wait=True)
@@ -0,0 +1,276 @@
+"""Run many headless emulator instances at once for ROM regression tests and collect one report."""
+import argparse
+import importlib.util
+import json
+import os
+import platform
+import queue
+import shutil
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from mupen_platform import detect_os
+from mupen_watcher import ProcessWatcher
+from romlibrary import iter_rom_files
+
+REPORT_VERSION = 1
+DEFAULT_FRAMES = 1800
+DEFAULT_TIMEOUT = 300.0  # seconds per job before the instance is killed
+KILL_GRACE = 5.0  # seconds between SIGTERM and SIGKILL for a timed-out instance
+FARM_SAMPLE_INTERVAL = 0.5
+INSTALLER_SCRIPT = Path(__file__).with_name("$EMUV0X.X.X.py")
+HEADLESS_SCRIPT = Path(__file__).with_name("headless.py")
+# Where the installer script puts the console front end on each OS
+MUPEN_BINARIES = {
+    "Windows": ["C:/Mupen64Plus/mupen64plus-ui-console.exe"],
+    "MacOS": ["/Applications/Mupen64Plus/mupen64plus"],
+    "Debian": ["/usr/games/mupen64plus", "/usr/local/mupen64plus/bin/mupen64plus"],
+}
+# No window, no audio, no speed limit; dummy plugins where a real one would need a display
+MUPEN_HEADLESS_ARGS = ["--noosd", "--nospeedlimit", "--gfx", "dummy", "--audio", "dummy", "--input", "dummy"]
+
+FarmJob = namedtuple("FarmJob", "rom frames timeout")
+
+
+def load_installer():
+    """Import the installer script, whose file name is not a valid module name."""
+    spec = importlib.util.spec_from_file_location("mupen_installer", INSTALLER_SCRIPT)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def find_mupen():
+    found = shutil.which("mupen64plus") or shutil.which("mupen64plus-ui-console")
+    if found:
+        return found
+    for candidate in MUPEN_BINARIES.get(detect_os(), []):
+        if os.path.exists(candidate):
+            return candidate
+    return None
+
+
+def provision():
+    """Path of the mupen64plus binary, installing it with the installer script if needed."""
+    binary = find_mupen()
+    if binary:
+        return binary
+    os_type = detect_os()
+    installers = {"Windows": "install_mupen_windows", "MacOS": "install_mupen_macos",
+                  "Debian": "install_mupen_debian"}
+    if os_type not in installers:
+        raise RuntimeError(f"mupen64plus is not installed and cannot be provisioned on {os_type}")
+    print(f"mupen64plus not found; provisioning for {os_type}...")
+    getattr(load_installer(), installers[os_type])()
+    binary = find_mupen()
+    if binary is None:
+        raise RuntimeError("mupen64plus is still missing after installation")
+    return binary
+
+
+def available_cores():
+    if hasattr(os, "sched_getaffinity"):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+class MupenRunner:
+    """Runs a ROM in the real mupen64plus console front end for a fixed number of frames."""
+
+    name = "mupen64plus"
+
+    def __init__(self, binary, extra_args=()):
+        self.binary = binary
+        self.extra_args = list(extra_args)
+
+    def command(self, job, workdir):
+        # --testshots makes the front end quit after the last listed frame
+        return ([self.binary] + MUPEN_HEADLESS_ARGS + self.extra_args +
+                ["--testshots", str(job.frames), "--sshotdir", str(workdir), job.rom])
+
+    def parse(self, job, workdir, elapsed):
+        # Includes start-up, so this is a lower bound on the emulation speed
+        return {"frames": job.frames, "vi_per_sec": job.frames / elapsed if elapsed else None}
+
+
+class HeadlessRunner:
+    """Runs a ROM through headless.py, which reports its own frame timings."""
+
+    name = "emuai"
+
+    def command(self, job, workdir):
+        return [sys.executable, str(HEADLESS_SCRIPT), job.rom, "--frames", str(job.frames),
+                "--report", str(Path(workdir) / "report.json")]
+
+    def parse(self, job, workdir, elapsed):
+        with open(Path(workdir) / "report.json") as f:
+            result = json.load(f)["results"][0]
+        return {"frames": result["frames"], "vi_per_sec": result["vi_per_sec"],
+                "frame_ms_p99": result["frame_ms"]["p99"], "name": result["name"]}
+
+
+class FarmScheduler:
+    """Bounded pool of emulator instances, one per CPU core, fed from a job queue.
+
+    Each slot owns a core: instances are pinned to it where the OS allows, so
+    concurrent runs don't migrate across each other's caches. A single
+    ProcessWatcher reports exits and samples CPU and RSS for every instance.
+    """
+
+    def __init__(self, runner, workers=None, cores=None):
+        self.runner = runner
+        cores = cores or available_cores()
+        self.workers = min(workers or len(cores), len(cores))
+        self.free_cores = queue.SimpleQueue()
+        for core in cores[:self.workers]:
+            self.free_cores.put(core)
+        self.watcher = ProcessWatcher(sample_interval=FARM_SAMPLE_INTERVAL)
+        self.results = []
+        self._lock = threading.Lock()
+
+    def _launch(self, command, core, **popen_kwargs):
+        """Start command pinned to core where the OS allows; returns (process, pinned)."""
+        if hasattr(os, "sched_setaffinity"):
+            try:
+                # Pinned between fork and exec, so the instance never starts on another core
+                return self.watcher.launch(command, preexec_fn=lambda: os.sched_setaffinity(0, {core}),
+                                           **popen_kwargs), True
+            except subprocess.SubprocessError:
+                pass  # the core is outside this process's allowed set
+        return self.watcher.launch(command, **popen_kwargs), False
+
+    def run_job(self, job):
+        core = self.free_cores.get()
+        workdir = tempfile.mkdtemp(prefix="emuai-farm-")
+        result = {"rom": os.path.abspath(job.rom), "runner": self.runner.name, "core": core}
+        try:
+            start = time.perf_counter()
+            with open(Path(workdir) / "output.log", "wb") as log:
+                proc, result["pinned"] = self._launch(self.runner.command(job, workdir), core, stdout=log,
+                                                      stderr=log, stdin=subprocess.DEVNULL)
+            code = proc.wait(job.timeout)
+            if not proc.exited.is_set():
+                result["status"] = "timeout"
+                self.watcher.stop(proc.pid)
+                if not proc.exited.wait(KILL_GRACE):
+                    self.watcher.stop(proc.pid, getattr(signal, "SIGKILL", signal.SIGTERM))
+                    proc.exited.wait(KILL_GRACE)
+            elif code != 0:
+                result["status"] = "crashed" if code is not None and code < 0 else "failed"
+            else:
+                result["status"] = "ok"
+            elapsed = time.perf_counter() - start
+            result.update(elapsed_s=elapsed, returncode=proc.returncode)
+            samples = list(proc.samples)
+            if samples:
+                result["peak_rss_mb"] = max(sample.rss_mb for sample in samples)
+                result["cpu_percent_mean"] = sum(sample.cpu_percent for sample in samples[1:]) / max(1, len(samples) - 1)
+            if result["status"] == "ok":
+                try:
+                    result.update(self.runner.parse(job, workdir, elapsed))
+                except (OSError, ValueError, KeyError, IndexError) as e:
+                    result.update(status="failed", error=f"unreadable result: {e}")
+            else:
+                with open(Path(workdir) / "output.log", "rb") as log:
+                    result["output_tail"] = log.read()[-2000:].decode(errors="replace")
+        except OSError as e:
+            result.update(status="failed", error=str(e))
+        finally:
+            self.free_cores.put(core)
+            shutil.rmtree(workdir, ignore_errors=True)
+        with self._lock:
+            self.results.append(result)
+            done = len(self.results)
+        vi = result.get("vi_per_sec")
+        print(f"[{done}] {result['status']:<8} core {core:>2}  "
+              f"{(f'{vi:.0f} VI/s' if vi else ''):>12}  {os.path.basename(job.rom)}", file=sys.stderr)
+        return result
+
+    def run(self, jobs):
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="farm") as pool:
+            list(pool.map(self.run_job, jobs))
+        elapsed = time.perf_counter() - start
+        self.watcher.close()
+        return self.report(elapsed)
+
+    def report(self, elapsed):
+        results = sorted(self.results, key=lambda r: r["rom"])
+        ok = [r for r in results if r["status"] == "ok"]
+        vi_rates = [r["vi_per_sec"] for r in ok if r.get("vi_per_sec")]
+        statuses = {}
+        for r in results:
+            statuses[r["status"]] = statuses.get(r["status"], 0) + 1
+        return {
+            "version": REPORT_VERSION,
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "host": {"platform": platform.platform(), "os": detect_os(), "cpu_count": os.cpu_count()},
+            "runner": self.runner.name,
+            "workers": self.workers,
+            "elapsed_s": elapsed,
+            "summary": {
+                "jobs": len(results),
+                "statuses": statuses,
+                "jobs_per_min": len(results) * 60 / elapsed if elapsed else None,
+                "avg_vi_per_sec": sum(vi_rates) / len(vi_rates) if vi_rates else None,
+                "total_vi_per_sec": sum(vi_rates) if vi_rates else None,
+            },
+            "results": results,
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a directory of ROMs across many headless emulator instances.")
+    parser.add_argument("roms", help="ROM file or directory")
+    parser.add_argument("--runner", choices=("mupen64plus", "emuai"), default="mupen64plus",
+                        help="emulator to run: the installed mupen64plus or EmuAI's headless core")
+    parser.add_argument("--frames", type=int, default=DEFAULT_FRAMES, help="frames to run per ROM")
+    parser.add_argument("--timeout", type=float, default=DEFAULT_TIMEOUT, help="seconds before a job is killed")
+    parser.add_argument("--workers", type=int, help="concurrent instances (default: one per available core)")
+    parser.add_argument("--repeat", type=int, default=1, help="run every ROM this many times")
+    parser.add_argument("--mupen-arg", action="append", default=[], help="extra argument for mupen64plus")
+    parser.add_argument("--report", help="write the JSON report here instead of stdout")
+    args = parser.parse_args()
+    for option in ("frames", "workers", "repeat"):
+        value = getattr(args, option)
+        if value is not None and value < 1:
+            parser.error(f"--{option} must be at least 1")
+    if args.timeout <= 0:
+        parser.error("--timeout must be positive")
+
+    if os.path.isdir(args.roms):
+        roms = sorted(entry.path for entry in iter_rom_files(args.roms))
+    else:
+        roms = [args.roms]
+    if not roms:
+        parser.error(f"no ROMs found in {args.roms}")
+    if args.runner == "mupen64plus":
+        runner = MupenRunner(provision(), args.mupen_arg)
+    else:
+        runner = HeadlessRunner()
+    jobs = [FarmJob(rom, args.frames, args.timeout) for rom in roms for _ in range(args.repeat)]
+
+    scheduler = FarmScheduler(runner, args.workers)
+    print(f"Running {len(jobs)} jobs on {scheduler.workers} workers with {runner.name}", file=sys.stderr)
+    report = scheduler.run(jobs)
+    summary = report["summary"]
+    print(f"{summary['jobs']} jobs {summary['statuses']} in {report['elapsed_s']:.1f}s, "
+          f"{summary['jobs_per_min']:.1f} jobs/min, avg {summary['avg_vi_per_sec'] or 0:.0f} VI/s", file=sys.stderr)
+    text = json.dumps(report, indent=2)
+    if args.report:
+        with open(args.report, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    return 0 if summary["statuses"].get("ok", 0) == summary["jobs"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
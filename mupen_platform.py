@@ -0,0 +1,92 @@
+"""Platform detection and Mupen64Plus process lookup shared by the installer scripts."""
+import functools
+import os
+import platform
+import subprocess
+
+PROCESS_NAME = "mupen64plus"
+PROC_DIR = "/proc"
+
+
+@functools.lru_cache(maxsize=None)
+def detect_os():
+    """Detect the operating system; the answer is computed once per process."""
+    os_name = platform.system()
+    if os_name == "Windows":
+        return "Windows"
+    elif os_name == "Darwin":
+        return "MacOS"
+    elif os_name == "Linux":
+        # Further distinguish Linux distros
+        if "chrome" in platform.uname().release.lower():
+            return "ChromeOS"
+        try:
+            with open("/etc/os-release", "r") as f:
+                for line in f:
+                    if line.startswith("ID="):
+                        distro = line.strip().split("=")[1].lower().strip('"')
+                        return {"debian": "Debian", "arch": "Arch"}.get(distro, "Linux (Unknown)")
+        except FileNotFoundError:
+            pass
+        return "Linux (Unknown)"
+    return "Unsupported"
+
+
+def _proc_cmdline(pid):
+    """Command line of a /proc process as one lowercase string, or None if it is gone or unreadable."""
+    try:
+        with open(f"{PROC_DIR}/{pid}/cmdline", "rb") as f:
+            return f.read().replace(b"\0", b" ").decode(errors="replace").lower()
+    except OSError:
+        return None
+
+
+def _find_proc(name):
+    # Same match as `pgrep -f`: the name anywhere in the full command line
+    own = os.getpid()
+    pids = []
+    with os.scandir(PROC_DIR) as it:
+        for entry in it:
+            if not entry.name.isdigit() or int(entry.name) == own:
+                continue
+            cmdline = _proc_cmdline(entry.name)
+            if cmdline and name in cmdline:
+                pids.append(int(entry.name))
+    return pids
+
+
+def _find_pgrep(name):
+    result = subprocess.run(["pgrep", "-f", name], capture_output=True, text=True)
+    return [int(pid) for pid in result.stdout.split() if int(pid) != os.getpid()]
+
+
+def _find_tasklist(name):
+    output = subprocess.run(["tasklist", "/FO", "CSV", "/NH"], capture_output=True, text=True).stdout
+    pids = []
+    for line in output.splitlines():
+        fields = [field.strip('"') for field in line.split('","')]
+        if len(fields) > 1 and name in fields[0].lower() and fields[1].isdigit():
+            pids.append(int(fields[1]))
+    return pids
+
+
+def find_processes(name=PROCESS_NAME):
+    """PIDs of running processes whose command line (image name on Windows) contains name.
+
+    On Linux this reads /proc directly; other platforms run pgrep or tasklist without a shell.
+    """
+    name = name.lower()
+    try:
+        if os.path.isdir(PROC_DIR) and detect_os() not in ("Windows", "MacOS"):
+            return _find_proc(name)
+        if detect_os() == "Windows":
+            return _find_tasklist(name)
+        return _find_pgrep(name)
+    except OSError as e:
+        print(f"Error checking processes: {e}")
+        return []
+
+
+def is_mupen_running():
+    """Check if Mupen64Plus is running."""
+    return bool(find_processes())
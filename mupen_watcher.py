@@ -0,0 +1,237 @@
+"""Event-driven supervision of mupen64plus processes: start, exit and crash events plus CPU/RSS samples."""
+import os
+import queue
+import selectors
+import signal
+import socket
+import subprocess
+import threading
+import time
+from collections import deque, namedtuple
+
+from mupen_platform import PROC_DIR, PROCESS_NAME, find_processes
+
+SAMPLE_INTERVAL = 1.0  # seconds between CPU/RSS samples of every watched process
+SAMPLE_HISTORY = 600  # samples kept per process
+FALLBACK_POLL_INTERVAL = 0.2  # liveness polling where pidfds are unavailable
+REQUESTED_SIGNALS = (signal.SIGTERM, signal.SIGINT, getattr(signal, "SIGKILL", signal.SIGTERM))
+
+ProcessEvent = namedtuple("ProcessEvent", "kind pid time value")  # started / exited / crashed
+ProcessSample = namedtuple("ProcessSample", "time cpu_percent rss_mb")
+
+try:
+    CLOCK_TICKS = os.sysconf("SC_CLK_TCK")
+    PAGE_SIZE = os.sysconf("SC_PAGE_SIZE")
+except (AttributeError, ValueError, OSError):  # Windows
+    CLOCK_TICKS = PAGE_SIZE = None
+
+
+def read_proc_stat(pid):
+    """(cpu seconds, rss bytes) of pid from /proc/<pid>/stat, or None if unavailable."""
+    if CLOCK_TICKS is None:
+        return None
+    try:
+        with open(f"{PROC_DIR}/{pid}/stat", "rb") as f:
+            data = f.read()
+    except OSError:
+        return None
+    # The command name may contain spaces and parentheses; the fields start after the last ')'
+    fields = data[data.rindex(b")") + 2:].split()
+    utime, stime, rss = int(fields[11]), int(fields[12]), int(fields[21])
+    return (utime + stime) / CLOCK_TICKS, rss * PAGE_SIZE
+
+
+class WatchedProcess:
+    def __init__(self, pid, popen=None):
+        self.pid = pid
+        self.popen = popen  # set when the watcher launched the process and can reap it
+        self.fd = None
+        self.started = time.time()
+        self.returncode = None
+        self.stop_requested = False
+        self.samples = deque(maxlen=SAMPLE_HISTORY)
+        self.exited = threading.Event()
+        self._last_cpu = None
+
+    @property
+    def latest(self):
+        return self.samples[-1] if self.samples else None
+
+    def wait(self, timeout=None):
+        """Block until the process has exited; returns its return code (None if unknown or still running)."""
+        self.exited.wait(timeout)
+        return self.returncode
+
+
+class ProcessWatcher:
+    """Supervises any number of processes from a single thread.
+
+    On Linux each process is watched through a pidfd registered with a selector, so
+    the thread sleeps until a process exits or the next sample is due; there is no
+    process-list polling. Elsewhere children are reaped with poll() and attached
+    processes are checked with signal 0 every FALLBACK_POLL_INTERVAL. Events go to a
+    deque drained with poll_events() and to the optional on_event callback, which
+    runs on the watcher thread.
+    """
+
+    def __init__(self, sample_interval=SAMPLE_INTERVAL, on_event=None):
+        self.sample_interval = sample_interval
+        self.on_event = on_event
+        self.events = deque()
+        self.processes = {}
+        self._pending = queue.SimpleQueue()
+        self._lock = threading.Lock()
+        self._selector = selectors.DefaultSelector()
+        # A socket pair rather than a pipe, so the wake-up also works with select() on Windows
+        self._wake_r, self._wake_w = socket.socketpair()
+        self._wake_w.setblocking(False)
+        self._selector.register(self._wake_r, selectors.EVENT_READ)
+        self._closing = False
+        self._thread = threading.Thread(target=self._run, name="process-watcher", daemon=True)
+        self._thread.start()
+
+    def _wake(self):
+        try:
+            self._wake_w.send(b"\0")
+        except BlockingIOError:
+            pass  # a wake-up is already pending
+
+    def _watch(self, proc):
+        with self._lock:
+            self.processes[proc.pid] = proc
+        self._pending.put(proc)
+        self._wake()
+        self._post("started", proc.pid)
+        return proc
+
+    def launch(self, args, **popen_kwargs):
+        """Start a process from an argument list and watch it."""
+        if isinstance(args, str):
+            args = [args]
+        popen = subprocess.Popen(args, **popen_kwargs)
+        return self._watch(WatchedProcess(popen.pid, popen))
+
+    def attach(self, pid):
+        """Watch a process this watcher did not start; its exit code is not available."""
+        with self._lock:
+            if pid in self.processes:
+                return self.processes[pid]
+        return self._watch(WatchedProcess(pid))
+
+    def attach_running(self, name=PROCESS_NAME):
+        """Attach to every running process matching name."""
+        return [self.attach(pid) for pid in find_processes(name)]
+
+    def stop(self, pid, sig=signal.SIGTERM):
+        proc = self.processes.get(pid)
+        if proc is None:
+            return
+        proc.stop_requested = True
+        try:
+            os.kill(pid, sig)
+        except ProcessLookupError:
+            pass
+
+    def poll_events(self):
+        events = []
+        while True:
+            try:
+                events.append(self.events.popleft())
+            except IndexError:
+                return events
+
+    def _post(self, kind, pid, value=None):
+        event = ProcessEvent(kind, pid, time.time(), value)
+        self.events.append(event)
+        if self.on_event is not None:
+            self.on_event(event)
+
+    def _register(self, proc):
+        pidfd_open = getattr(os, "pidfd_open", None)
+        if pidfd_open is None or proc.exited.is_set():
+            return
+        try:
+            proc.fd = pidfd_open(proc.pid)
+        except OSError:
+            return  # already gone, or the kernel has no pidfds; the fallback poll handles it
+        self._selector.register(proc.fd, selectors.EVENT_READ, proc)
+
+    def _alive(self, proc):
+        if proc.popen is not None:
+            return proc.popen.poll() is None
+        try:
+            os.kill(proc.pid, 0)
+        except ProcessLookupError:
+            return False
+        except PermissionError:
+            pass
+        return True
+
+    def _finish(self, proc):
+        if proc.fd is not None:
+            self._selector.unregister(proc.fd)
+            os.close(proc.fd)
+            proc.fd = None
+        if proc.popen is not None:
+            proc.returncode = proc.popen.wait()  # already exited: just reaps it
+        with self._lock:
+            self.processes.pop(proc.pid, None)
+        code = proc.returncode
+        crashed = code is not None and code != 0 and not (proc.stop_requested and -code in REQUESTED_SIGNALS)
+        proc.exited.set()
+        self._post("crashed" if crashed else "exited", proc.pid, code)
+
+    def _sample(self, proc, now):
+        stat = read_proc_stat(proc.pid)
+        if stat is None:
+            return
+        cpu, rss = stat
+        percent = 0.0
+        if proc._last_cpu is not None and now > proc._last_cpu[0]:
+            percent = 100.0 * (cpu - proc._last_cpu[1]) / (now - proc._last_cpu[0])
+        proc._last_cpu = (now, cpu)
+        proc.samples.append(ProcessSample(now, percent, rss / (1 << 20)))
+
+    def _run(self):
+        next_sample = time.monotonic()
+        while not self._closing:
+            while True:
+                try:
+                    self._register(self._pending.get_nowait())
+                except queue.Empty:
+                    break
+            with self._lock:
+                watched = list(self.processes.values())
+            now = time.monotonic()
+            timeout = None
+            if self.sample_interval and watched:
+                timeout = max(0.0, next_sample - now)
+            if any(proc.fd is None for proc in watched):
+                timeout = FALLBACK_POLL_INTERVAL if timeout is None else min(timeout, FALLBACK_POLL_INTERVAL)
+            for key, _ in self._selector.select(timeout):
+                if key.data is None:
+                    self._wake_r.recv(4096)
+                else:
+                    self._finish(key.data)
+            for proc in watched:
+                if proc.fd is None and not proc.exited.is_set() and not self._alive(proc):
+                    self._finish(proc)
+            now = time.monotonic()
+            if self.sample_interval and now >= next_sample:
+                with self._lock:
+                    watched = list(self.processes.values())
+                for proc in watched:
+                    self._sample(proc, now)
+                next_sample = now + self.sample_interval
+
+    def close(self):
+        """Stop watching; processes keep running."""
+        self._closing = True
+        self._wake()
+        self._thread.join()
+        for key in list(self._selector.get_map().values()):
+            if key.data is not None:
+                os.close(key.fd)
+        self._selector.close()
+        self._wake_r.close()
+        self._wake_w.close()
@@ -0,0 +1,175 @@
+"""Graphics, audio, controller and RSP plugins, discovered from metadata and imported on first use."""
+import importlib.util
+import json
+import sys
+import time
+from collections import namedtuple
+from pathlib import Path
+
+PLUGIN_KINDS = ("graphics", "audio", "controller", "rsp")
+PLUGIN_DIRS = [Path(__file__).with_name("plugins"), Path.home() / ".emuai" / "plugins"]
+MANIFEST_NAME = "plugin.json"  # {"kind": ..., "name": ..., "version": ..., "description": ...}
+ENTRY_POINT_GROUP = "emuai.{kind}"  # installed packages register "name = module" under emuai.graphics etc.
+DUMMY_PLUGIN = "Dummy"
+
+# source is the package directory for directory plugins, the module path for entry points,
+# and None for the built-in dummy that every kind falls back to
+PluginInfo = namedtuple("PluginInfo", "kind name version description source")
+
+
+def read_manifest(directory):
+    """PluginInfo from a plugin directory's manifest, or None if it has no valid one."""
+    try:
+        with open(Path(directory) / MANIFEST_NAME) as f:
+            manifest = json.load(f)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as e:
+        print(f"Ignoring plugin {directory}: unreadable {MANIFEST_NAME}: {e}")
+        return None
+    if manifest.get("kind") not in PLUGIN_KINDS or not manifest.get("name"):
+        print(f"Ignoring plugin {directory}: {MANIFEST_NAME} needs a name and a kind out of {PLUGIN_KINDS}")
+        return None
+    return PluginInfo(manifest["kind"], manifest["name"], str(manifest.get("version", "")),
+                      manifest.get("description", ""), str(directory))
+
+
+class PluginRegistry:
+    """Every plugin that can be selected, keyed by kind and name.
+
+    Discovery reads plugin.json manifests from PLUGIN_DIRS and the entry points of
+    installed packages, which only touches metadata; no plugin code runs until a
+    plugin is configured or emulation starts with it selected. A plugin module
+    may define configure(master) to show its settings, start(core) returning a
+    frame hook or None, and stop().
+    """
+
+    def __init__(self, plugin_dirs=PLUGIN_DIRS):
+        self.plugin_dirs = plugin_dirs
+        self.plugins = None  # kind -> {name: PluginInfo}, filled by discover()
+        self.selected = {}
+        self.modules = {}  # (kind, name) -> imported module, or None for the dummy
+        self.import_times = {}  # (kind, name) -> seconds the import took
+        self.discover_time = 0.0
+        self.start_errors = []  # why plugins were skipped by the last start()
+
+    def discover(self):
+        # importlib.metadata alone costs more to import than the rest of GUI start-up
+        from importlib import metadata
+        start = time.perf_counter()
+        plugins = {kind: {DUMMY_PLUGIN: PluginInfo(kind, DUMMY_PLUGIN, "", "No output", None)}
+                   for kind in PLUGIN_KINDS}
+        for kind in PLUGIN_KINDS:
+            for entry in metadata.entry_points(group=ENTRY_POINT_GROUP.format(kind=kind)):
+                version = entry.dist.version if entry.dist is not None else ""
+                plugins[kind][entry.name] = PluginInfo(kind, entry.name, version, "", entry.value)
+        for directory in self.plugin_dirs:
+            try:
+                candidates = sorted(Path(directory).iterdir())
+            except OSError:
+                continue
+            for candidate in candidates:
+                info = read_manifest(candidate) if candidate.is_dir() else None
+                if info is not None:
+                    plugins[info.kind][info.name] = info  # a user plugin shadows a bundled one
+        self.plugins = plugins
+        self.discover_time = time.perf_counter() - start
+        return plugins
+
+    def available(self, kind):
+        if self.plugins is None:
+            self.discover()
+        return list(self.plugins[kind].values())
+
+    def select(self, kind, name):
+        if self.plugins is None:
+            self.discover()
+        if name not in self.plugins[kind]:
+            raise ValueError(f"no {kind} plugin named {name!r}")
+        self.selected[kind] = name
+
+    def info(self, kind):
+        """The selected plugin of a kind: the user's choice, else the first real plugin, else the dummy."""
+        if self.plugins is None:
+            self.discover()
+        found = self.plugins[kind]
+        name = self.selected.get(kind)
+        if name not in found:
+            name = next((other for other in found if other != DUMMY_PLUGIN), DUMMY_PLUGIN)
+        return found[name]
+
+    def load(self, kind):
+        """Import the selected plugin of a kind once; None for the dummy. Raises RuntimeError if it fails."""
+        info = self.info(kind)
+        key = (kind, info.name)
+        if key in self.modules:
+            return self.modules[key]
+        start = time.perf_counter()
+        try:
+            module = self._import(info)
+        except Exception as e:  # a broken plugin must not take the emulator down
+            raise RuntimeError(f"could not load {kind} plugin {info.name}: {e}") from e
+        self.modules[key] = module
+        if module is not None:
+            self.import_times[key] = time.perf_counter() - start
+            print(f"Loaded {kind} plugin {info.name} in {self.import_times[key] * 1000:.1f} ms")
+        return module
+
+    def _import(self, info):
+        if info.source is None:
+            return None
+        source = Path(info.source)
+        if source.is_dir():
+            module_name = f"emuai_plugin_{info.kind}_{source.name}"
+            spec = importlib.util.spec_from_file_location(module_name, source / "__init__.py",
+                                                          submodule_search_locations=[str(source)])
+            module = importlib.util.module_from_spec(spec)
+            sys.modules[module_name] = module  # so the plugin's relative imports resolve
+            try:
+                spec.loader.exec_module(module)
+            except BaseException:
+                del sys.modules[module_name]
+                raise
+            return module
+        from importlib import metadata
+        return metadata.EntryPoint(info.name, info.source, ENTRY_POINT_GROUP.format(kind=info.kind)).load()
+
+    def configure(self, kind, master):
+        """Show the selected plugin's settings; False if it has none."""
+        module = self.load(kind)
+        if module is None or not hasattr(module, "configure"):
+            return False
+        module.configure(master)
+        return True
+
+    def start(self, core):
+        """Load every selected plugin for a new core; returns the frame hooks they asked for.
+
+        A plugin that fails to load or start is skipped and its error listed in start_errors.
+        """
+        hooks = []
+        self.start_errors = []
+        for kind in PLUGIN_KINDS:
+            try:
+                module = self.load(kind)
+            except RuntimeError as e:
+                self.start_errors.append(str(e))
+                continue
+            if module is None or not hasattr(module, "start"):
+                continue
+            try:
+                hook = module.start(core)
+            except Exception as e:  # a broken plugin must not take the emulator down
+                self.start_errors.append(f"{kind} plugin {self.info(kind).name} failed to start: {e}")
+                continue
+            if hook is not None:
+                hooks.append(hook)
+        return hooks
+
+    def stop(self):
+        for (kind, name), module in self.modules.items():
+            if module is not None and hasattr(module, "stop"):
+                try:
+                    module.stop()
+                except Exception as e:
+                    print(f"{kind} plugin {name} failed to stop: {e}")
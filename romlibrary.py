@@ -0,0 +1,375 @@
+"""ROM library scanner backed by an on-disk SQLite index of N64 header metadata."""
+import argparse
+import concurrent.futures
+import hashlib
+import mmap
+import os
+import sqlite3
+import time
+import weakref
+import zlib
+from collections import namedtuple
+from pathlib import Path
+
+import numpy as np
+
+ROM_EXTENSIONS = (".z64", ".v64", ".n64")
+CONFIG_DIR = Path.home() / ".emuai"
+LIBRARY_DB = CONFIG_DIR / "romlibrary.db"
+ROM_CACHE_DIR = CONFIG_DIR / "romcache"
+HEADER_SIZE = 0x40
+HASH_CHUNK = 1 << 20  # small enough to stay cache-resident across the three digests
+
+# First word of the header as it appears on disk for each dump layout
+BYTE_ORDERS = {
+    b"\x80\x37\x12\x40": "z64",  # big-endian (native)
+    b"\x37\x80\x40\x12": "v64",  # byte-swapped halfwords
+    b"\x40\x12\x37\x80": "n64",  # little-endian words
+}
+
+REGIONS = {
+    "A": "All", "B": "Brazil", "C": "China", "D": "Germany", "E": "USA",
+    "F": "France", "G": "Gateway 64 (NTSC)", "H": "Netherlands", "I": "Italy",
+    "J": "Japan", "K": "Korea", "L": "Gateway 64 (PAL)", "N": "Canada",
+    "P": "Europe", "S": "Spain", "U": "Australia", "W": "Scandinavia",
+    "X": "Europe", "Y": "Europe",
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS roms (
+    path TEXT PRIMARY KEY,
+    root TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    name TEXT,
+    crc1 INTEGER,
+    crc2 INTEGER,
+    region TEXT,
+    byte_order TEXT,
+    crc32 INTEGER,
+    md5 TEXT,
+    sha1 TEXT
+);
+CREATE INDEX IF NOT EXISTS roms_root ON roms (root);
+"""
+
+RomEntry = namedtuple("RomEntry", "path size name crc1 crc2 region byte_order crc32 md5 sha1")
+ScanResult = namedtuple("ScanResult", "total updated removed skipped elapsed hash_stats")
+RomHashes = namedtuple("RomHashes", "path size crc32 md5 sha1")
+
+# Word size and on-disk dtype whose byteswapped read yields z64 order
+SWAP_DTYPES = {"v64": ">u2", "n64": ">u4"}
+
+# Loaded ROM images, keyed by (path, size, mtime_ns); entries vanish once nobody holds the image
+_loaded_images = weakref.WeakValueDictionary()
+
+
+class HashStats(namedtuple("HashStats", "files bytes elapsed workers")):
+    """Throughput of one hashing run."""
+
+    @property
+    def files_per_sec(self):
+        return self.files / self.elapsed if self.elapsed else 0.0
+
+    @property
+    def mb_per_sec(self):
+        return self.bytes / (1 << 20) / self.elapsed if self.elapsed else 0.0
+
+    def __str__(self):
+        return (f"hashed {self.files} files ({self.bytes / (1 << 20):.1f} MB) in {self.elapsed:.2f}s "
+                f"with {self.workers} workers: {self.files_per_sec:.1f} files/s, {self.mb_per_sec:.1f} MB/s")
+
+
+def detect_byte_order(data):
+    """Return 'z64', 'v64' or 'n64' from the first header word, or None."""
+    return BYTE_ORDERS.get(bytes(data[:4]))
+
+
+def normalize_header(data, byte_order):
+    """Return a copy of a (small) header buffer in big-endian z64 layout."""
+    data = bytes(data)
+    if byte_order == "z64":
+        return data
+    out = bytearray(len(data))
+    if byte_order == "v64":
+        out[0::2] = data[1::2]
+        out[1::2] = data[0::2]
+    elif byte_order == "n64":
+        for i in range(4):
+            out[i::4] = data[3 - i::4]
+    return bytes(out)
+
+
+def parse_rom_header(data):
+    """Parse the first 0x40 bytes of a ROM, returning a dict or None if not a ROM."""
+    if len(data) < HEADER_SIZE:
+        return None
+    byte_order = detect_byte_order(data)
+    if byte_order is None:
+        return None
+    header = normalize_header(data[:HEADER_SIZE], byte_order)
+    country = chr(header[0x3E]) if 0x20 < header[0x3E] < 0x7F else "?"
+    return {
+        "name": header[0x20:0x34].decode("shift_jis", errors="replace").strip("\x00 "),
+        "crc1": int.from_bytes(header[0x10:0x14], "big"),
+        "crc2": int.from_bytes(header[0x14:0x18], "big"),
+        "region": REGIONS.get(country, "Unknown"),
+        "byte_order": byte_order,
+    }
+
+
+def iter_rom_files(directory):
+    """Yield os.DirEntry objects for every ROM file below directory."""
+    pending = [directory]
+    while pending:
+        try:
+            with os.scandir(pending.pop()) as it:
+                for entry in it:
+                    if entry.is_dir(follow_symlinks=False):
+                        pending.append(entry.path)
+                    elif entry.name.lower().endswith(ROM_EXTENSIONS):
+                        yield entry
+        except OSError as e:
+            print(f"Skipping unreadable directory: {e}")
+
+
+def hash_rom(path):
+    """CRC32/MD5/SHA1 of a ROM file, read through mmap so it is never copied into a bytes object."""
+    crc = 0
+    md5 = hashlib.md5()
+    sha1 = hashlib.sha1()
+    try:
+        with open(path, "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            if size:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm, memoryview(mm) as view:
+                    for offset in range(0, size, HASH_CHUNK):
+                        with view[offset:offset + HASH_CHUNK] as chunk:
+                            crc = zlib.crc32(chunk, crc)
+                            md5.update(chunk)
+                            sha1.update(chunk)
+    except (OSError, ValueError) as e:
+        print(f"Could not hash {path}: {e}")
+        return RomHashes(path, 0, None, None, None)
+    return RomHashes(path, size, crc, md5.hexdigest(), sha1.hexdigest())
+
+
+def hash_roms(paths, workers=None):
+    """Hash paths across a process pool; returns ({path: RomHashes}, HashStats)."""
+    workers = workers or os.cpu_count() or 1
+    start = time.perf_counter()
+    if workers == 1 or len(paths) < 2:
+        results = list(map(hash_rom, paths))
+    else:
+        # Looked up here: the process pool pulls in multiprocessing, which the GUI needs only once it scans
+        with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(hash_rom, paths, chunksize=4))
+    stats = HashStats(len(results), sum(r.size for r in results), time.perf_counter() - start, workers)
+    return {r.path: r for r in results}, stats
+
+
+def convert_to_z64(src_path, dest_path, byte_order):
+    """Write a big-endian copy of a .v64/.n64 dump to dest_path using vectorized NumPy byteswaps."""
+    swapped = np.dtype(SWAP_DTYPES[byte_order])
+    src = np.memmap(src_path, dtype=np.uint8, mode="r")
+    tmp_path = dest_path.with_suffix(".tmp")
+    dest = np.memmap(tmp_path, dtype=np.uint8, mode="w+", shape=src.shape)
+    words = len(src) // swapped.itemsize * swapped.itemsize
+    # Reading the source words big-endian and storing them native (little-endian) swaps each
+    # word while copying, in NumPy's buffered loop, without a full intermediate array.
+    dest[:words].view(swapped.newbyteorder("<"))[:] = src[:words].view(swapped)
+    dest[words:] = src[words:]
+    dest.flush()
+    del dest, src
+    os.replace(tmp_path, dest_path)
+
+
+def load_rom(path):
+    """Return the ROM at path as a read-only uint8 memmap in big-endian z64 layout.
+
+    .z64 dumps are mapped in place. .v64/.n64 dumps are converted once into ROM_CACHE_DIR
+    and mapped from there, so later loads cost only an mmap. Loading the same unchanged
+    file again while its image is alive returns the very same array.
+    """
+    st = os.stat(path)
+    key = (os.path.abspath(path), st.st_size, st.st_mtime_ns)
+    image = _loaded_images.get(key)
+    if image is not None:
+        return image
+    with open(path, "rb") as f:
+        byte_order = detect_byte_order(f.read(4))
+    if byte_order is None:
+        raise ValueError(f"{path} is not an N64 ROM")
+    if byte_order == "z64":
+        image = np.memmap(path, dtype=np.uint8, mode="r")
+    else:
+        path_hash = hashlib.sha1(key[0].encode()).hexdigest()
+        cache_path = ROM_CACHE_DIR / f"{path_hash}-{st.st_size}-{st.st_mtime_ns}.z64"
+        if not cache_path.exists():
+            ROM_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+            for stale in ROM_CACHE_DIR.glob(f"{path_hash}-*.z64"):
+                stale.unlink()
+            convert_to_z64(path, cache_path, byte_order)
+        image = np.memmap(cache_path, dtype=np.uint8, mode="r")
+    _loaded_images[key] = image
+    return image
+
+
+class RomIndex:
+    """Sort orders and a character/bigram index over ROM rows for the ROM browser.
+
+    Building it is meant for a background thread. Afterwards sorting is a lookup,
+    and a filter intersects the posting lists of the query's bigrams, so only the
+    few surviving rows ever get a substring test.
+    """
+
+    COLUMNS = ("name", "region", "crc", "file")
+
+    def __init__(self, entries):
+        self.entries = entries
+        self.rows = [
+            (entry.name or "?", entry.region or "", f"{entry.crc1 or 0:08X}-{entry.crc2 or 0:08X}",
+             os.path.basename(entry.path))
+            for entry in entries
+        ]
+        self.keys = ["\t".join(row).lower() for row in self.rows]
+        self.orders = {
+            column: np.array(sorted(range(len(self.rows)), key=lambda i, c=c: self.rows[i][c].lower()),
+                             dtype=np.int32)
+            for c, column in enumerate(self.COLUMNS)
+        }
+        postings = {}
+        for i, key in enumerate(self.keys):
+            for gram in set(key) | {key[j:j + 2] for j in range(len(key) - 1)}:
+                postings.setdefault(gram, []).append(i)
+        self.postings = {gram: np.array(rows, dtype=np.int32) for gram, rows in postings.items()}
+
+    def __len__(self):
+        return len(self.rows)
+
+    def matches(self, text):
+        """Sorted row indices whose key contains text."""
+        if len(text) <= 2:
+            return self.postings.get(text, np.empty(0, dtype=np.int32))
+        grams = sorted((self.postings.get(text[j:j + 2]) for j in range(len(text) - 1)),
+                       key=lambda rows: -1 if rows is None else len(rows))
+        if grams[0] is None:
+            return np.empty(0, dtype=np.int32)
+        candidates = grams[0]
+        for rows in grams[1:]:
+            candidates = np.intersect1d(candidates, rows, assume_unique=True)
+        keys = self.keys
+        return np.array([i for i in candidates.tolist() if text in keys[i]], dtype=np.int32)
+
+    def query(self, text="", sort="name", reverse=False):
+        """Indices of rows containing text (case-insensitive), in the requested order."""
+        text = text.strip().lower()
+        order = self.orders[sort]
+        if reverse:
+            order = order[::-1]
+        if not text:
+            return order
+        mask = np.zeros(len(self.rows), dtype=bool)
+        mask[self.matches(text)] = True
+        return order[mask[order]]
+
+
+class RomLibrary:
+    """Persistent ROM index; rescans only re-read files whose size or mtime changed."""
+
+    def __init__(self, db_path=LIBRARY_DB):
+        db_path = Path(db_path)
+        db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.db_path = db_path
+        self.conn = sqlite3.connect(str(db_path))
+        self.conn.executescript(SCHEMA)
+        columns = {row[1] for row in self.conn.execute("PRAGMA table_info(roms)")}
+        for column, kind in (("crc32", "INTEGER"), ("md5", "TEXT"), ("sha1", "TEXT")):
+            if column not in columns:
+                self.conn.execute(f"ALTER TABLE roms ADD COLUMN {column} {kind}")
+
+    def scan(self, directory, workers=None, hash_files=True):
+        """Walk directory once and bring the index up to date for it.
+
+        Only new or modified files are hashed, spread over `workers` processes.
+        """
+        start = time.perf_counter()
+        root = os.path.abspath(directory)
+        known = {
+            path: (size, mtime_ns)
+            for path, size, mtime_ns in self.conn.execute(
+                "SELECT path, size, mtime_ns FROM roms WHERE root = ?", (root,)
+            )
+        }
+        seen = set()
+        changed = []
+        skipped = 0
+        for entry in iter_rom_files(root):
+            try:
+                st = entry.stat()
+            except OSError:
+                continue
+            seen.add(entry.path)
+            if known.get(entry.path) == (st.st_size, st.st_mtime_ns):
+                continue
+            try:
+                with open(entry.path, "rb") as f:
+                    info = parse_rom_header(f.read(HEADER_SIZE))
+            except OSError:
+                info = None
+            if info is None:
+                skipped += 1
+                seen.discard(entry.path)
+                continue
+            changed.append((entry.path, root, st.st_size, st.st_mtime_ns, info["name"],
+                            info["crc1"], info["crc2"], info["region"], info["byte_order"]))
+        hash_stats = None
+        if hash_files and changed:
+            hashes, hash_stats = hash_roms([row[0] for row in changed], workers)
+            changed = [row + hashes[row[0]][2:] for row in changed]
+        else:
+            changed = [row + (None, None, None) for row in changed]
+        removed = [(path,) for path in known.keys() - seen]
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO roms VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", changed
+            )
+            self.conn.executemany("DELETE FROM roms WHERE path = ?", removed)
+        return ScanResult(len(seen), len(changed), len(removed), skipped,
+                          time.perf_counter() - start, hash_stats)
+
+    def roms(self, directory):
+        """Return the indexed ROMs below directory, sorted by internal name."""
+        rows = self.conn.execute(
+            "SELECT path, size, name, crc1, crc2, region, byte_order, crc32, md5, sha1 FROM roms"
+            " WHERE root = ? ORDER BY name COLLATE NOCASE",
+            (os.path.abspath(directory),),
+        )
+        return [RomEntry(*row) for row in rows]
+
+    def close(self):
+        self.conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Scan and hash a ROM directory into the EmuAI library index.")
+    parser.add_argument("directory", help="ROM directory to scan")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(),
+                        help="hashing processes (default: number of CPUs)")
+    parser.add_argument("--db", default=str(LIBRARY_DB), help="index database path")
+    parser.add_argument("--no-hash", action="store_true", help="only index header metadata")
+    args = parser.parse_args()
+
+    library = RomLibrary(args.db)
+    try:
+        result = library.scan(args.directory, workers=args.workers, hash_files=not args.no_hash)
+    finally:
+        library.close()
+    print(f"Scanned {result.total} ROMs in {result.elapsed:.3f}s "
+          f"({result.updated} updated, {result.removed} removed, {result.skipped} skipped)")
+    if result.hash_stats:
+        print(result.hash_stats)
+
+
+if __name__ == "__main__":
+    main()
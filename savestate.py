@@ -0,0 +1,336 @@
+"""Compressed save states stored as page-level deltas against the ROM's boot snapshot."""
+import json
+import os
+import struct
+import threading
+import time
+import zlib
+from collections import OrderedDict, deque, namedtuple
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+
+import numpy as np
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+try:
+    import lz4.frame
+except ImportError:
+    lz4 = None
+
+STATE_DIR = Path.home() / ".emuai" / "states"
+STATE_MAGIC = b"EMUS"
+STATE_VERSION = 1
+PAGE_SIZE = 4096
+SLOT_CACHE_SIZE = 4  # decoded snapshots kept in memory for instant quick-load
+REWIND_INTERVAL = 10  # frames between rewind snapshots
+REWIND_BUDGET = 64 * 1024 * 1024  # hard cap on rewind memory, including the live copy and XOR buffers
+REWIND_BUFFERS = 2  # XOR buffers waiting for or in compression; captures are skipped while all are busy
+
+Snapshot = namedtuple("Snapshot", "frame regions")
+StateReport = namedtuple("StateReport", "kind path pages size elapsed cached error", defaults=(None,))
+RewindEntry = namedtuple("RewindEntry", "frame regions nbytes")  # regions: name -> (pages, blob)
+
+
+def default_codec():
+    if zstandard is not None:
+        return "zstd"
+    if lz4 is not None:
+        return "lz4"
+    return "zlib"
+
+
+def compress(data, codec):
+    if codec == "zstd":
+        return zstandard.ZstdCompressor(level=3).compress(data)
+    if codec == "lz4":
+        return lz4.frame.compress(data)
+    return zlib.compress(data, 1)
+
+
+def decompress(data, codec):
+    if codec == "zstd":
+        if zstandard is None:
+            raise ValueError("state is zstd-compressed but the zstandard module is not installed")
+        return zstandard.ZstdDecompressor().decompress(data)
+    if codec == "lz4":
+        if lz4 is None:
+            raise ValueError("state is lz4-compressed but the lz4 module is not installed")
+        return lz4.frame.decompress(data)
+    return zlib.decompress(data)
+
+
+def _pages(region):
+    """View a region as rows of PAGE_SIZE bytes, compared 8 bytes at a time."""
+    return region.view(np.uint64).reshape(-1, PAGE_SIZE // 8)
+
+
+def diff_pages(region, base):
+    """Indices of pages in region that differ from base."""
+    return np.flatnonzero((_pages(region) != _pages(base)).any(axis=1)).astype(np.uint32)
+
+
+def encode_state(snapshot, base, codec=None):
+    """Serialize a Snapshot as changed pages per region, compressed as a single stream."""
+    codec = codec or default_codec()
+    header = {"version": STATE_VERSION, "frame": snapshot.frame, "codec": codec,
+              "page_size": PAGE_SIZE, "regions": []}
+    chunks = []
+    for name, region in snapshot.regions.items():
+        changed = diff_pages(region, base[name])
+        header["regions"].append({"name": name, "size": region.nbytes, "pages": len(changed)})
+        chunks.append(changed.tobytes())
+        chunks.append(_pages(region)[changed].tobytes())
+    meta = json.dumps(header).encode()
+    return STATE_MAGIC + struct.pack("<I", len(meta)) + meta + compress(b"".join(chunks), codec), header
+
+
+def decode_state(data, base):
+    """Rebuild a Snapshot from encode_state() output and the same base.
+
+    Raises ValueError for anything that isn't a complete state this version can read.
+    """
+    if data[:4] != STATE_MAGIC:
+        raise ValueError("not an EmuAI save state")
+    try:
+        (meta_len,) = struct.unpack_from("<I", data, 4)
+        header = json.loads(data[8:8 + meta_len])
+        version, page_size, codec = header["version"], header["page_size"], header["codec"]
+    except (struct.error, ValueError, KeyError, TypeError) as e:
+        raise ValueError(f"corrupt save state: {e}") from e
+    if version != STATE_VERSION or page_size != PAGE_SIZE:
+        raise ValueError(f"unsupported save state version {version}")
+    try:
+        body = decompress(data[8 + meta_len:], codec)
+    except ValueError:
+        raise  # the codec's module is missing
+    except Exception as e:  # zlib.error, zstandard.ZstdError, lz4's RuntimeError
+        raise ValueError(f"corrupt save state: {e}") from e
+    regions = {}
+    offset = 0
+    try:
+        for info in header["regions"]:
+            count = info["pages"]
+            changed = np.frombuffer(body, dtype=np.uint32, count=count, offset=offset)
+            offset += changed.nbytes
+            pages = np.frombuffer(body, dtype=np.uint64, count=count * PAGE_SIZE // 8, offset=offset)
+            offset += pages.nbytes
+            region = base[info["name"]].copy()
+            _pages(region)[changed] = pages.reshape(-1, PAGE_SIZE // 8)
+            regions[info["name"]] = region
+        return Snapshot(header["frame"], regions)
+    except (ValueError, KeyError, IndexError, TypeError) as e:
+        raise ValueError(f"corrupt save state: {e!r}") from e
+
+
+class SaveStateManager:
+    """Writes and reads save states for one ROM on a background thread.
+
+    Recently saved or loaded slots stay decoded in an LRU cache. Finished operations
+    are reported as StateReports in `reports`, which the GUI drains from its poll; a
+    save that fails is reported as "save_failed" and its slot dropped from the cache.
+    """
+
+    def __init__(self, rom_id, base, state_dir=STATE_DIR, cache_size=SLOT_CACHE_SIZE):
+        self.rom_id = rom_id
+        self.base = base
+        self.state_dir = Path(state_dir)
+        self.cache_size = cache_size
+        self.cache = OrderedDict()
+        self.reports = deque()
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="savestate")
+
+    def slot_path(self, slot):
+        return self.state_dir / f"{self.rom_id}.{slot.lower().replace(' ', '')}.state"
+
+    def _remember(self, path, snapshot):
+        with self._lock:
+            self.cache[path] = snapshot
+            self.cache.move_to_end(path)
+            while len(self.cache) > self.cache_size:
+                self.cache.popitem(last=False)
+
+    def save_async(self, path, snapshot):
+        """Queue snapshot (already copied off the core) to be encoded and written to path."""
+        path = str(path)
+        self._remember(path, snapshot)
+        future = self._executor.submit(self._save, path, snapshot)
+        future.add_done_callback(lambda future: self._saved(path, snapshot, future))
+        return future
+
+    def _saved(self, path, snapshot, future):
+        error = future.exception() if not future.cancelled() else None
+        if error is None:
+            return
+        # Without this the slot would still load from the cache although nothing is on disk
+        with self._lock:
+            if self.cache.get(path) is snapshot:
+                del self.cache[path]
+        self.reports.append(StateReport("save_failed", path, None, None, None, False, str(error)))
+
+    def _save(self, path, snapshot):
+        start = time.perf_counter()
+        data, header = encode_state(snapshot, self.base)
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp_path = path + ".tmp"
+        try:
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except OSError:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            raise
+        pages = sum(region["pages"] for region in header["regions"])
+        report = StateReport("save", path, pages, len(data), time.perf_counter() - start, False)
+        self.reports.append(report)
+        return report
+
+    def load_async(self, path):
+        """Future resolving to the Snapshot at path; already resolved for cached slots."""
+        path = str(path)
+        start = time.perf_counter()
+        with self._lock:
+            snapshot = self.cache.get(path)
+            if snapshot is not None:
+                self.cache.move_to_end(path)
+        if snapshot is None:
+            return self._executor.submit(self._load, path, start)
+        self.reports.append(StateReport("load", path, None, None, time.perf_counter() - start, True))
+        future = Future()
+        future.set_result(snapshot)
+        return future
+
+    def _load(self, path, start):
+        with open(path, "rb") as f:
+            data = f.read()
+        snapshot = decode_state(data, self.base)
+        self._remember(path, snapshot)
+        self.reports.append(StateReport("load", path, None, len(data), time.perf_counter() - start, False))
+        return snapshot
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+
+
+class RewindBuffer:
+    """Memory-bounded history of snapshots taken every `interval` frames.
+
+    Only the newest state is kept in full. Each older state is stored as the XOR of
+    its changed pages against the state after it, compressed, so stepping back is
+    "latest ^= delta" and evicting the oldest entry never touches the others.
+
+    The emulation thread only pays for one XOR and one copy per capture; finding the
+    changed pages and compressing them happens on a background thread. At most
+    REWIND_BUFFERS XOR buffers exist and they count against the budget; when the
+    background thread falls behind and all of them are queued, captures are skipped
+    rather than queued without bound.
+    """
+
+    def __init__(self, interval=REWIND_INTERVAL, budget=REWIND_BUDGET, codec=None):
+        self.interval = interval
+        self.budget = budget
+        self.codec = codec or ("lz4" if lz4 is not None else default_codec())
+        self.entries = deque()
+        self.latest = None
+        self.latest_frame = None
+        self.nbytes = 0
+        self.captures = 0
+        self.capture_time = 0.0
+        self.evicted = 0
+        self.skipped = 0
+        self.buffers = 0  # XOR buffers allocated so far, free or queued
+        self.buffer_bytes = 0
+        self._pending = deque()
+        self._free = deque()  # recycled XOR buffers, so captures don't fault in fresh pages
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="rewind")
+
+    def capture(self, core):
+        """Record the core's state; call from the emulation thread between frames."""
+        start = time.perf_counter()
+        regions = core.memory_regions()
+        if self.latest is None:
+            self.latest = {name: region.copy() for name, region in regions.items()}
+            self.nbytes = sum(region.nbytes for region in self.latest.values())
+        else:
+            while self._pending and self._pending[0].done():
+                self._pending.popleft()
+            try:
+                xors = self._free.pop()
+            except IndexError:
+                if self.buffers >= REWIND_BUFFERS:
+                    # Every buffer is still waiting for compression; latest stays as it
+                    # was, so the next capture's delta covers this one too
+                    self.skipped += 1
+                    return
+                xors = {name: np.empty_like(region) for name, region in regions.items()}
+                self.buffers += 1
+                self.buffer_bytes += sum(xor.nbytes for xor in xors.values())
+            for name, region in regions.items():
+                np.bitwise_xor(region.view(np.uint64), self.latest[name].view(np.uint64),
+                               out=xors[name].view(np.uint64))
+                np.copyto(self.latest[name], region)
+            self._pending.append(self._executor.submit(self._store, self.latest_frame, xors))
+        self.latest_frame = core.frame
+        self.captures += 1
+        self.capture_time += time.perf_counter() - start
+
+    def _store(self, frame, xors):
+        deltas = {}
+        size = 0
+        for name, xor in xors.items():
+            pages = _pages(xor)
+            changed = np.flatnonzero(pages.any(axis=1)).astype(np.uint32)
+            blob = compress(pages[changed].tobytes(), self.codec)
+            deltas[name] = (changed, blob)
+            size += changed.nbytes + len(blob)
+        self._free.append(xors)
+        self.entries.append(RewindEntry(frame, deltas, size))
+        self.nbytes += size
+        while self.entries and self.nbytes + self.buffer_bytes > self.budget:
+            self.nbytes -= self.entries.popleft().nbytes
+            self.evicted += 1
+
+    def flush(self):
+        """Wait for captures still being compressed."""
+        while self._pending:
+            self._pending.popleft().result()
+
+    def rewind(self, core, steps=1):
+        """Step the core back `steps` snapshots; returns the restored frame or None."""
+        if self.latest is None:
+            return None
+        self.flush()
+        for _ in range(steps):
+            if not self.entries:
+                break
+            entry = self.entries.pop()
+            self.nbytes -= entry.nbytes
+            for name, (changed, blob) in entry.regions.items():
+                xor = np.frombuffer(decompress(blob, self.codec), dtype=np.uint64)
+                _pages(self.latest[name])[changed] ^= xor.reshape(-1, PAGE_SIZE // 8)
+            self.latest_frame = entry.frame
+        for name, region in core.memory_regions().items():
+            region[:] = self.latest[name]
+        core.frame = self.latest_frame
+        return self.latest_frame
+
+    def stats(self):
+        captures = max(self.captures, 1)
+        return {
+            "snapshots": len(self.entries),
+            "frames_covered": len(self.entries) * self.interval,
+            "bytes": self.nbytes + self.buffer_bytes,
+            "evicted": self.evicted,
+            "skipped": self.skipped,
+            "capture_ms": self.capture_time * 1000 / captures,
+            "per_frame_ms": self.capture_time * 1000 / (captures * self.interval),
+        }
+
+    def close(self):
+        self._executor.shutdown(wait=True)
@@ -0,0 +1,626 @@
+"""User scripts driven by emulator events on an asyncio loop, with a time budget for every hook."""
+import asyncio
+import inspect
+import itertools
+import sys
+import threading
+import time
+import traceback
+import types
+from bisect import bisect_left, bisect_right
+from collections import deque, namedtuple
+
+import numpy as np
+
+from emucore import RDRAM_SIZE
+from memtools import KSEG0
+
+HOOK_BUDGET_MS = 2.0  # script time per hook per frame before the hook is throttled
+THROTTLE_MAX = 64  # a throttled hook runs every 2, 4, ... up to this many frames
+MAX_PENDING_FRAMES = 4  # frames queued for the script loop before the emulation thread stops posting
+MAX_CARRIED_HITS = 4096  # watch and breakpoint hits held while the script loop is behind
+GATHER_RUN_LIMIT = 4096  # watched runs up to this size are compared through one gather
+OUTPUT_LINES = 2000
+ADDRESS_MASK = RDRAM_SIZE - 1
+
+# frame / watch (address: first changed byte, value: its new value) / breakpoint (address: pc, value: cycle)
+ScriptEvent = namedtuple("ScriptEvent", "kind frame address value")
+
+
+class WatchIndex:
+    """Watched address ranges as an interval index.
+
+    The ends of every range cut the address space into elementary segments, and
+    each segment lists the ranges covering it in CSR arrays (offsets, members).
+    Any address, or a batch of them, maps to its watches with one searchsorted
+    however many ranges there are and however they overlap. The covered segments
+    also give the runs of watched bytes that changes() compares against a shadow
+    copy each frame. Adding or removing ranges only marks the index stale; it is
+    rebuilt once, on the next query.
+    """
+
+    def __init__(self):
+        self.ranges = {}  # watch id -> (start, end), physical, end exclusive
+        self.stale = True
+
+    def __len__(self):
+        return len(self.ranges)
+
+    def add(self, watch_id, start, end):
+        if not 0 <= start < end <= RDRAM_SIZE:
+            raise ValueError(f"watch {start:#x}-{end:#x} is outside RDRAM")
+        self.ranges[watch_id] = (start, end)
+        self.stale = True
+
+    def remove(self, watch_id):
+        if self.ranges.pop(watch_id, None) is not None:
+            self.stale = True
+
+    def _build(self):
+        self.stale = False
+        self._shadow = None
+        if not self.ranges:
+            self._bound_list = []
+            self._offset_list = [0]
+            self.bounds = np.zeros(0, dtype=np.int64)
+            self.offsets = np.zeros(1, dtype=np.intp)
+            self.members = np.zeros(0, dtype=np.int64)
+            self.gather = np.zeros(0, dtype=np.intp)
+            self.large_runs = []
+            return
+        ids = np.fromiter(self.ranges, dtype=np.int64, count=len(self.ranges))
+        spans = np.array(list(self.ranges.values()), dtype=np.int64)
+        starts, ends = spans[:, 0], spans[:, 1]
+        bounds = np.unique(np.concatenate((starts, ends)))
+        first = np.searchsorted(bounds, starts)
+        lengths = np.searchsorted(bounds, ends) - first
+        # Segment numbers first..first+length-1 of every range, as one flat array
+        segments = np.repeat(first - np.cumsum(lengths) + lengths, lengths) + np.arange(lengths.sum())
+        self.members = np.repeat(ids, lengths)[np.argsort(segments, kind="stable")]
+        counts = np.bincount(segments, minlength=len(bounds) - 1)
+        self.offsets = np.concatenate(([0], np.cumsum(counts)))
+        self.bounds = bounds
+        self._bound_list = bounds.tolist()  # bisect beats numpy on one address at a time
+        self._offset_list = self.offsets.tolist()
+        edges = np.diff(np.concatenate(([0], (counts > 0).astype(np.int8), [0])))
+        run_starts, run_ends = bounds[edges == 1], bounds[np.flatnonzero(edges == -1)]
+        large = run_ends - run_starts > GATHER_RUN_LIMIT
+        self.large_runs = list(zip(run_starts[large].tolist(), run_ends[large].tolist()))
+        lengths = (run_ends - run_starts)[~large]
+        self.gather = np.repeat(run_starts[~large] - np.cumsum(lengths) + lengths, lengths) + np.arange(lengths.sum())
+
+    def lookup(self, address, size=1):
+        """Ids of the watches overlapping address..address+size; the check to run on every store."""
+        if self.stale:
+            self._build()
+        low = max(bisect_right(self._bound_list, address) - 1, 0)
+        high = min(bisect_left(self._bound_list, address + size), len(self._bound_list) - 1)
+        if low >= high or self._offset_list[low] == self._offset_list[high]:
+            return set()
+        return set(self.members[self._offset_list[low]:self._offset_list[high]].tolist())
+
+    def lookup_many(self, addresses):
+        """(index into addresses, watch id) pairs for every watch covering each address."""
+        if self.stale:
+            self._build()
+        segments = np.searchsorted(self.bounds, addresses, side="right") - 1
+        inside = np.flatnonzero((segments >= 0) & (segments < len(self.bounds) - 1))
+        segments = segments[inside]
+        starts = self.offsets[segments]
+        counts = self.offsets[segments + 1] - starts
+        picks = np.repeat(starts - np.cumsum(counts) + counts, counts) + np.arange(counts.sum())
+        return np.repeat(inside, counts), self.members[picks]
+
+    def changes(self, memory):
+        """Watched addresses whose byte differs from the previous call; the first call sets the baseline."""
+        if self.stale:
+            self._build()
+        gathered = memory[self.gather]
+        if self._shadow is None:
+            self._shadow = (gathered, [memory[start:end].copy() for start, end in self.large_runs])
+            return np.zeros(0, dtype=np.intp)
+        small, large = self._shadow
+        changed = [self.gather[np.flatnonzero(gathered != small)]]
+        for (start, end), old in zip(self.large_runs, large):
+            current = memory[start:end]
+            offsets = np.flatnonzero(current != old)
+            if offsets.size:
+                old[offsets] = current[offsets]
+                changed.append(offsets + start)
+        self._shadow = (gathered, large)
+        return np.concatenate(changed) if len(changed) > 1 else changed[0]
+
+
+class ScriptHook:
+    """One subscription of a script, with the time its handler has used."""
+
+    def __init__(self, hook_id, script, kind, handler, budget_ms, target=None, ledger=None):
+        self.id = hook_id
+        self.script = script
+        self.kind = kind
+        self.handler = handler
+        self.budget = budget_ms / 1000
+        self.target = target  # watched range or breakpoint address
+        self.active = True
+        self.interval = 1  # runs on every interval-th frame while throttled
+        self.task = None  # the running coroutine of an async handler
+        self.calls = 0
+        self.skipped = 0
+        self.overruns = 0
+        self.total_time = 0.0
+        self.worst = 0.0
+        self.spent = 0.0  # this frame
+        self.ledger = set() if ledger is None else ledger  # hooks charged this frame, shared per engine
+
+    def charge(self, seconds):
+        self.spent += seconds
+        self.total_time += seconds
+        self.ledger.add(self)
+
+    def describe(self):
+        name = getattr(self.handler, "__name__", "handler")
+        target = ""
+        if isinstance(self.target, tuple):
+            target = f" {KSEG0 + self.target[0]:08X}-{KSEG0 + self.target[1]:08X}"
+        elif self.target is not None:
+            target = f" {self.target:08X}"
+        return f"{self.script.name}: {self.kind}{target} {name}"
+
+
+def script_traceback(error):
+    """Traceback lines of error without the engine's own frames."""
+    trace = traceback.TracebackException.from_exception(error)
+    trace.stack = traceback.StackSummary.from_list([frame for frame in trace.stack if frame.filename != __file__])
+    return "".join(trace.format()).rstrip().splitlines()
+
+
+@types.coroutine
+def _timed_steps(coro, hook):
+    # Runs coro step by step so the time of each step is charged to hook
+    value = error = None
+    while True:
+        start = time.perf_counter()
+        try:
+            yielded = coro.send(value) if error is None else coro.throw(error)
+        except StopIteration as stop:
+            return stop.value
+        finally:
+            hook.charge(time.perf_counter() - start)
+        value = error = None
+        try:
+            value = yield yielded
+        except BaseException as e:
+            error = e
+
+
+def _takes_argument(fn):
+    try:
+        parameters = inspect.signature(fn).parameters.values()
+    except (TypeError, ValueError):
+        return False
+    return any(p.kind in (p.POSITIONAL_ONLY, p.POSITIONAL_OR_KEYWORD, p.VAR_POSITIONAL) for p in parameters)
+
+
+async def _timed(coro, hook):
+    try:
+        return await _timed_steps(coro, hook)
+    except (KeyboardInterrupt, SystemExit) as e:
+        # asyncio re-raises these out of run_forever, which would end the scripts thread
+        raise RuntimeError(f"script raised {type(e).__name__}") from e
+
+
+class ScriptAPI:
+    """The `emu` object a script sees. Methods run on the script loop."""
+
+    def __init__(self, engine, script):
+        self._engine = engine
+        self._script = script
+        self.name = script.name
+
+    def on_frame(self, handler, budget_ms=HOOK_BUDGET_MS):
+        """Call handler(event) after every frame; handler may be a coroutine function."""
+        return self._engine._add_hook(self._script, "frame", handler, budget_ms)
+
+    def watch(self, address, size, handler, budget_ms=HOOK_BUDGET_MS):
+        """Call handler(event) on frames where a byte in address..address+size changed."""
+        start = address & ADDRESS_MASK
+        if not 0 < size <= RDRAM_SIZE - start:
+            raise ValueError(f"watch of {size} bytes at {address:#x} is outside RDRAM")
+        hook = self._engine._add_hook(self._script, "watch", handler, budget_ms, (start, start + size))
+        self._engine._emulation_call(lambda core: self._engine.watches.add(hook.id, start, start + size))
+        return hook
+
+    def breakpoint(self, pc, handler, budget_ms=HOOK_BUDGET_MS):
+        """Call handler(event) when the traced CPU executes pc.
+
+        Hits are found in the command trace, so they need tracing on; the core's
+        interpreter doesn't record PCs yet, so until it does breakpoints never fire.
+        """
+        hook = self._engine._add_hook(self._script, "breakpoint", handler, budget_ms, pc & 0xFFFFFFFF)
+        self._engine._update_breakpoints()
+        return hook
+
+    def remove(self, hook):
+        self._engine._remove_hook(hook)
+
+    def frame(self):
+        """Future for the end of the next frame this script is allowed to see."""
+        future = self._engine.loop.create_future()
+        self._engine.frame_waiters.append((self._script.main_hook, future))
+        return future
+
+    async def wait_frames(self, count):
+        for _ in range(count):
+            frame = await self.frame()
+        return frame
+
+    def read(self, address, size):
+        """Bytes of RDRAM as they are now; the emulation thread keeps running meanwhile."""
+        start = address & ADDRESS_MASK
+        return self._engine.memory[start:start + size].tobytes()
+
+    def read_u8(self, address):
+        return self.read(address, 1)[0]
+
+    def read_u16(self, address):
+        return int.from_bytes(self.read(address, 2), "big")
+
+    def read_u32(self, address):
+        return int.from_bytes(self.read(address, 4), "big")
+
+    def write(self, address, data):
+        """Write bytes into RDRAM at the next frame boundary."""
+        start = address & ADDRESS_MASK
+        values = np.frombuffer(bytes(data), dtype=np.uint8)
+
+        def apply(core):
+            core.rdram[start:start + len(values)] = values[:RDRAM_SIZE - start]
+
+        self._engine._emulation_call(apply)
+
+    def write_u8(self, address, value):
+        self.write(address, value.to_bytes(1, "big"))
+
+    def write_u16(self, address, value):
+        self.write(address, value.to_bytes(2, "big"))
+
+    def write_u32(self, address, value):
+        self.write(address, value.to_bytes(4, "big"))
+
+    def print(self, *args, sep=" ", end=""):
+        self._engine.output.append(f"[{self.name}] " + sep.join(str(arg) for arg in args) + end)
+
+
+class Script:
+    def __init__(self, name):
+        self.name = name
+        self.hooks = []
+        self.main_hook = None
+        self.namespace = None
+
+
+class ScriptEngine:
+    """Runs user scripts on an asyncio loop in its own thread, fed by a frame hook.
+
+    On the emulation thread the engine only applies queued script writes, compares
+    the watched bytes against last frame's and matches traced PCs against the
+    breakpoints, all with numpy, and then posts the frame's hits to the loop. No
+    script code runs there. If the loop is MAX_PENDING_FRAMES behind, frames are
+    no longer posted and their hits are carried, up to MAX_CARRIED_HITS, so a slow
+    script can fall behind but can never stall emulation.
+
+    On the loop every handler call and every step of an async handler is timed
+    against its hook's budget. A hook that goes over is throttled to every second
+    frame, then every fourth and so on, and reported. It speeds up again once it
+    stays within half its budget. A handler that raises is disabled.
+
+    A script is plain Python run with `emu` (a ScriptAPI) and a `print` that writes
+    to the console already in its namespace. Its top level registers handlers with
+    emu.on_frame(), emu.watch() and emu.breakpoint(). If it defines main, main is
+    called once after loading, as main(emu) if it takes an argument and main()
+    otherwise; an `async def main` keeps running as a task, for example looping
+    over `await emu.frame()`, until it returns or the script is stopped.
+    """
+
+    def __init__(self, memory):
+        self.memory = memory  # the core's RDRAM, read directly by scripts
+        self.watches = WatchIndex()
+        self.hooks = {}
+        self.frame_hooks = []
+        self.breakpoint_hooks = {}  # pc -> [hook]
+        self.charged = set()
+        self.scripts = {}
+        self.frame_waiters = []
+        self.output = deque(maxlen=OUTPUT_LINES)
+        self.posted = 0
+        self.processed = 0
+        self.frames_behind = 0
+        self.hits_dropped = 0
+        self._ids = itertools.count(1)
+        self._emulation_calls = deque()  # run on the emulation thread before the next frame's checks
+        self._breakpoints = np.zeros(0, dtype=np.uint32)
+        self._trace = None
+        self._trace_seen = 0
+        self._carried = ([], [])
+        self._console = None
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._run_loop, name="scripts", daemon=True)
+        self._thread.start()
+
+    def _run_loop(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+    # Emulation thread
+
+    def __call__(self, core):
+        """Frame hook for EmulationThread."""
+        while self._emulation_calls:
+            self._emulation_calls.popleft()(core)
+        watch_hits = []
+        if len(self.watches):
+            changed = self.watches.changes(core.rdram)
+            if changed.size:
+                positions, ids = self.watches.lookup_many(changed)
+                ids, first = np.unique(ids, return_index=True)
+                addresses = changed[positions[first]]
+                watch_hits = list(zip(ids.tolist(), addresses.tolist(), core.rdram[addresses].tolist()))
+        breakpoint_hits = self._breakpoint_hits(core) if self._breakpoints.size else []
+        if not (self.hooks or self.frame_waiters or watch_hits or breakpoint_hits):
+            return
+        carried_watches, carried_breakpoints = self._carried
+        if self.posted - self.processed >= MAX_PENDING_FRAMES:
+            self.frames_behind += 1
+            for carried, hits in ((carried_watches, watch_hits), (carried_breakpoints, breakpoint_hits)):
+                room = MAX_CARRIED_HITS - len(carried)
+                carried.extend(hits[:room])
+                self.hits_dropped += max(0, len(hits) - room)
+            return
+        if carried_watches or carried_breakpoints:
+            watch_hits = carried_watches + watch_hits
+            breakpoint_hits = carried_breakpoints + breakpoint_hits
+            self._carried = ([], [])
+        self.posted += 1
+        self.loop.call_soon_threadsafe(self._dispatch, core.frame, watch_hits, breakpoint_hits)
+
+    def _breakpoint_hits(self, core):
+        # Tracing stays the user's choice (Command Log window); with it off nothing can hit
+        log = core.command_log
+        if log is None:
+            self._trace = None
+            return []
+        if log is not self._trace:
+            self._trace, self._trace_seen = log, log.count
+            return []
+        new = min(log.count - self._trace_seen, log.capacity)
+        self._trace_seen = log.count
+        if new <= 0:
+            return []
+        positions = np.arange(log.count - new, log.count) % log.capacity
+        hits = positions[np.isin(log.records["pc"][positions], self._breakpoints)][:MAX_CARRIED_HITS]
+        return list(zip(log.records["pc"][hits].tolist(), log.records["cycle"][hits].tolist()))
+
+    def _emulation_call(self, fn):
+        self._emulation_calls.append(fn)
+
+    # Script loop
+
+    def _dispatch(self, frame, watch_hits, breakpoint_hits):
+        self.processed += 1
+        for watch_id, address, value in watch_hits:
+            hook = self.hooks.get(watch_id)
+            if hook is not None:
+                self._call(hook, ScriptEvent("watch", frame, KSEG0 + address, value))
+        for pc, cycle in breakpoint_hits:
+            for hook in list(self.breakpoint_hooks.get(pc, ())):
+                self._call(hook, ScriptEvent("breakpoint", frame, pc, cycle))
+        for hook in list(self.frame_hooks):
+            self._call(hook, ScriptEvent("frame", frame, None, None))
+        waiting = []
+        for hook, future in self.frame_waiters:
+            if future.done():
+                continue
+            if hook is not None and frame % hook.interval:
+                waiting.append((hook, future))
+            else:
+                future.set_result(frame)
+        self.frame_waiters = waiting
+        self._account(frame)
+
+    def _call(self, hook, event):
+        if not hook.active:
+            return
+        if event.frame % hook.interval or (hook.task is not None and not hook.task.done()):
+            hook.skipped += 1
+            return
+        hook.calls += 1
+        start = time.perf_counter()
+        try:
+            result = hook.handler(event)
+        except asyncio.CancelledError:
+            raise
+        except BaseException:  # exit() or KeyboardInterrupt in a handler must not end the scripts thread
+            hook.charge(time.perf_counter() - start)
+            self._fail(hook)
+            return
+        hook.charge(time.perf_counter() - start)
+        if asyncio.iscoroutine(result):
+            hook.task = self.loop.create_task(_timed(result, hook))
+            hook.task.add_done_callback(lambda task: self._task_done(hook, task))
+
+    def _task_done(self, hook, task):
+        if not task.cancelled() and task.exception() is not None:
+            self._fail(hook, task.exception())
+
+    def _fail(self, hook, error=None):
+        hook.active = False
+        if hook.kind == "main":
+            self.output.append(f"{hook.script.name} raised:")
+        else:
+            self.output.append(f"{hook.describe()} raised and was disabled:")
+        self.output.extend(script_traceback(error or sys.exc_info()[1])[-6:])
+        self._remove_hook(hook)
+
+    def _account(self, frame):
+        # only hooks that ran can overrun or recover, so the walk doesn't grow with idle watches
+        charged = list(self.charged)
+        self.charged.clear()
+        for hook in charged:
+            hook.worst = max(hook.worst, hook.spent)
+            if hook.spent > hook.budget:
+                hook.overruns += 1
+                if hook.interval < THROTTLE_MAX:
+                    hook.interval *= 2
+                    self.output.append(f"{hook.describe()} took {hook.spent * 1000:.1f} ms at frame {frame} "
+                                       f"(budget {hook.budget * 1000:.1f} ms); now runs every {hook.interval} frames")
+            elif hook.interval > 1 and 0 < hook.spent <= hook.budget / 2:
+                hook.interval //= 2
+            hook.spent = 0.0
+        if self.frames_behind:
+            self.output.append(f"Scripts fell {self.frames_behind} frames behind emulation"
+                               + (f"; {self.hits_dropped} hits dropped" if self.hits_dropped else ""))
+            self.frames_behind = 0
+            self.hits_dropped = 0
+
+    def _add_hook(self, script, kind, handler, budget_ms, target=None):
+        hook = ScriptHook(next(self._ids), script, kind, handler, budget_ms, target, self.charged)
+        self.hooks[hook.id] = hook
+        script.hooks.append(hook)
+        if kind == "frame":
+            self.frame_hooks.append(hook)
+        elif kind == "breakpoint":
+            self.breakpoint_hooks.setdefault(target, []).append(hook)
+        return hook
+
+    def _remove_hook(self, hook):
+        hook.active = False
+        if self.hooks.pop(hook.id, None) is None:
+            return
+        if hook in hook.script.hooks:
+            hook.script.hooks.remove(hook)
+        if hook.task is not None:
+            hook.task.cancel()
+        if hook.kind == "watch":
+            self._emulation_call(lambda core: self.watches.remove(hook.id))
+        elif hook.kind == "frame":
+            self.frame_hooks.remove(hook)
+        elif hook.kind == "breakpoint":
+            same_pc = self.breakpoint_hooks[hook.target]
+            same_pc.remove(hook)
+            if not same_pc:
+                del self.breakpoint_hooks[hook.target]
+            self._update_breakpoints()
+
+    def _update_breakpoints(self):
+        pcs = np.unique(np.array(list(self.breakpoint_hooks), dtype=np.uint32))
+
+        def apply(core):
+            self._breakpoints = pcs
+
+        self._emulation_call(apply)
+
+    def _new_script(self, name):
+        if name in self.scripts:
+            self._stop_script(name)
+        script = self.scripts[name] = Script(name)
+        script.main_hook = ScriptHook(0, script, "main", None, HOOK_BUDGET_MS, ledger=self.charged)
+        api = ScriptAPI(self, script)
+        script.namespace = {"__name__": "__script__", "emu": api, "print": api.print}
+        return script, api
+
+    def _start_script(self, source, name):
+        script, api = self._new_script(name)
+        try:
+            exec(compile(source, name, "exec"), script.namespace)
+            main = script.namespace.get("main")
+            if callable(main):
+                result = main(api) if _takes_argument(main) else main()
+                if asyncio.iscoroutine(result):
+                    task = script.main_hook.task = self.loop.create_task(_timed(result, script.main_hook))
+                    task.add_done_callback(lambda task: self._task_done(script.main_hook, task))
+        except asyncio.CancelledError:
+            raise
+        except BaseException as e:
+            self.output.append(f"{name} failed to load:")
+            self.output.extend(script_traceback(e)[-6:])
+            self._stop_script(name)
+            return
+        self.output.append(f"{name} loaded ({len(script.hooks)} hooks)")
+
+    def _stop_script(self, name):
+        script = self.scripts.pop(name, None)
+        if script is None:
+            return
+        for hook in list(script.hooks):
+            self._remove_hook(hook)
+        if script.main_hook.task is not None:
+            script.main_hook.task.cancel()
+
+    def _execute(self, line):
+        if self._console is None or self._console.name not in self.scripts:
+            self._console = self._new_script("console")[0]
+        namespace = self._console.namespace
+        try:
+            try:
+                code = compile(line, "<console>", "eval")
+            except SyntaxError:
+                exec(compile(line, "<console>", "exec"), namespace)
+                return
+            result = eval(code, namespace)
+            if asyncio.iscoroutine(result):
+                hook = self._console.main_hook
+                task = self.loop.create_task(_timed(result, hook))
+                task.add_done_callback(lambda task: self._task_done(hook, task))
+            elif result is not None:
+                self.output.append(repr(result))
+        except asyncio.CancelledError:
+            raise
+        except BaseException as e:
+            self.output.append(f"{type(e).__name__}: {e}")
+
+    # Any thread
+
+    def run_script(self, source, name):
+        """Load a script's source on the loop; a script with the same name is replaced."""
+        self.loop.call_soon_threadsafe(self._start_script, source, name)
+
+    def execute(self, line):
+        """Run one console line in the console's own namespace, echoing expression values."""
+        self.output.append(f">>> {line}")
+        self.loop.call_soon_threadsafe(self._execute, line)
+
+    def stop_scripts(self):
+        def stop_all():
+            for name in list(self.scripts):
+                self._stop_script(name)
+            self.output.append("Scripts stopped")
+
+        self.loop.call_soon_threadsafe(stop_all)
+
+    def drain_output(self):
+        lines = []
+        while True:
+            try:
+                lines.append(self.output.popleft())
+            except IndexError:
+                return lines
+
+    def stats(self):
+        """Per-hook call counts and timings, slowest first."""
+        rows = []
+        for hook in list(self.hooks.values()):
+            rows.append({"hook": hook.describe(), "calls": hook.calls, "skipped": hook.skipped,
+                         "avg_ms": hook.total_time * 1000 / max(hook.calls, 1), "worst_ms": hook.worst * 1000,
+                         "overruns": hook.overruns, "every": hook.interval})
+        return sorted(rows, key=lambda row: -row["worst_ms"])
+
+    def close(self):
+        def shutdown():
+            for task in asyncio.all_tasks(self.loop):
+                task.cancel()
+            self.loop.call_soon(self.loop.stop)  # after the cancelled tasks have unwound
+
+        self.loop.call_soon_threadsafe(shutdown)
+        self._thread.join(timeout=1.0)
+        if not self._thread.is_alive():
+            self.loop.close()
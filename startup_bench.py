@@ -0,0 +1,150 @@
+"""Cold-start benchmark for the EmuAI GUI: time to first window and import cost per module."""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+REPORT_VERSION = 1
+STARTUP_BUDGET_MS = 750  # median time from process launch to the first drawn window
+DEFAULT_RUNS = 5
+TOP_MODULES = 15
+GUI_DIR = Path(__file__).resolve().parent
+
+# Runs in a fresh interpreter, in the same order as EMUAI4K.py's __main__ block. The
+# monotonic clock is system-wide, so the parent can subtract its own launch time.
+CHILD_SCRIPT = """
+import json, sys, time
+marks = {"start": time.monotonic()}
+import EMUAI4K
+marks["imported"] = time.monotonic()
+if sys.argv[1] == "window":
+    root = EMUAI4K.tk.Tk()
+    app = EMUAI4K.EmuAI(root)
+    marks["built"] = time.monotonic()
+    root.update()
+    marks["drawn"] = time.monotonic()
+    root.destroy()
+print(json.dumps(marks))
+"""
+
+
+def parse_importtime(stderr):
+    """[(module, self ms, cumulative ms, depth)] from -X importtime output, in import order."""
+    modules = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip())) // 2
+        modules.append((name.strip(), int(self_us) / 1000, int(cumulative_us) / 1000, depth))
+    return modules
+
+
+def gui_imports(modules):
+    """Cumulative cost of every module EMUAI4K imports directly, most expensive first."""
+    direct = []
+    for i, (name, _, cumulative, depth) in enumerate(modules):
+        if name != "EMUAI4K":
+            continue
+        # importtime lists a module after its imports; EMUAI4K's direct imports sit one level below it
+        j = i - 1
+        while j >= 0 and modules[j][3] > depth:
+            if modules[j][3] == depth + 1:
+                direct.append({"module": modules[j][0], "cumulative_ms": modules[j][2]})
+            j -= 1
+        direct.append({"module": "EMUAI4K (own code)", "cumulative_ms": modules[i][1]})
+        break
+    return sorted(direct, key=lambda m: -m["cumulative_ms"])
+
+
+def run_once(window=True):
+    """Start the GUI in a fresh interpreter; returns (timings in ms, importtime modules)."""
+    launched = time.monotonic()
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", CHILD_SCRIPT,
+                             "window" if window else "imports"],
+                            cwd=GUI_DIR, capture_output=True, text=True)
+    if result.returncode != 0:
+        tail = result.stderr.strip().splitlines()[-1:] or ["no output"]
+        raise RuntimeError(f"GUI failed to start: {tail[0]}")
+    marks = json.loads(result.stdout.strip().splitlines()[-1])
+    timings = {
+        "interpreter_ms": (marks["start"] - launched) * 1000,
+        "imports_ms": (marks["imported"] - marks["start"]) * 1000,
+    }
+    if window:
+        timings["build_ms"] = (marks["built"] - marks["imported"]) * 1000
+        timings["draw_ms"] = (marks["drawn"] - marks["built"]) * 1000
+        timings["first_window_ms"] = (marks["drawn"] - launched) * 1000
+    else:
+        timings["first_window_ms"] = (marks["imported"] - launched) * 1000
+    return timings, parse_importtime(result.stderr)
+
+
+def benchmark(runs=DEFAULT_RUNS, window=True, top=TOP_MODULES, budget_ms=STARTUP_BUDGET_MS):
+    """Start the GUI `runs` times and build a JSON-ready report; the first run warms the disk cache."""
+    run_once(window)
+    samples = []
+    modules = None
+    for _ in range(runs):
+        timings, modules = run_once(window)
+        samples.append(timings)
+    medians = {key: statistics.median(sample[key] for sample in samples) for key in samples[0]}
+    by_self = sorted(modules, key=lambda m: -m[1])[:top]
+    return {
+        "version": REPORT_VERSION,
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "host": {"platform": platform.platform(), "python": platform.python_version(),
+                 "cpu_count": os.cpu_count()},
+        "window": window,
+        "runs": samples,
+        "median": medians,
+        "budget_ms": budget_ms,
+        "within_budget": medians["first_window_ms"] <= budget_ms,
+        "gui_imports": gui_imports(modules),
+        "slowest_modules": [{"module": name, "self_ms": self_ms, "cumulative_ms": cumulative}
+                            for name, self_ms, cumulative, _ in by_self],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure EmuAI's cold start and check it against a budget.")
+    parser.add_argument("--runs", type=int, default=DEFAULT_RUNS, help="measured starts (after one warm-up)")
+    parser.add_argument("--budget", type=float, default=STARTUP_BUDGET_MS,
+                        help="fail if the median time to first window exceeds this many ms")
+    parser.add_argument("--imports-only", action="store_true",
+                        help="only import the GUI module, for machines without a display")
+    parser.add_argument("--top", type=int, default=TOP_MODULES, help="slowest modules to list")
+    parser.add_argument("--report", help="write the JSON report here instead of stdout")
+    args = parser.parse_args()
+    if args.runs < 1:
+        parser.error("--runs must be at least 1")
+
+    try:
+        report = benchmark(args.runs, not args.imports_only, args.top, args.budget)
+    except RuntimeError as e:
+        print(e, file=sys.stderr)
+        return 2
+    median = report["median"]
+    print(f"Time to first window: {median['first_window_ms']:.0f} ms (budget {args.budget:.0f} ms; "
+          f"interpreter {median['interpreter_ms']:.0f}, imports {median['imports_ms']:.0f} ms)", file=sys.stderr)
+    for entry in report["gui_imports"][:args.top]:
+        print(f"  {entry['cumulative_ms']:8.1f} ms  {entry['module']}", file=sys.stderr)
+    text = json.dumps(report, indent=2)
+    if args.report:
+        with open(args.report, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    if not report["within_budget"]:
+        print("Start-up is over budget", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,114 @@
+"""Address-to-symbol index for the debugger, cached on disk per symbol file."""
+import hashlib
+import os
+import re
+import time
+from array import array
+from bisect import bisect_right
+from pathlib import Path
+
+import numpy as np
+
+SYMBOL_CACHE_DIR = Path.home() / ".emuai" / "symcache"
+
+# Project64 "80000400,code,main[,description]" or nm/map style "80000400 [T] main"
+CSV_LINE = re.compile(r"^\s*(?:0x)?([0-9A-Fa-f]{1,8})\s*,\s*[^,]*,\s*([^,\s]+)")
+PLAIN_LINE = re.compile(r"^\s*(?:0x)?([0-9A-Fa-f]{1,8})\s+(?:[A-Za-z]\s+)?([^\s]+)\s*$")
+
+
+def parse_symbol_file(path):
+    """Return (addresses, names) parsed from a symbol file, in file order."""
+    addresses = []
+    names = []
+    with open(path, "r", errors="replace") as f:
+        for line in f:
+            if not line.strip() or line.lstrip().startswith(("#", ";", "//")):
+                continue
+            match = CSV_LINE.match(line) or PLAIN_LINE.match(line)
+            if match:
+                addresses.append(int(match.group(1), 16))
+                names.append(match.group(2))
+    return addresses, names
+
+
+class SymbolTable:
+    """Symbols sorted by address in flat arrays; lookups are a bisect, O(log n).
+
+    Names live in one UTF-8 blob with an offsets array, so a table of tens of
+    thousands of symbols is three arrays rather than that many Python objects.
+    """
+
+    def __init__(self, addresses, name_blob, offsets):
+        self.addresses = addresses  # array('I'), sorted
+        self.name_blob = name_blob  # bytes
+        self.offsets = offsets  # array('I'), len(addresses) + 1 entries
+        self._by_name = None
+        self.source = None
+        self.load_time = 0.0
+        self.from_cache = False
+
+    @classmethod
+    def from_symbols(cls, addresses, names):
+        order = sorted(range(len(addresses)), key=addresses.__getitem__)
+        encoded = [names[i].encode() for i in order]
+        offsets = array("I", [0])
+        total = 0
+        for name in encoded:
+            total += len(name)
+            offsets.append(total)
+        return cls(array("I", (addresses[i] for i in order)), b"".join(encoded), offsets)
+
+    @classmethod
+    def load(cls, path, cache_dir=SYMBOL_CACHE_DIR):
+        """Load a symbol file, reusing the parsed index cached under its content hash."""
+        start = time.perf_counter()
+        with open(path, "rb") as f:
+            digest = hashlib.sha1(f.read()).hexdigest()
+        cache_path = Path(cache_dir) / f"{digest}.npz"
+        table = None
+        if cache_path.exists():
+            try:
+                with np.load(cache_path) as cached:
+                    table = cls(array("I", cached["addresses"].astype(np.uint32).tobytes()),
+                                cached["names"].tobytes(),
+                                array("I", cached["offsets"].astype(np.uint32).tobytes()))
+                table.from_cache = True
+            except (OSError, ValueError, KeyError) as e:
+                print(f"Ignoring unreadable symbol cache {cache_path}: {e}")
+        if table is None:
+            table = cls.from_symbols(*parse_symbol_file(path))
+            os.makedirs(cache_dir, exist_ok=True)
+            tmp_path = cache_path.with_suffix(".tmp.npz")
+            np.savez(tmp_path, addresses=np.frombuffer(table.addresses, dtype=np.uint32),
+                     names=np.frombuffer(table.name_blob, dtype=np.uint8),
+                     offsets=np.frombuffer(table.offsets, dtype=np.uint32))
+            os.replace(tmp_path, cache_path)
+        table.source = str(path)
+        table.load_time = time.perf_counter() - start
+        return table
+
+    def __len__(self):
+        return len(self.addresses)
+
+    def name(self, index):
+        return self.name_blob[self.offsets[index]:self.offsets[index + 1]].decode()
+
+    def lookup(self, address):
+        """(name, offset) of the nearest symbol at or below address, or None."""
+        index = bisect_right(self.addresses, address) - 1
+        if index < 0:
+            return None
+        return self.name(index), address - self.addresses[index]
+
+    def format(self, address):
+        """"name+0x1C" for address, or the bare hex address when nothing precedes it."""
+        found = self.lookup(address)
+        if found is None:
+            return f"{address:08X}"
+        name, offset = found
+        return f"{name}+0x{offset:X}" if offset else name
+
+    def address_of(self, name):
+        if self._by_name is None:
+            self._by_name = {self.name(i): self.addresses[i] for i in range(len(self))}
+        return self._by_name.get(name)
@@ -0,0 +1,114 @@
+"""Low-overhead emulation speed metrics kept in fixed-size ring buffers."""
+import csv
+import json
+import time
+
+import numpy as np
+
+RING_CAPACITY = 4096  # ~68 s of frames at 60 VI/s
+STATUS_UPDATE_INTERVAL = 0.5  # seconds between status bar refreshes
+
+
+class FrameMetrics:
+    """Per-frame samples written by the emulation thread, read by anyone.
+
+    There is a single writer; readers may see the newest slot half-written, which
+    only ever skews a live percentile by one sample.
+    """
+
+    def __init__(self, capacity=RING_CAPACITY):
+        self.capacity = capacity
+        self.timestamps = np.zeros(capacity)  # perf_counter() at the end of the frame
+        self.frame_times = np.zeros(capacity)  # seconds spent emulating the frame
+        self.cpu_times = np.zeros(capacity)  # emulation thread CPU seconds for the frame
+        self.dropped = np.zeros(capacity, dtype=np.uint32)  # frames skipped before this one
+        self.lateness = np.zeros(capacity)  # seconds the frame started after its paced deadline
+        self.count = 0
+        self.dropped_frames = 0
+        self._thread_samples = {}  # name -> (wall, cpu, percent)
+
+    def record(self, timestamp, frame_time, cpu_time, dropped=0, lateness=0.0):
+        i = self.count % self.capacity
+        self.timestamps[i] = timestamp
+        self.frame_times[i] = frame_time
+        self.cpu_times[i] = cpu_time
+        self.dropped[i] = dropped
+        self.lateness[i] = lateness
+        self.dropped_frames += dropped
+        self.count += 1
+
+    def sample_thread(self, name, cpu_time=None):
+        """Update CPU usage for the calling thread; call periodically from that thread."""
+        now = time.perf_counter()
+        cpu_time = time.thread_time() if cpu_time is None else cpu_time
+        last = self._thread_samples.get(name)
+        percent = 0.0
+        if last is not None and now > last[0]:
+            percent = 100.0 * (cpu_time - last[1]) / (now - last[0])
+        self._thread_samples[name] = (now, cpu_time, percent)
+
+    def _ordered(self, array):
+        """Valid samples of array, oldest first."""
+        if self.count <= self.capacity:
+            return array[:self.count]
+        i = self.count % self.capacity
+        return np.concatenate((array[i:], array[:i]))
+
+    def snapshot(self, window=1.0):
+        """Summary of the recent past: VI/s over `window`, percentiles over the whole ring."""
+        n = min(self.count, self.capacity)
+        now = time.perf_counter()
+        recent = self.timestamps[:n] > now - window
+        frames = self.frame_times[:n] * 1000
+        p50, p95, p99 = np.percentile(frames, (50, 95, 99)) if n else (0.0, 0.0, 0.0)
+        late = np.abs(self.lateness[:n]) * 1000
+        jitter_p99 = np.percentile(late, 99) if n else 0.0
+        recent_frames = int(np.count_nonzero(recent))
+        cpu = {name: sample[2] for name, sample in self._thread_samples.items()}
+        if recent_frames:
+            cpu["emulation"] = 100.0 * float(self.cpu_times[:n][recent].sum()) / window
+        return {
+            "frames": self.count,
+            "vi_per_sec": recent_frames / window,
+            "frame_ms_p50": float(p50),
+            "frame_ms_p95": float(p95),
+            "frame_ms_p99": float(p99),
+            "jitter_ms_p99": float(jitter_p99),
+            "jitter_ms_max": float(late.max()) if n else 0.0,
+            "dropped_frames": self.dropped_frames,
+            "cpu_percent": cpu,
+        }
+
+    def rows(self):
+        """(frame, timestamp, frame_ms, cpu_ms, dropped, late_ms) for every sample still in the ring."""
+        first = max(0, self.count - self.capacity)
+        return zip(
+            range(first, self.count),
+            self._ordered(self.timestamps).tolist(),
+            (self._ordered(self.frame_times) * 1000).tolist(),
+            (self._ordered(self.cpu_times) * 1000).tolist(),
+            self._ordered(self.dropped).tolist(),
+            (self._ordered(self.lateness) * 1000).tolist(),
+        )
+
+    def export_csv(self, path):
+        with open(path, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["frame", "timestamp", "frame_ms", "cpu_ms", "dropped", "late_ms"])
+            writer.writerows(self.rows())
+
+    def export_json(self, path):
+        data = {
+            "summary": self.snapshot(),
+            "samples": [dict(zip(("frame", "timestamp", "frame_ms", "cpu_ms", "dropped", "late_ms"), row))
+                        for row in self.rows()],
+        }
+        with open(path, "w") as f:
+            json.dump(data, f, indent=1)
+
+    def export(self, path):
+        """Write CSV or JSON depending on the file extension."""
+        if str(path).lower().endswith(".json"):
+            self.export_json(path)
+        else:
+            self.export_csv(path)
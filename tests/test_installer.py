@@ -0,0 +1,131 @@
+"""Installer downloads against a local HTTP server that honours Range requests."""
+import hashlib
+import http.server
+import importlib.util
+import os
+import socket
+import tempfile
+import threading
+import unittest
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+spec = importlib.util.spec_from_file_location("installer", ROOT / "$EMUV0X.X.X.py")
+installer = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(installer)
+
+PAYLOAD = os.urandom(3 * 256 * 1024 + 123)
+
+
+class RangeHandler(http.server.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        server = self.server
+        if self.path == "/SHA256SUMS":
+            body = f"{'0' * 64}  other.zip\n{hashlib.sha256(PAYLOAD).hexdigest()}  bundle.bin\n".encode()
+            self._send(200, body)
+            return
+        if self.path != "/bundle.bin":
+            self._send(404, b"")
+            return
+        start, end = 0, len(PAYLOAD) - 1
+        status = 200
+        header = self.headers.get("Range")
+        if header:
+            first, _, last = header.partition("=")[2].partition("-")
+            start, end = int(first), int(last) if last else len(PAYLOAD) - 1
+            status = 206
+        body = PAYLOAD[start:end + 1]
+        with server.lock:
+            server.requests.append((start, end))
+            # In "break" mode the first request for a segment is cut short and its retries fail
+            failing = server.mode == "break" and end in server.cut
+            broken = server.mode == "break" and len(body) > 1 and not failing
+            if broken:
+                server.cut.add(end)
+        if failing:
+            self._send(503, b"")
+            return
+        self.send_response(status)
+        if status == 206:
+            self.send_header("Content-Range", f"bytes {start}-{end}/{len(PAYLOAD)}")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("ETag", '"v1"')
+        self.end_headers()
+        if broken:
+            # Send half of the body, then drop the connection as a flaky network would
+            self.wfile.write(body[:len(body) // 2])
+            self.wfile.flush()
+            self.connection.shutdown(socket.SHUT_RDWR)
+            self.close_connection = True
+            return
+        self.wfile.write(body)
+
+    def _send(self, status, body):
+        self.send_response(status)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class DownloadTest(unittest.TestCase):
+    def setUp(self):
+        self.server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), RangeHandler)
+        self.server.lock = threading.Lock()
+        self.server.requests = []
+        self.server.cut = set()
+        self.server.mode = "ok"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.url = f"http://127.0.0.1:{self.server.server_port}/bundle.bin"
+        self.dir = Path(tempfile.mkdtemp())
+        self.dest = self.dir / "bundle.bin"
+        self.saved = installer.MIN_SEGMENT_SIZE, installer.CHUNK_SIZE, installer.HTTP_TIMEOUT
+        installer.MIN_SEGMENT_SIZE = 256 * 1024
+        installer.CHUNK_SIZE = 16 * 1024
+        installer.HTTP_TIMEOUT = 5
+
+    def tearDown(self):
+        installer.MIN_SEGMENT_SIZE, installer.CHUNK_SIZE, installer.HTTP_TIMEOUT = self.saved
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_segmented_download(self):
+        digest = installer.download_file(self.url, self.dest, hashlib.sha256(PAYLOAD).hexdigest(), segments=3)
+        self.assertEqual(digest, hashlib.sha256(PAYLOAD).hexdigest())
+        self.assertEqual(self.dest.read_bytes(), PAYLOAD)
+        self.assertEqual(len([r for r in self.server.requests if r != (0, 0)]), 3)
+        self.assertFalse(self.dest.with_name("bundle.bin.part.json").exists())
+
+    def test_resume_after_interruption(self):
+        self.server.mode = "break"
+        with self.assertRaises(installer.requests.HTTPError):
+            installer.download_file(self.url, self.dest, segments=3)
+        self.assertTrue(self.dest.with_name("bundle.bin.part").exists())
+        self.assertTrue(self.dest.with_name("bundle.bin.part.json").exists())
+        self.server.mode = "ok"
+        self.server.requests.clear()
+        digest = installer.download_file(self.url, self.dest, hashlib.sha256(PAYLOAD).hexdigest(), segments=3)
+        self.assertEqual(digest, hashlib.sha256(PAYLOAD).hexdigest())
+        self.assertEqual(self.dest.read_bytes(), PAYLOAD)
+        # Only the missing halves were fetched again
+        fetched = sum(end + 1 - start for start, end in self.server.requests if (start, end) != (0, 0))
+        self.assertLess(fetched, len(PAYLOAD) * 3 // 4)
+
+    def test_digest_mismatch(self):
+        with self.assertRaises(ValueError):
+            installer.download_file(self.url, self.dest, "0" * 64)
+        self.assertFalse(self.dest.exists())
+        self.assertFalse(self.dest.with_name("bundle.bin.part").exists())
+
+    def test_published_checksum(self):
+        self.assertEqual(installer.published_sha256(self.url), hashlib.sha256(PAYLOAD).hexdigest())
+        missing = self.url.replace("bundle.bin", "unknown.bin")
+        self.assertIsNone(installer.published_sha256(missing))
+
+
+if __name__ == "__main__":
+    unittest.main()
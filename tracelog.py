@@ -0,0 +1,286 @@
+"""Fixed-width binary CPU trace and exception logs for the R4300i debugger windows."""
+import queue
+import threading
+from array import array
+
+import numpy as np
+
+TRACE_MAGIC = b"EMUTRACE"
+TRACE_VERSION = 1
+TRACE_CAPACITY = 1 << 20  # records kept in memory for the log window (~20 MB)
+EXCEPTION_CAPACITY = 1 << 14
+DMA_CAPACITY = 1 << 16
+DMA_FRAME_HISTORY = 256  # frames of per-channel byte totals kept for the aggregate view
+ROM_HEAT_BUCKET = 64 * 1024  # granularity of the "hottest ROM regions" histogram
+ROM_SPACE = 64 * 1024 * 1024
+CART_BASE = 0x10000000
+WRITE_CHUNK = 1 << 16  # records per block handed to the writer thread
+WRITER_QUEUE = 32  # blocks buffered before new ones are dropped
+
+# One record per executed instruction or raised exception, 20 bytes, no Python objects
+TRACE_RECORD = np.dtype([("pc", "<u4"), ("opcode", "<u4"), ("cycle", "<u8"), ("flags", "<u4")])
+
+# flags: bit 0 marks an exception record, bits 8-12 hold the Cause.ExcCode
+FLAG_EXCEPTION = 0x1
+EXCEPTION_NAMES = {
+    0: "Interrupt", 1: "TLB Mod", 2: "TLB Load", 3: "TLB Store", 4: "Address Load",
+    5: "Address Store", 6: "Bus Instr", 7: "Bus Data", 8: "Syscall", 9: "Breakpoint",
+    10: "Reserved Instr", 11: "Coprocessor Unusable", 12: "Overflow", 13: "Trap",
+    15: "Floating Point", 23: "Watch", 30: "NMI", 31: "Reset",
+}
+EXCEPTION_RESET = 31
+EXCEPTION_NMI = 30
+
+DMA_CHANNELS = ("PI", "SI", "SP", "AI")
+DMA_PI, DMA_SI, DMA_SP, DMA_AI = range(4)
+
+OPCODE_NAMES = [
+    "SPECIAL", "REGIMM", "J", "JAL", "BEQ", "BNE", "BLEZ", "BGTZ",
+    "ADDI", "ADDIU", "SLTI", "SLTIU", "ANDI", "ORI", "XORI", "LUI",
+    "COP0", "COP1", "COP2", "?", "BEQL", "BNEL", "BLEZL", "BGTZL",
+    "DADDI", "DADDIU", "LDL", "LDR", "?", "?", "?", "?",
+    "LB", "LH", "LWL", "LW", "LBU", "LHU", "LWR", "LWU",
+    "SB", "SH", "SWL", "SW", "SDL", "SDR", "SWR", "CACHE",
+    "LL", "LWC1", "LWC2", "?", "LLD", "LDC1", "LDC2", "LD",
+    "SC", "SWC1", "SWC2", "?", "SCD", "SDC1", "SDC2", "SD",
+]
+
+
+def exception_flags(code):
+    return FLAG_EXCEPTION | (code << 8)
+
+
+class TraceRing:
+    """Preallocated ring of TRACE_RECORDs.
+
+    The interpreter appends with record() or, for a whole block, record_batch().
+    When a TraceWriter is attached, each completed WRITE_CHUNK of records is copied
+    once and queued for the writer thread.
+    """
+
+    def __init__(self, capacity=TRACE_CAPACITY):
+        capacity = max(WRITE_CHUNK, capacity // WRITE_CHUNK * WRITE_CHUNK)
+        self.capacity = capacity
+        self.records = np.zeros(capacity, dtype=TRACE_RECORD)
+        self.count = 0
+        self.writer = None
+
+    def record(self, pc, opcode, cycle, flags=0):
+        self.records[self.count % self.capacity] = (pc, opcode, cycle, flags)
+        self.count += 1
+        if self.writer is not None and self.count % WRITE_CHUNK == 0:
+            self._flush_chunk()
+
+    def record_batch(self, pcs, opcodes, cycles, flags=0):
+        n = len(pcs)
+        while n:
+            i = self.count % self.capacity
+            take = min(n, self.capacity - i, WRITE_CHUNK - self.count % WRITE_CHUNK)
+            block = self.records[i:i + take]
+            block["pc"] = pcs[:take]
+            block["opcode"] = opcodes[:take]
+            block["cycle"] = cycles[:take]
+            block["flags"] = flags if np.isscalar(flags) else flags[:take]
+            pcs, opcodes, cycles = pcs[take:], opcodes[take:], cycles[take:]
+            if not np.isscalar(flags):
+                flags = flags[take:]
+            n -= take
+            self.count += take
+            if self.writer is not None and self.count % WRITE_CHUNK == 0:
+                self._flush_chunk()
+
+    def _flush_chunk(self):
+        start = (self.count - WRITE_CHUNK) % self.capacity
+        self.writer.submit(self.records[start:start + WRITE_CHUNK].copy())
+
+    def __len__(self):
+        return min(self.count, self.capacity)
+
+    def rows(self, start, count):
+        """Records start..start+count, counted from the oldest one still in the ring."""
+        first = max(0, self.count - self.capacity)
+        indices = (np.arange(start, min(start + count, len(self))) + first) % self.capacity
+        return self.records[indices]
+
+    def attach_writer(self, writer):
+        self.writer = writer
+
+    def detach_writer(self):
+        """Stop streaming, writing out the partial chunk first."""
+        writer, self.writer = self.writer, None
+        if writer is not None:
+            pending = self.count % WRITE_CHUNK
+            if pending:
+                start = (self.count - pending) % self.capacity
+                writer.submit(self.records[start:start + pending].copy())
+            writer.close(wait=False)
+        return writer
+
+
+class TraceWriter:
+    """Streams record blocks to a binary trace file from its own thread."""
+
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, "wb")
+        descr = str(TRACE_RECORD.descr).encode()
+        self.file.write(TRACE_MAGIC + bytes([TRACE_VERSION]) + len(descr).to_bytes(2, "little") + descr)
+        self.blocks = queue.SimpleQueue()
+        self.records_written = 0
+        self.dropped_blocks = 0
+        self.thread = threading.Thread(target=self._run, name="trace-writer", daemon=True)
+        self.thread.start()
+
+    def submit(self, block):
+        if self.blocks.qsize() >= WRITER_QUEUE:
+            self.dropped_blocks += 1
+        else:
+            self.blocks.put(block)
+
+    def _run(self):
+        while True:
+            block = self.blocks.get()
+            if block is None:
+                break
+            self.file.write(block.data)
+            self.records_written += len(block)
+        self.file.close()
+
+    def close(self, wait=True):
+        """Finish writing queued blocks; with wait=False the file closes in the background."""
+        self.blocks.put(None)
+        if wait:
+            self.thread.join()
+
+
+def read_trace(path):
+    """Memory-map a trace file written by TraceWriter as an array of TRACE_RECORDs."""
+    with open(path, "rb") as f:
+        head = f.read(len(TRACE_MAGIC) + 3)
+        if head[:len(TRACE_MAGIC)] != TRACE_MAGIC:
+            raise ValueError(f"{path} is not an EmuAI trace file")
+        descr_len = int.from_bytes(head[-2:], "little")
+        f.read(descr_len)
+        offset = f.tell()
+    return np.memmap(path, dtype=TRACE_RECORD, mode="r", offset=offset)
+
+
+def format_record(record, symbols=None):
+    """One log line for a trace or exception record."""
+    pc = int(record["pc"])
+    location = symbols.format(pc) if symbols is not None else ""
+    flags = int(record["flags"])
+    if flags & FLAG_EXCEPTION:
+        code = (flags >> 8) & 0x1F
+        what = f"EXCEPTION {EXCEPTION_NAMES.get(code, code)}"
+    else:
+        opcode = int(record["opcode"])
+        what = f"{opcode:08X}  {OPCODE_NAMES[opcode >> 26]}"
+    return f"{int(record['cycle']):>12}  {pc:08X}  {location:<24} {what}"
+
+
+class DmaLog:
+    """PI/SI/SP/AI transfers in preallocated columns, with running aggregates.
+
+    Bytes per frame per channel and the ROM read histogram are updated as each
+    transfer is recorded, so the aggregate views never rescan the log. Columns are
+    array.array so a record costs plain C stores; readers view them through NumPy.
+    """
+
+    def __init__(self, capacity=DMA_CAPACITY):
+        self.capacity = capacity
+        self.channel = array("B", bytes(capacity))
+        self.source = array("I", bytes(4 * capacity))
+        self.dest = array("I", bytes(4 * capacity))
+        self.length = array("I", bytes(4 * capacity))
+        self.frame = array("I", bytes(4 * capacity))
+        self.count = 0
+        self.total_bytes = [0] * len(DMA_CHANNELS)
+        self.frame_bytes = np.zeros((DMA_FRAME_HISTORY, len(DMA_CHANNELS)), dtype=np.uint64)
+        self.frame_ids = np.full(DMA_FRAME_HISTORY, -1, dtype=np.int64)
+        self.rom_heat = array("Q", bytes(8 * (ROM_SPACE // ROM_HEAT_BUCKET)))
+        self._frame = None  # frame currently being accumulated in plain ints
+        self._frame_totals = [0] * len(DMA_CHANNELS)
+
+    def record(self, channel, source, dest, length, frame):
+        i = self.count % self.capacity
+        self.channel[i] = channel
+        self.source[i] = source
+        self.dest[i] = dest
+        self.length[i] = length
+        self.frame[i] = frame
+        self.count += 1
+        self.total_bytes[channel] += length
+
+        if frame != self._frame:
+            if self._frame is not None and frame < self._frame:
+                self.reset_frames()  # the core was reset without saying so
+            self._close_frame()
+            self._frame = frame
+        self._frame_totals[channel] += length
+
+        if channel == DMA_PI and source >= CART_BASE:
+            start = source - CART_BASE
+            end = min(start + length, ROM_SPACE)
+            while start < end:
+                # A long read is split across the buckets it covers
+                bucket = start // ROM_HEAT_BUCKET
+                stop = min(end, (bucket + 1) * ROM_HEAT_BUCKET)
+                self.rom_heat[bucket] += stop - start
+                start = stop
+
+    def reset_frames(self):
+        """Forget the per-frame history when the core's frame counter restarts.
+
+        The records, total_bytes and the ROM read histogram cover every run and are kept.
+        """
+        self.frame_ids.fill(-1)
+        self.frame_bytes.fill(0)
+        self._frame = None
+        self._frame_totals = [0] * len(DMA_CHANNELS)
+
+    def _close_frame(self):
+        if self._frame is not None:
+            slot = self._frame % DMA_FRAME_HISTORY
+            self.frame_ids[slot] = self._frame
+            self.frame_bytes[slot] = self._frame_totals
+        self._frame_totals = [0] * len(DMA_CHANNELS)
+
+    def __len__(self):
+        return min(self.count, self.capacity)
+
+    def rows(self, start, count):
+        """(frame, channel, source, dest, length) tuples, oldest first from start."""
+        first = max(0, self.count - self.capacity)
+        indices = (np.arange(start, min(start + count, len(self))) + first) % self.capacity
+        columns = [np.frombuffer(column, dtype=column.typecode)[indices].tolist()
+                   for column in (self.frame, self.channel, self.source, self.dest, self.length)]
+        columns[1] = [DMA_CHANNELS[c] for c in columns[1]]
+        return list(zip(*columns))
+
+    def bytes_per_frame(self, frames=60):
+        """{channel name: average bytes per frame} over the most recent `frames` frames with traffic."""
+        frame_ids = self.frame_ids.copy()
+        frame_bytes = self.frame_bytes.copy()
+        if self._frame is not None:
+            slot = self._frame % DMA_FRAME_HISTORY
+            frame_ids[slot] = self._frame
+            frame_bytes[slot] = self._frame_totals
+        valid = frame_ids >= 0
+        if not valid.any():
+            return dict.fromkeys(DMA_CHANNELS, 0.0)
+        newest = frame_ids.max()
+        recent = valid & (frame_ids > newest - min(frames, DMA_FRAME_HISTORY))
+        span = min(frames, DMA_FRAME_HISTORY, int(newest - frame_ids[valid].min()) + 1)
+        totals = frame_bytes[recent].sum(axis=0)
+        return {name: float(totals[i]) / span for i, name in enumerate(DMA_CHANNELS)}
+
+    def hottest_rom_regions(self, n=10):
+        """[(cart address, bytes read)] for the n most-read ROM_HEAT_BUCKET regions."""
+        heat = np.frombuffer(self.rom_heat, dtype=np.uint64)
+        n = min(n, np.count_nonzero(heat))
+        if not n:
+            return []
+        top = np.argpartition(heat, -n)[-n:]
+        top = top[np.argsort(heat[top])[::-1]]
+        return [(CART_BASE + int(b) * ROM_HEAT_BUCKET, int(heat[b])) for b in top]